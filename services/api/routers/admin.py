@@ -1,7 +1,7 @@
 """
 Admin endpoints for knowledge management
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from typing import List, Optional
@@ -10,6 +10,7 @@ import httpx
 import logging
 
 from database import get_db
+from config import settings
 from routers.auth import get_current_user
 from models.user import User
 
@@ -35,6 +36,10 @@ class IngestUrlRequest(BaseModel):
     content_type: str = "article"  # article, podcast
 
 
+class BulkManifestRequest(BaseModel):
+    keys: List[str]  # Storage keys under raw/{user_id}/ or uploads/{user_id}/
+
+
 class DocumentResponse(BaseModel):
     id: str
     filename: str
@@ -235,12 +240,12 @@ async def delete_document(
     current_user: User = Depends(get_admin_user)
 ):
     """
-    Delete a document and all its chunks
+    Delete a document, its chunks and its stored files
     """
     try:
         import sys
         sys.path.append('/app/../knowledge')
-        from knowledge.models import Document, Chunk, Embedding
+        from knowledge.models import Document
 
         # Verify document belongs to user
         doc_query = select(Document).where(
@@ -256,26 +261,13 @@ async def delete_document(
                 detail="Document not found"
             )
 
-        # Delete embeddings for chunks
-        chunk_ids_query = select(Chunk.id).where(Chunk.doc_id == doc_id)
-        chunk_ids_result = await db.execute(chunk_ids_query)
-        chunk_ids = [row[0] for row in chunk_ids_result.all()]
-
-        if chunk_ids:
-            # Delete embeddings
-            from sqlalchemy import delete as sql_delete
-            await db.execute(
-                sql_delete(Embedding).where(Embedding.chunk_id.in_(chunk_ids))
+        # Knowledge service deletes rows and stored objects together
+        async with httpx.AsyncClient(timeout=60.0) as client:
+            response = await client.delete(
+                f"{settings.KNOWLEDGE_SERVICE_URL}/documents/{doc_id}",
+                params={"user_id": current_user.id}
             )
-
-        # Delete chunks
-        await db.execute(
-            sql_delete(Chunk).where(Chunk.doc_id == doc_id)
-        )
-
-        # Delete document
-        await db.delete(doc)
-        await db.commit()
+            response.raise_for_status()
 
         return {"message": "Document deleted successfully"}
 
@@ -283,7 +275,6 @@ async def delete_document(
         raise
     except Exception as e:
         logger.error(f"Error deleting document: {str(e)}")
-        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to delete document: {str(e)}"
@@ -342,14 +333,77 @@ async def ingest_url(
         )
 
 
+@router.post("/ingest/bulk")
+async def ingest_bulk(
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_admin_user)
+):
+    """
+    Ingest a zip or tar archive of documents
+    """
+    try:
+        # Stream the archive through from the upload spool
+        async with httpx.AsyncClient(timeout=httpx.Timeout(600.0, write=None)) as client:
+            response = await client.post(
+                f"{settings.KNOWLEDGE_SERVICE_URL}/ingest/bulk",
+                files={"file": (file.filename, file.file, file.content_type)},
+                data={"user_id": current_user.id}
+            )
+
+            if response.status_code == 400:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=response.json().get("detail", "Invalid archive")
+                )
+            response.raise_for_status()
+
+            return response.json()
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error bulk ingesting archive: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to ingest archive: {str(e)}"
+        )
+
+
+@router.post("/ingest/bulk/manifest")
+async def ingest_bulk_manifest(
+    request: BulkManifestRequest,
+    current_user: User = Depends(get_admin_user)
+):
+    """
+    Ingest documents already uploaded to storage, listed by key
+    """
+    try:
+        async with httpx.AsyncClient(timeout=600.0) as client:
+            response = await client.post(
+                f"{settings.KNOWLEDGE_SERVICE_URL}/ingest/bulk/manifest",
+                json={"user_id": current_user.id, "keys": request.keys}
+            )
+            response.raise_for_status()
+
+            return response.json()
+
+    except Exception as e:
+        logger.error(f"Error bulk ingesting manifest: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to ingest manifest: {str(e)}"
+        )
+
+
 @router.post("/documents/{doc_id}/reprocess")
 async def reprocess_document(
     doc_id: str,
+    reparse: bool = False,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_admin_user)
 ):
     """
-    Reprocess a document (re-chunk and re-embed)
+    Reprocess a document (re-chunk and re-embed); reparse re-extracts it
     """
     try:
         import sys
@@ -370,13 +424,19 @@ async def reprocess_document(
                 detail="Document not found"
             )
 
-        # TODO: Trigger reprocessing task
-        # For now, just return success
+        # Knowledge service re-chunks and re-embeds only changed chunks
+        async with httpx.AsyncClient(timeout=60.0) as client:
+            response = await client.post(
+                f"{settings.KNOWLEDGE_SERVICE_URL}/documents/{doc_id}/reprocess",
+                params={"user_id": current_user.id, "reparse": reparse}
+            )
+            response.raise_for_status()
+            result = response.json()
 
         return {
             "message": "Document reprocessing started",
             "doc_id": doc_id,
-            "status": "processing"
+            "status": result.get("status", "processing")
         }
 
     except HTTPException:
@@ -37,29 +37,28 @@ async def upload_document(
     # Generate doc ID
     doc_id = str(uuid.uuid4())
 
-    # Read file content
-    content = await file.read()
-
-    # Forward to Knowledge Service
+    # Forward to Knowledge Service, streaming from the upload spool
     try:
         async with httpx.AsyncClient() as client:
-            files = {"file": (file.filename, content, file.content_type)}
+            files = {"file": (file.filename, file.file, file.content_type)}
             data = {"user_id": current_user.id, "doc_id": doc_id}
 
             response = await client.post(
                 f"{settings.KNOWLEDGE_SERVICE_URL}/ingest",
                 files=files,
                 data=data,
-                timeout=60.0
+                timeout=httpx.Timeout(60.0, write=None)  # Large files take a while to send
             )
 
-            if response.status_code != 200:
+            # 202: stored and queued for the ingestion workers
+            if response.status_code not in (200, 202):
                 raise HTTPException(status_code=500, detail="Upload to knowledge service failed")
 
             result = response.json()
 
+            # Dedup may resolve to an already ingested document
             return {
-                "doc_id": doc_id,
+                "doc_id": result.get("doc_id", doc_id),
                 "filename": file.filename,
                 "status": result.get("status", "processing"),
                 "message": "Document uploaded successfully and queued for processing"
@@ -0,0 +1,100 @@
+"""
+Benchmark: ORM inserts vs binary COPY for chunks + embeddings
+Run from services/knowledge against a database with the knowledge schema:
+
+    python benchmarks/bench_bulk_writer.py --rows 5000
+
+Each run happens in a transaction that is rolled back, so nothing is kept.
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database import AsyncSessionLocal, engine  # noqa: E402
+from models import Chunk, Embedding  # noqa: E402
+from services.bulk_writer import BulkWriter  # noqa: E402
+
+DIMENSIONS = 1024
+
+
+def make_rows(count: int):
+    """Synthetic chunks and vectors shaped like real ingest output"""
+    chunks = [
+        {
+            "text": f"Chunk {i} " + "lorem ipsum dolor sit amet " * 18,
+            "position": i,
+            "metadata": {"source": "bench.pdf", "page": i // 4 + 1, "chunk_index": i}
+        }
+        for i in range(count)
+    ]
+    vectors = [[random.random() for _ in range(DIMENSIONS)] for _ in range(count)]
+    return chunks, vectors
+
+
+async def bench_orm(chunks, vectors, batch_size: int) -> float:
+    """Previous ingest path: one Chunk and one Embedding object per row"""
+    doc_id = str(uuid.uuid4())
+    async with AsyncSessionLocal() as db:
+        start = time.perf_counter()
+        for i in range(0, len(chunks), batch_size):
+            records = []
+            for chunk_data in chunks[i:i + batch_size]:
+                chunk = Chunk(
+                    doc_id=doc_id,
+                    user_id="bench",
+                    text=chunk_data["text"],
+                    position=chunk_data["position"],
+                    chunk_metadata=chunk_data["metadata"]
+                )
+                db.add(chunk)
+                records.append(chunk)
+            await db.flush()
+
+            for chunk, vector in zip(records, vectors[i:i + batch_size]):
+                db.add(Embedding(chunk_id=chunk.id, vector=vector, doc_id=doc_id, user_id="bench"))
+            await db.flush()
+        elapsed = time.perf_counter() - start
+        await db.rollback()
+    return elapsed
+
+
+async def bench_copy(chunks, vectors, batch_size: int) -> float:
+    """BulkWriter path: two binary COPYs per batch"""
+    doc_id = str(uuid.uuid4())
+    async with AsyncSessionLocal() as db:
+        writer = BulkWriter(db)
+        start = time.perf_counter()
+        for i in range(0, len(chunks), batch_size):
+            await writer.write_batch(doc_id, "bench", chunks[i:i + batch_size], vectors[i:i + batch_size])
+        elapsed = time.perf_counter() - start
+        await db.rollback()
+    return elapsed
+
+
+async def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--rows", type=int, default=5000)
+    arg_parser.add_argument("--batch-size", type=int, default=32)
+    args = arg_parser.parse_args()
+
+    chunks, vectors = make_rows(args.rows)
+
+    orm_seconds = await bench_orm(chunks, vectors, args.batch_size)
+    copy_seconds = await bench_copy(chunks, vectors, args.batch_size)
+
+    print(f"rows={args.rows} batch_size={args.batch_size}")
+    print(f"  ORM  : {orm_seconds:8.2f}s  {args.rows / orm_seconds:10.0f} rows/sec")
+    print(f"  COPY : {copy_seconds:8.2f}s  {args.rows / copy_seconds:10.0f} rows/sec")
+    print(f"  speedup: {orm_seconds / copy_seconds:.1f}x")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+"""
+Benchmark: langchain RecursiveCharacterTextSplitter vs OffsetTextSplitter
+Run from services/knowledge, on text files or a generated corpus:
+
+    python benchmarks/bench_chunker.py /path/to/file.txt ... --repeat 3
+    python benchmarks/bench_chunker.py --generate-mb 50
+
+Both splitters use CHUNK_SIZE/CHUNK_OVERLAP-style settings (overridable
+with --chunk-size/--chunk-overlap). Reports MB/sec, chunks/sec and peak
+traced memory per splitter, and whether the chunk texts are identical.
+"""
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter  # noqa: E402
+
+from services.text_splitter import DEFAULT_SEPARATORS, OffsetTextSplitter  # noqa: E402
+
+_WORDS = ["the", "model", "career", "mentor", "embedding", "offset", "chunk", "document",
+          "retrieval", "a", "of", "and", "to", "interview", "résumé", "pipeline"]
+
+
+def generate(megabytes: float, seed: int = 0) -> str:
+    """Prose-like text: sentences, paragraphs and the odd long line"""
+    rng = random.Random(seed)
+    target = int(megabytes * 1024 * 1024)
+    paragraphs = []
+    size = 0
+    while size < target:
+        sentences = [
+            " ".join(rng.choice(_WORDS) for _ in range(rng.randint(4, 30))).capitalize()
+            for _ in range(rng.randint(1, 12))
+        ]
+        paragraph = ". ".join(sentences) + "."
+        if rng.random() < 0.2:
+            paragraph = "\n".join(paragraph.split(". "))
+        paragraphs.append(paragraph)
+        size += len(paragraph) + 2
+    return "\n\n".join(paragraphs)
+
+
+def bench(split, text: str, repeat: int):
+    """Best-of-repeat wall time, peak traced memory and the chunks of the last run"""
+    best = float("inf")
+    chunks = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = split(text)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    split(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return best, peak, chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("files", nargs="*", type=Path, help="Text files to split (concatenated)")
+    parser.add_argument("--generate-mb", type=float, default=0, help="Generate this many MB instead")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per splitter (best is reported)")
+    args = parser.parse_args()
+
+    if args.generate_mb:
+        text = generate(args.generate_mb)
+    elif args.files:
+        text = "\n\n".join(path.read_text(encoding="utf-8", errors="replace") for path in args.files)
+    else:
+        sys.exit("Pass text files or --generate-mb")
+
+    megabytes = len(text.encode("utf-8")) / (1024 * 1024)
+    print(f"{len(text)} characters, {megabytes:.1f} MB, chunk {args.chunk_size}/{args.chunk_overlap}")
+
+    langchain = RecursiveCharacterTextSplitter(
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap,
+        length_function=len,
+        separators=DEFAULT_SEPARATORS
+    )
+    native = OffsetTextSplitter(args.chunk_size, args.chunk_overlap)
+
+    splitters = {
+        "langchain": langchain.split_text,
+        "offset": lambda source: [chunk for _, _, chunk in native.split(source)],
+    }
+
+    results = {}
+    for name, split in splitters.items():
+        elapsed, peak, chunks = bench(split, text, args.repeat)
+        results[name] = chunks
+        print(
+            f"{name:9} {elapsed:8.3f}s  {megabytes / elapsed:7.2f} MB/s  "
+            f"{len(chunks) / elapsed:10.0f} chunks/s  peak {peak / (1024 * 1024):7.1f} MB"
+        )
+
+    identical = results["langchain"] == results["offset"]
+    print(f"Identical chunks: {identical} ({len(results['langchain'])} vs {len(results['offset'])})")
+
+
+if __name__ == "__main__":
+    main()
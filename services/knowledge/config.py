@@ -3,6 +3,7 @@ Configuration for Knowledge Service
 """
 from pydantic_settings import BaseSettings
 import os
+from typing import Dict
 
 
 class Settings(BaseSettings):
@@ -12,14 +13,57 @@ class Settings(BaseSettings):
     # Redis
     REDIS_URL: str
 
+    # Celery (background ingestion); empty means use REDIS_URL
+    CELERY_BROKER_URL: str = ""
+    CELERY_RESULT_BACKEND: str = ""
+
     # S3/MinIO
     S3_ENDPOINT: str = ""
     S3_ACCESS_KEY: str
     S3_SECRET_KEY: str
     S3_REGION: str = "us-east-1"
+    S3_MULTIPART_THRESHOLD: int = 16 * 1024 * 1024
+    S3_MULTIPART_CHUNK_BYTES: int = 8 * 1024 * 1024
+    S3_MULTIPART_CONCURRENCY: int = 4
+
+    # Object storage: "s3" or "local" (filesystem, for tests)
+    STORAGE_BACKEND: str = "s3"
+    STORAGE_LOCAL_PATH: str = "/data/storage"
+    STORAGE_MAX_WORKERS: int = 8  # Threads running blocking S3 calls
 
     # Inference Service
     INFERENCE_SERVICE_URL: str
+    EMBEDDING_BACKEND: str = "remote"  # remote (inference service) or local (in-process ONNX on CPU)
+    EMBEDDING_MODEL: str = "main"
+    EMBEDDING_BATCH_SIZE: int = 10  # Initial texts per /v1/embeddings request (adapts)
+    EMBEDDING_BATCH_MIN: int = 1
+    EMBEDDING_BATCH_MAX: int = 128
+    EMBEDDING_BATCH_BUDGET: int = 32000  # Max total size per request, in CHUNK_SIZE_UNIT
+    EMBEDDING_MAX_CONCURRENCY: int = 8  # Most in-flight requests per process (and pooled connections)
+    QUERY_EMBEDDING_MAX_CONCURRENCY: int = 2  # Search query requests, on their own limiter and connections
+    EMBEDDING_TARGET_LATENCY_SECONDS: float = 2.0  # Slower responses shrink batches
+    EMBEDDING_MAX_RETRIES: int = 5  # On 429/5xx and connection errors
+    EMBEDDING_BACKOFF_BASE_SECONDS: float = 0.5
+    EMBEDDING_BACKOFF_MAX_SECONDS: float = 30.0
+    EMBEDDING_LOCAL_MODEL_PATH: str = "/models/bge-m3-onnx"  # Directory with model.onnx and tokenizer.json
+    EMBEDDING_LOCAL_MODEL_ID: str = ""  # Embedding cache identity; defaults to the model file's name, size and mtime
+    EMBEDDING_LOCAL_BATCH_SIZE: int = 16
+    EMBEDDING_LOCAL_MAX_LENGTH: int = 512  # Longer inputs are truncated, in tokens
+    EMBEDDING_LOCAL_THREADS: int = 2  # Batches run concurrently; cores are split between them
+    EMBEDDING_LOCAL_POOLING: str = "cls"  # cls (BGE) or mean, for models that output token embeddings
+    QUERY_BATCH_WINDOW_MS: float = 3.0  # How long a search query waits for others to embed with
+    QUERY_BATCH_MAX_ITEMS: int = 32  # Send early once this many queries are waiting
+    SEARCH_CACHE_ENABLED: bool = True  # Query embedding and result caches
+    QUERY_EMBEDDING_CACHE_MEMORY_ITEMS: int = 2000  # Query embeddings in their own in-process LRU
+    SEARCH_RESULT_CACHE_TTL_SECONDS: int = 600  # Also bounds staleness if an invalidation fails
+    INFERENCE_HTTP2: bool = True  # Negotiated over TLS; http:// stays on HTTP/1.1 keep-alive
+    INFERENCE_TIMEOUT_SECONDS: float = 60.0
+
+    # Embedding cache (in-process LRU + Redis)
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_MEMORY_ITEMS: int = 10000
+    EMBEDDING_CACHE_TTL_SECONDS: int = 30 * 24 * 3600
+    EMBEDDING_CACHE_DTYPE: str = "float16"  # float16 or float32
 
     # Retrieval config
     RETRIEVAL_TOP_K: int = 50
@@ -27,6 +71,47 @@ class Settings(BaseSettings):
     BM25_WEIGHT: float = 0.5
     CHUNK_SIZE: int = 512
     CHUNK_OVERLAP: int = 64
+    CHUNK_SIZE_UNIT: str = "chars"  # "chars" or "tokens" (CHUNK_SIZE is then the model window)
+    TOKENIZER_PATH: str = ""  # Local tokenizer.json of the embedding model
+    TOKENIZER_CACHE_ITEMS: int = 100000  # Token counts kept in the LRU
+    CHUNK_STRATEGY: str = "recursive"  # "recursive" or "section" (split at headings)
+    CHUNK_STRATEGY_BY_FORMAT: Dict[str, str] = {
+        "article": "section",
+        "markdown": "section",
+        "docx": "section",
+        "pptx": "section",
+    }  # Parser "format" -> strategy, overriding CHUNK_STRATEGY
+    CHUNK_SECTION_MIN_SIZE: int = 128  # Smaller sections merge into the next one
+
+    # Ingestion pipeline
+    INGEST_ASYNC: bool = True  # Hand /ingest off to Celery workers
+    INGEST_BATCH_SIZE: int = 32  # Chunks per embed/write batch
+    INGEST_QUEUE_SIZE: int = 4  # Batches buffered between stages
+    INGEST_MAX_PARSES: int = 0  # Concurrent parses per process; 0 means PARSE_WORKERS
+    INGEST_MAX_EMBED_BATCHES: int = 8  # In-flight embedding batches per process
+    BULK_INGEST_CONCURRENCY: int = 16  # Archive members processed at once
+
+    # Parsing (process pool; 0 workers parses inline)
+    PARSE_WORKERS: int = 2
+    PARSE_TIMEOUT_SECONDS: float = 300.0
+    PARSE_MAX_BYTES: int = 100 * 1024 * 1024
+    PDF_PAGES_PER_TASK: int = 8  # Page range handed to one worker
+    PDF_MAX_INFLIGHT_RANGES: int = 0  # 0 means 2 x PARSE_WORKERS
+    CLEAN_TEXT_SPOOL_BYTES: int = 8 * 1024 * 1024  # Clean text spills to disk past this
+    HTML_PARSER_BACKEND: str = "lxml"  # "lxml" (single pass) or "bs4"
+    PARSE_CACHE_ENABLED: bool = True  # Reuse stored parse results by content hash
+
+    # OCR for images and scanned PDF pages
+    OCR_ENABLED: bool = True
+    OCR_LANG: str = "eng"  # Tesseract language(s), e.g. "eng+deu"
+    OCR_DPI: int = 300  # Render resolution for scanned PDF pages
+    OCR_MIN_TEXT_CHARS: int = 32  # PDF pages with less text are OCR'd
+    OCR_PAGES_PER_TASK: int = 1  # Scanned pages/image frames handed to one worker
+    OCR_CACHE_TTL_SECONDS: int = 30 * 24 * 3600
+
+    # Content-addressed dedup
+    DEDUP_ENABLED: bool = True
+    DEDUP_CROSS_TENANT: bool = False  # Reuse other users' chunks/embeddings
 
     # Observability
     OTLP_ENDPOINT: str = ""
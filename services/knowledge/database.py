@@ -22,6 +22,50 @@ AsyncSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_co
 # Base class for models
 Base = declarative_base()
 
+# Schema changes for tables that create_all() will not alter in place.
+# Every statement must be idempotent and cheap; they run on each startup.
+MIGRATIONS = [
+    "ALTER TABLE knowledge.documents ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)",
+    "CREATE INDEX IF NOT EXISTS ix_documents_user_hash ON knowledge.documents (user_id, content_hash)",
+    "CREATE INDEX IF NOT EXISTS ix_documents_content_hash ON knowledge.documents (content_hash)",
+    "ALTER TABLE knowledge.chunks ADD COLUMN IF NOT EXISTS section_id INTEGER",
+    "ALTER TABLE knowledge.chunks ADD COLUMN IF NOT EXISTS section_path TEXT",
+    "CREATE INDEX IF NOT EXISTS ix_chunks_doc_section ON knowledge.chunks (doc_id, section_id)",
+    "CREATE INDEX IF NOT EXISTS ix_chunks_user_section_path ON knowledge.chunks (user_id, section_path text_pattern_ops)",
+    """
+    CREATE TABLE IF NOT EXISTS knowledge.schema_migrations (
+        name TEXT PRIMARY KEY,
+        applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+    """,
+]
+
+# Data migrations that scan or rewrite whole tables. Each runs once, ever:
+# it is recorded in knowledge.schema_migrations, and replicas starting
+# together serialize on an advisory lock so only the first one runs it.
+ONE_TIME_MIGRATIONS = [
+    # Chunks used to carry a copy of their document's metadata; keep only the
+    # chunk-specific keys
+    (
+        "0001_chunk_metadata_without_document_keys",
+        """
+        UPDATE knowledge.chunks c
+        SET metadata = (
+            SELECT COALESCE(jsonb_object_agg(e.key, e.value), '{}'::jsonb)::json
+            FROM jsonb_each(c.metadata::jsonb) e
+            WHERE e.key <> 'source'
+              AND e.value IS DISTINCT FROM d.metadata::jsonb -> e.key
+        )
+        FROM knowledge.documents d
+        WHERE d.id = c.doc_id
+          AND jsonb_exists(c.metadata::jsonb, 'source')
+        """
+    ),
+]
+
+# pg_advisory_xact_lock key for ONE_TIME_MIGRATIONS
+_MIGRATION_LOCK = 7_361_204_118
+
 
 async def get_db():
     """Dependency to get database session"""
@@ -38,6 +82,22 @@ async def init_db():
         async with engine.begin() as conn:
             # Create all tables
             await conn.run_sync(Base.metadata.create_all)
+
+            # Bring existing tables up to date
+            for statement in MIGRATIONS:
+                await conn.execute(text(statement))
+
+            await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _MIGRATION_LOCK})
+            applied = set((await conn.execute(text("SELECT name FROM knowledge.schema_migrations"))).scalars())
+            for name, statement in ONE_TIME_MIGRATIONS:
+                if name in applied:
+                    continue
+                logger.info(f"Applying migration {name}")
+                await conn.execute(text(statement))
+                await conn.execute(
+                    text("INSERT INTO knowledge.schema_migrations (name) VALUES (:name)"),
+                    {"name": name}
+                )
         logger.info("Knowledge database initialized")
     except Exception as e:
         logger.error(f"Failed to initialize database: {e}")
@@ -4,47 +4,51 @@ Document ingestion, processing, and retrieval
 """
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 from pydantic import BaseModel
 from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func, delete, or_
+import asyncio
 import logging
 import uuid
-import boto3
-from botocore.client import Config
 
 from config import settings
 from database import get_db, init_db
 from models import Document, Chunk, Embedding
 from services.parser import DocumentParser
-from services.chunker import TextChunker
-from services.embedder import EmbeddingService
+from services.parse_pool import parse_pool, DocumentTooLargeError
+from services.parse_cache import parse_cache
 from services.search import SearchService
+from services.search_cache import bump_generation
+from services.pipeline import IngestionPipeline
+from services.storage import storage
+from services.embedding_backends import close_embedding_backend, get_embedding_backend
+from services.embedding_cache import close_redis
+from services.jobs import enqueue_ingest, enqueue_reprocess
+from services.reprocess import ReprocessService
+from services.bulk_ingest import BulkIngestService, InvalidArchiveError
+from services.dedup import DedupService, content_hash, file_content_hash
 
 logging.basicConfig(level=settings.LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
 
-# Initialize S3 client
-s3_client = boto3.client(
-    "s3",
-    endpoint_url=settings.S3_ENDPOINT if settings.S3_ENDPOINT else None,
-    aws_access_key_id=settings.S3_ACCESS_KEY,
-    aws_secret_access_key=settings.S3_SECRET_KEY,
-    region_name=settings.S3_REGION,
-    config=Config(signature_version="s3v4")
-)
-
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan"""
     logger.info("Starting Knowledge Service...")
     await init_db()
+    parse_pool.start()
+    get_embedding_backend().start()
     logger.info("Knowledge Service started")
     yield
     logger.info("Shutting down Knowledge Service...")
+    parse_pool.shutdown()
+    storage.close()
+    await close_embedding_backend()
+    await close_redis()
 
 
 app = FastAPI(
@@ -69,6 +73,8 @@ class ChunkResponse(BaseModel):
     text: str
     source: str
     score: float
+    section_id: Optional[int] = None
+    section_path: Optional[str] = None
 
 
 class SearchResponse(BaseModel):
@@ -83,12 +89,34 @@ class IngestUrlRequest(BaseModel):
     user_id: str
 
 
+class BulkManifestRequest(BaseModel):
+    user_id: str
+    keys: List[str]  # The user's object keys: raw/{user_id}/... or uploads/{user_id}/...
+
+
+def duplicate_response(doc: Document) -> dict:
+    """Ingest response pointing at an existing document with the same content"""
+    return {
+        "doc_id": doc.id,
+        "filename": doc.filename,
+        "status": doc.status,
+        "duplicate": True,
+        "message": "Document content already ingested"
+    }
+
+
 @app.get("/health")
 async def health_check():
     """Health check"""
     return {"status": "healthy", "service": "knowledge-service"}
 
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics (embedding cache hit/miss counters, ...)"""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.post("/ingest")
 async def ingest_document(
     file: UploadFile = File(...),
@@ -98,104 +126,112 @@ async def ingest_document(
 ):
     """
     Ingest document:
-    1. Parse document
-    2. Save to S3
-    3. Chunk text
-    4. Generate embeddings
-    5. Store in database
+    1. With INGEST_ASYNC, stream the raw file to storage, queue
+       parse/chunk/embed on the workers and return 202
+    2. Otherwise store the raw file while parsing, chunking, embedding and
+       storing through the staged pipeline
     """
     logger.info(f"Ingesting document {doc_id} for user {user_id}")
 
     try:
-        # Read file content
-        content = await file.read()
-
-        # Parse document
-        parser = DocumentParser()
-        parsed = await parser.parse(content, file.content_type, file.filename)
-
-        # Save raw file to S3
-        raw_path = f"raw/{user_id}/{doc_id}/{file.filename}"
-        s3_client.put_object(
-            Bucket="career-mentor",
-            Key=raw_path,
-            Body=content,
-            ContentType=file.content_type
-        )
-
-        # Save processed text to S3
-        clean_path = f"clean/{user_id}/{doc_id}/content.md"
-        s3_client.put_object(
-            Bucket="career-mentor",
-            Key=clean_path,
-            Body=parsed["text"].encode("utf-8"),
-            ContentType="text/markdown"
-        )
+        # The upload is spooled to disk by the multipart parser; hash it in
+        # chunks rather than reading it into memory
+        digest, size = await asyncio.to_thread(file_content_hash, file.file)
+        parse_pool.check_size(size)
+
+        # Short-circuit re-uploads of content we already have
+        dedup = DedupService()
+
+        existing = await dedup.find_existing(db, user_id, digest)
+        if existing:
+            logger.info(f"Document {doc_id} duplicates {existing.id}, skipping ingest")
+            return duplicate_response(existing)
+
+        shared = await dedup.find_shared(db, digest)
+        if shared:
+            doc = await dedup.clone_document(db, shared, doc_id, user_id, file.filename)
+            await db.commit()
+            await bump_generation(user_id)
+            return duplicate_response(doc)
 
         # Create document record
+        raw_path = f"raw/{user_id}/{doc_id}/{file.filename}"
         doc = Document(
             id=doc_id,
             user_id=user_id,
             filename=file.filename,
             content_type=file.content_type,
+            content_hash=digest,
             raw_path=raw_path,
-            clean_path=clean_path,
             status="processing",
-            doc_metadata=parsed["metadata"]
+            progress=0
         )
         db.add(doc)
-        await db.flush()
 
-        # Chunk text
-        chunker = TextChunker()
-        chunks = await chunker.chunk(parsed["text"], parsed["metadata"])
-
-        # Store chunks
-        chunk_records = []
-        for chunk_data in chunks:
-            chunk = Chunk(
-                doc_id=doc_id,
-                user_id=user_id,
-                text=chunk_data["text"],
-                position=chunk_data["position"],
-                chunk_metadata=chunk_data["metadata"]
+        if settings.INGEST_ASYNC:
+            # Workers report progress on the document; callers poll status
+            await storage.put_file(raw_path, file.file, file.content_type)
+            await db.commit()
+            await enqueue_ingest(doc_id, user_id)
+
+            return JSONResponse(
+                status_code=202,
+                content={
+                    "doc_id": doc_id,
+                    "filename": file.filename,
+                    "status": "processing",
+                    "message": "Document queued for processing"
+                }
             )
-            db.add(chunk)
-            chunk_records.append(chunk)
 
-        await db.flush()
+        await file.seek(0)
+        content = await file.read()
 
-        # Generate embeddings
-        embedder = EmbeddingService()
-        chunk_texts = [c.text for c in chunk_records]
-        embeddings = await embedder.embed_texts(chunk_texts)
-
-        # Store embeddings
-        for chunk, embedding_vector in zip(chunk_records, embeddings):
-            embedding = Embedding(
-                chunk_id=chunk.id,
-                vector=embedding_vector,
-                doc_id=doc_id,
-                user_id=user_id
-            )
-            db.add(embedding)
+        # The raw write overlaps parsing and embedding instead of adding a
+        # storage round trip up front
+        raw_upload = asyncio.create_task(
+            storage.put_bytes(raw_path, content, file.content_type)
+        )
+
+        try:
+            # Parse document in the process pool (or reuse a cached parse)
+            parsed = await parse_cache.parse(digest, file.content_type, file.filename, content=content)
+
+            clean_path = f"clean/{user_id}/{doc_id}/content.md"
+            doc.clean_path = clean_path
+            doc.doc_metadata = parsed["metadata"]
+            await db.flush()
+
+            # Chunk, embed and store
+            pipeline = IngestionPipeline(db, doc_id, user_id, parsed["metadata"].get("format"))
+            result = await pipeline.run(parsed["segments"])
+
+            # Clean and raw writes run concurrently
+            await asyncio.gather(raw_upload, result["text"].upload(clean_path))
+        except BaseException:
+            raw_upload.cancel()
+            raise
 
         # Update document status
         doc.status = "ready"
         doc.progress = 100
 
         await db.commit()
+        await bump_generation(user_id)
 
-        logger.info(f"Document {doc_id} processed successfully: {len(chunk_records)} chunks")
+        logger.info(f"Document {doc_id} processed successfully: {result['chunks']} chunks")
 
         return {
             "doc_id": doc_id,
             "filename": file.filename,
             "status": "ready",
-            "chunks": len(chunk_records),
+            "chunks": result["chunks"],
             "message": "Document processed successfully"
         }
 
+    except DocumentTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
     except Exception as e:
         logger.error(f"Failed to ingest document {doc_id}: {e}")
         await db.rollback()
@@ -214,6 +250,43 @@ async def ingest_document(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/ingest/bulk")
+async def ingest_bulk(
+    file: UploadFile = File(...),
+    user_id: str = Form(...)
+):
+    """
+    Ingest every file in a zip or tar (.tar, .tar.gz, .tar.bz2, .tar.xz) archive
+
+    Members are expanded as a stream and ingested concurrently; the response
+    reports a result per file.
+    """
+    logger.info(f"Bulk ingesting {file.filename} for user {user_id}")
+
+    try:
+        return await BulkIngestService(user_id).ingest_archive(file.file, file.filename)
+
+    except InvalidArchiveError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    except Exception as e:
+        logger.error(f"Bulk ingest of {file.filename} failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/ingest/bulk/manifest")
+async def ingest_bulk_manifest(request: BulkManifestRequest):
+    """Ingest objects already uploaded to storage, listed by key"""
+    logger.info(f"Bulk ingesting {len(request.keys)} keys for user {request.user_id}")
+
+    try:
+        return await BulkIngestService(request.user_id).ingest_keys(request.keys)
+
+    except Exception as e:
+        logger.error(f"Bulk manifest ingest failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/documents/list")
 async def list_documents(
     limit: int = 50,
@@ -316,6 +389,127 @@ async def get_document_status(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.delete("/documents/{doc_id}")
+async def delete_document(
+    doc_id: str,
+    user_id: str,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Delete a document, its chunks and embeddings, and its stored objects
+
+    Objects still referenced by another document (dedup clones share them)
+    are kept.
+    """
+    try:
+        result = await db.execute(
+            select(Document).where(
+                Document.id == doc_id,
+                Document.user_id == user_id
+            )
+        )
+        doc = result.scalar_one_or_none()
+
+        if not doc:
+            raise HTTPException(status_code=404, detail="Document not found")
+
+        keys = {
+            path for path in (doc.raw_path, doc.clean_path)
+            if path and not path.startswith(("http://", "https://"))
+        }
+        if keys:
+            shared = await db.execute(
+                select(Document.raw_path, Document.clean_path).where(
+                    Document.id != doc_id,
+                    or_(Document.raw_path.in_(keys), Document.clean_path.in_(keys))
+                )
+            )
+            for raw_path, clean_path in shared.all():
+                keys.discard(raw_path)
+                keys.discard(clean_path)
+
+        await db.execute(delete(Embedding).where(Embedding.doc_id == doc_id))
+        await db.execute(delete(Chunk).where(Chunk.doc_id == doc_id))
+        await db.delete(doc)
+        await db.commit()
+        await bump_generation(user_id)
+
+        # Rows are gone first, so a storage failure only leaves orphaned objects
+        deleted = await storage.delete_many(sorted(keys)) if keys else 0
+
+        return {
+            "doc_id": doc_id,
+            "objects_deleted": deleted,
+            "message": "Document deleted successfully"
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to delete document {doc_id}: {e}")
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/documents/{doc_id}/reprocess")
+async def reprocess_document(
+    doc_id: str,
+    user_id: str,
+    reparse: bool = False,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Re-chunk a document, re-embedding only changed chunks
+
+    The cached parse is reused unless reparse is set, which re-runs
+    extraction on the raw file (e.g. to pick up a parser fix).
+    """
+    try:
+        result = await db.execute(
+            select(Document).where(
+                Document.id == doc_id,
+                Document.user_id == user_id
+            )
+        )
+        doc = result.scalar_one_or_none()
+
+        if not doc:
+            raise HTTPException(status_code=404, detail="Document not found")
+
+        doc.status = "processing"
+
+        if settings.INGEST_ASYNC:
+            await db.commit()
+            await enqueue_reprocess(doc_id, reparse)
+
+            return JSONResponse(
+                status_code=202,
+                content={
+                    "doc_id": doc_id,
+                    "status": "processing",
+                    "message": "Document reprocessing started"
+                }
+            )
+
+        stats = await ReprocessService().reprocess(db, doc, reparse)
+        await db.commit()
+        await bump_generation(user_id)
+
+        return {
+            "doc_id": doc_id,
+            "status": "ready",
+            **stats,
+            "message": "Document reprocessed successfully"
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to reprocess document {doc_id}: {e}")
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/ingest/url")
 async def ingest_url(
     request: IngestUrlRequest,
@@ -325,27 +519,37 @@ async def ingest_url(
     Ingest content from URL (article or podcast):
     1. Parse HTML/content
     2. Save to S3
-    3. Chunk text
-    4. Generate embeddings
-    5. Store in database
+    3. Chunk, embed and store batches through the staged pipeline
     """
     logger.info(f"Ingesting URL content for user {request.user_id}: {request.url}")
 
     doc_id = str(uuid.uuid4())
 
     try:
-        # Parse HTML content
-        parser = DocumentParser()
-        parsed = await parser.parse_html(request.content, request.url)
+        # Short-circuit re-ingests of the same page content
+        digest = content_hash(request.content.encode("utf-8"))
+        dedup = DedupService()
+
+        existing = await dedup.find_existing(db, request.user_id, digest)
+        if existing:
+            logger.info(f"URL content duplicates document {existing.id}, skipping ingest")
+            return duplicate_response(existing)
+
+        shared = await dedup.find_shared(db, digest)
+        if shared:
+            # The title comes from the (identical) content; the URL is the caller's
+            filename = (shared.doc_metadata or {}).get("title") or request.url.split("/")[-1]
+            doc = await dedup.clone_document(db, shared, doc_id, request.user_id, filename, url=request.url)
+            await db.commit()
+            await bump_generation(request.user_id)
+            return duplicate_response(doc)
+
+        # Parse HTML content in the process pool
+        parsed = await parse_pool.parse_html(request.content, request.url)
 
         # Save processed text to S3
         clean_path = f"clean/{request.user_id}/{doc_id}/content.md"
-        s3_client.put_object(
-            Bucket="career-mentor",
-            Key=clean_path,
-            Body=parsed["text"].encode("utf-8"),
-            ContentType="text/markdown"
-        )
+        await storage.put_bytes(clean_path, parsed["text"].encode("utf-8"), "text/markdown")
 
         # Create document record
         filename = parsed["metadata"].get("title", request.url.split("/")[-1])
@@ -354,6 +558,7 @@ async def ingest_url(
             user_id=request.user_id,
             filename=filename,
             content_type=request.content_type,
+            content_hash=digest,
             raw_path=request.url,  # Store original URL
             clean_path=clean_path,
             status="processing",
@@ -362,56 +567,33 @@ async def ingest_url(
         db.add(doc)
         await db.flush()
 
-        # Chunk text
-        chunker = TextChunker()
-        chunks = await chunker.chunk(parsed["text"], parsed["metadata"])
-
-        # Store chunks
-        chunk_records = []
-        for chunk_data in chunks:
-            chunk = Chunk(
-                doc_id=doc_id,
-                user_id=request.user_id,
-                text=chunk_data["text"],
-                position=chunk_data["position"],
-                chunk_metadata=chunk_data["metadata"]
-            )
-            db.add(chunk)
-            chunk_records.append(chunk)
-
-        await db.flush()
-
-        # Generate embeddings
-        embedder = EmbeddingService()
-        chunk_texts = [c.text for c in chunk_records]
-        embeddings = await embedder.embed_texts(chunk_texts)
-
-        # Store embeddings
-        for chunk, embedding_vector in zip(chunk_records, embeddings):
-            embedding = Embedding(
-                chunk_id=chunk.id,
-                vector=embedding_vector,
-                doc_id=doc_id,
-                user_id=request.user_id
-            )
-            db.add(embedding)
+        # Chunk, embed and store
+        pipeline = IngestionPipeline(db, doc_id, request.user_id, parsed["metadata"].get("format"))
+        segments = parse_cache.record(
+            digest, request.content_type, filename, DocumentParser.as_stream(parsed)
+        )["segments"]
+        result = await pipeline.run(segments)
 
         # Update document status
         doc.status = "ready"
         doc.progress = 100
 
         await db.commit()
+        await bump_generation(request.user_id)
 
-        logger.info(f"URL content {doc_id} processed successfully: {len(chunk_records)} chunks")
+        logger.info(f"URL content {doc_id} processed successfully: {result['chunks']} chunks")
 
         return {
             "doc_id": doc_id,
             "filename": filename,
             "status": "ready",
-            "chunks": len(chunk_records),
+            "chunks": result["chunks"],
             "message": "URL content processed successfully"
         }
 
+    except DocumentTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
     except Exception as e:
         logger.error(f"Failed to ingest URL content: {e}")
         await db.rollback()
@@ -448,7 +630,9 @@ async def search(
                 chunk_id=result["chunk_id"],
                 text=result["text"],
                 source=result["metadata"].get("source", "Unknown"),
-                score=result["score"]
+                score=result["score"],
+                section_id=result.get("section_id"),
+                section_path=result.get("section_path")
             )
             for result in results
         ]
@@ -1,23 +1,31 @@
 """
 Database models for Knowledge Service
 """
-from sqlalchemy import Column, String, DateTime, JSON, Text, Integer, Float
+from sqlalchemy import Column, String, DateTime, JSON, Text, Integer, Float, Index
 from sqlalchemy.sql import func
 from pgvector.sqlalchemy import Vector
 import uuid
 
 from database import Base
 
+# Width of embeddings.vector (BGE-M3); embedding backends must match it
+EMBEDDING_DIMENSION = 1024
+
 
 class Document(Base):
     """Document metadata"""
     __tablename__ = "documents"
-    __table_args__ = {"schema": "knowledge"}
+    __table_args__ = (
+        Index("ix_documents_user_hash", "user_id", "content_hash"),
+        Index("ix_documents_content_hash", "content_hash"),
+        {"schema": "knowledge"},
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(String, nullable=False, index=True)
     filename = Column(String, nullable=False)
     content_type = Column(String)
+    content_hash = Column(String(64))  # SHA-256 of the raw content, for dedup
 
     # Storage paths
     raw_path = Column(String)  # S3 path to raw file
@@ -39,7 +47,14 @@ class Document(Base):
 class Chunk(Base):
     """Text chunks from documents"""
     __tablename__ = "chunks"
-    __table_args__ = {"schema": "knowledge"}
+    __table_args__ = (
+        Index("ix_chunks_doc_section", "doc_id", "section_id"),
+        Index(
+            "ix_chunks_user_section_path", "user_id", "section_path",
+            postgresql_ops={"section_path": "text_pattern_ops"}
+        ),
+        {"schema": "knowledge"},
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     doc_id = Column(String, nullable=False, index=True)
@@ -50,7 +65,12 @@ class Chunk(Base):
     position = Column(Integer)  # Position in document
 
     # Metadata
-    chunk_metadata = Column("metadata", JSON, default=dict)  # heading, section, etc.
+    chunk_metadata = Column("metadata", JSON, default=dict)  # page, offsets, etc.
+
+    # Section chunking: offset of the section in the clean text, and its
+    # heading path ("Heading > Subheading")
+    section_id = Column(Integer)
+    section_path = Column(Text)
 
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -64,8 +84,7 @@ class Embedding(Base):
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     chunk_id = Column(String, nullable=False, index=True, unique=True)
 
-    # Vector (1024 dimensions for BGE-M3)
-    vector = Column(Vector(1024), nullable=False)
+    vector = Column(Vector(EMBEDDING_DIMENSION), nullable=False)
 
     # For quick lookups
     doc_id = Column(String, nullable=False, index=True)
@@ -0,0 +1,168 @@
+"""
+Adaptive batch sizing and concurrency for embedding requests
+
+Batches are packed by count and by total size (EMBEDDING_BATCH_BUDGET, in
+CHUNK_SIZE_UNIT), so a batch of long chunks carries fewer texts than one of
+short chunks. Batch size and the number of in-flight requests then follow
+AIMD: both grow additively while requests come back within
+EMBEDDING_TARGET_LATENCY_SECONDS, batch size shrinks multiplicatively when
+they come back slower, and both are halved on 429/5xx or connection errors,
+with every request pausing for a jittered exponential backoff (or the
+server's Retry-After). Throughput settles at whatever the inference backend
+can sustain.
+
+Search queries run on a separate controller with its own concurrency and
+backoff, so a 429 answered to bulk ingestion does not stall /search.
+"""
+import asyncio
+import random
+from contextlib import asynccontextmanager
+from typing import List, Optional, Tuple
+
+from prometheus_client import Gauge
+
+from config import settings
+from services.tokenizer import get_token_counter
+
+BATCH_SIZE = Gauge("embedding_batch_size", "Current adaptive embedding batch size", ["lane"])
+CONCURRENCY = Gauge("embedding_concurrency", "Current adaptive embedding request concurrency", ["lane"])
+
+
+class AdaptiveBatcher:
+    """Process-wide batch size and concurrency controller for one lane"""
+
+    def __init__(self, lane: str = "ingest", max_concurrency: int = None):
+        self.lane = lane
+        self.min_batch = settings.EMBEDDING_BATCH_MIN
+        self.max_batch = settings.EMBEDDING_BATCH_MAX
+        self.batch_size = min(max(settings.EMBEDDING_BATCH_SIZE, self.min_batch), self.max_batch)
+        self.budget = settings.EMBEDDING_BATCH_BUDGET
+
+        self.max_concurrency = max_concurrency or settings.EMBEDDING_MAX_CONCURRENCY
+        self.concurrency = max(1, self.max_concurrency // 2)
+
+        self.target_latency = settings.EMBEDDING_TARGET_LATENCY_SECONDS
+        self.backoff_base = settings.EMBEDDING_BACKOFF_BASE_SECONDS
+        self.backoff_max = settings.EMBEDDING_BACKOFF_MAX_SECONDS
+
+        self._inflight = 0
+        self._successes = 0
+        self._backoff_until = 0.0
+        self._condition: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._publish()
+
+    def _publish(self):
+        BATCH_SIZE.labels(self.lane).set(self.batch_size)
+        CONCURRENCY.labels(self.lane).set(self.concurrency)
+
+    def _sizes(self, texts: List[str]) -> List[int]:
+        if settings.CHUNK_SIZE_UNIT == "tokens":
+            return get_token_counter().count_many(texts)
+        return [len(text) for text in texts]
+
+    def pack(self, texts: List[str]) -> List[Tuple[int, int]]:
+        """
+        Split texts into [start, end) batches of at most batch_size texts and
+        EMBEDDING_BATCH_BUDGET total size; an oversized text goes alone
+        """
+        ranges = []
+        start = 0
+        total = 0
+        for i, size in enumerate(self._sizes(texts)):
+            if i > start and (i - start >= self.batch_size or total + size > self.budget):
+                ranges.append((start, i))
+                start = i
+                total = 0
+            total += size
+
+        if start < len(texts):
+            ranges.append((start, len(texts)))
+        return ranges
+
+    def _bind(self) -> asyncio.Condition:
+        # Conditions bind to one event loop; Celery tasks run each job in a
+        # fresh loop
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._condition = asyncio.Condition()
+            self._inflight = 0
+            self._backoff_until = 0.0
+            self._loop = loop
+        return self._condition
+
+    @asynccontextmanager
+    async def slot(self):
+        """Wait out any backoff, then hold one of the current concurrency slots"""
+        condition = self._bind()
+
+        delay = self._backoff_until - self._loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        async with condition:
+            await condition.wait_for(lambda: self._inflight < self.concurrency)
+            self._inflight += 1
+
+        try:
+            yield
+        finally:
+            async with condition:
+                self._inflight -= 1
+                condition.notify_all()
+
+    def record_success(self, latency: float, items: int):
+        """
+        Additive increase while fast, multiplicative decrease when slow
+
+        Called while still holding the request's slot.
+        """
+        if latency > self.target_latency:
+            self.batch_size = max(self.min_batch, int(self.batch_size * 0.75))
+            self._successes = 0
+            self._publish()
+            return
+
+        # Only full batches say anything about a larger size
+        if items >= self.batch_size:
+            self.batch_size = min(self.max_batch, self.batch_size + max(1, self.batch_size // 8))
+
+        # One more slot per "round" of successful requests, as in TCP;
+        # waiters re-check the limit when the caller releases its slot
+        self._successes += 1
+        if self._successes >= self.concurrency:
+            self._successes = 0
+            self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+
+        self._publish()
+
+    def record_overload(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Halve batch size and concurrency and pause every request
+
+        Failures that arrive while a backoff is already running count once.
+        Returns the delay before the next attempt.
+        """
+        self._bind()
+        now = self._loop.time()
+
+        if now >= self._backoff_until:
+            self.batch_size = max(self.min_batch, self.batch_size // 2)
+            self.concurrency = max(1, self.concurrency // 2)
+            self._successes = 0
+            self._publish()
+
+        if retry_after is not None:
+            delay = min(retry_after, self.backoff_max)
+        else:
+            # Full jitter
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+        self._backoff_until = max(self._backoff_until, now + delay)
+        return delay
+
+
+# Process-wide controllers: one shared by every ingestion EmbeddingService,
+# one for search queries
+adaptive_batcher = AdaptiveBatcher()
+query_adaptive_batcher = AdaptiveBatcher("query", settings.QUERY_EMBEDDING_MAX_CONCURRENCY)
@@ -0,0 +1,326 @@
+"""
+Bulk ingestion of archives and S3 key manifests
+
+Archives are expanded as a stream: zip members are read one at a time from
+the spooled upload and tar archives (optionally compressed) are read in
+tarfile's stream mode, so only the members being ingested are in memory.
+Each file goes through the same dedup/store/parse/embed path as /ingest.
+Up to BULK_INGEST_CONCURRENCY files run at once, while the process-wide
+governor caps parses and in-flight embedding batches.
+"""
+import asyncio
+import json
+import logging
+import mimetypes
+import tarfile
+import tempfile
+import uuid
+import zipfile
+from pathlib import PurePosixPath
+from typing import Any, AsyncIterator, Awaitable, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import AsyncSessionLocal
+from models import Document
+from services.dedup import DedupService, content_hash
+from services.governor import governor
+from services.jobs import enqueue_ingest
+from services.parse_cache import parse_cache
+from services.parse_pool import parse_pool
+from services.parser import iterate_in_thread
+from services.pipeline import IngestionPipeline
+from services.search_cache import bump_generation
+from services.storage import storage
+
+logger = logging.getLogger(__name__)
+
+# (member name, size, content); content is None for members over the size
+# limit, which are reported without being read
+Member = Tuple[str, int, Optional[bytes]]
+
+
+# Manifest keys must live under <prefix>/<user_id>/
+MANIFEST_PREFIXES = ("raw", "uploads")
+
+
+class InvalidArchiveError(ValueError):
+    """Upload is not a readable zip or tar archive"""
+
+
+def _skip(name: str) -> bool:
+    """Archive noise: macOS resource forks and hidden files"""
+    parts = PurePosixPath(name).parts
+    return any(part.startswith(".") or part == "__MACOSX" for part in parts)
+
+
+def _read_archive(fileobj: BinaryIO) -> Iterator[Member]:
+    """Yield archive members one at a time (blocking)"""
+    fileobj.seek(0)
+    if zipfile.is_zipfile(fileobj):
+        fileobj.seek(0)
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or _skip(info.filename):
+                    continue
+                if info.file_size > parse_pool.max_bytes:
+                    yield info.filename, info.file_size, None
+                else:
+                    yield info.filename, info.file_size, archive.read(info)
+        return
+
+    fileobj.seek(0)
+    try:
+        archive = tarfile.open(fileobj=fileobj, mode="r|*")
+    except tarfile.TarError as e:
+        raise InvalidArchiveError(f"Not a zip or tar archive: {e}")
+
+    with archive:
+        for member in archive:
+            if not member.isfile() or _skip(member.name):
+                continue
+            if member.size > parse_pool.max_bytes:
+                yield member.name, member.size, None
+            else:
+                yield member.name, member.size, archive.extractfile(member).read()
+
+
+async def _spool_segments(segments: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run a segment stream to the end and return a replay of it
+
+    Segments are spooled as JSON Lines, so large documents go to disk
+    rather than memory.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=settings.CLEAN_TEXT_SPOOL_BYTES)
+    try:
+        async for segment in segments:
+            spool.write(json.dumps(segment, default=str).encode("utf-8") + b"\n")
+    except BaseException:
+        spool.close()
+        raise
+
+    spool.seek(0)
+
+    async def replay() -> AsyncIterator[Dict[str, Any]]:
+        try:
+            async for line in iterate_in_thread(spool):
+                yield json.loads(line)
+        finally:
+            spool.close()
+
+    return replay()
+
+
+class BulkIngestService:
+    """Ingest many files for one user concurrently"""
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.dedup = DedupService()
+        self._slots = asyncio.Semaphore(settings.BULK_INGEST_CONCURRENCY)
+        # Identical files inside one batch resolve to the first stored copy
+        self._seen: Dict[str, str] = {}
+
+    async def ingest_archive(self, fileobj: BinaryIO, archive_name: str) -> Dict[str, Any]:
+        """Ingest every file in a zip or tar archive"""
+        async def members():
+            async for name, size, content in iterate_in_thread(_read_archive(fileobj), batch_size=1):
+                yield name, self._loader(size, content)
+
+        return await self._run(members(), archive_name)
+
+    async def ingest_keys(self, keys: List[str]) -> Dict[str, Any]:
+        """
+        Ingest objects already in storage, by key
+
+        Only the caller's own objects (MANIFEST_PREFIXES/{user_id}/...) are
+        read, and each one's size is checked with a HEAD request before it
+        is downloaded.
+        """
+        async def members():
+            for key in keys:
+                yield key, lambda key=key: self._load_key(key)
+
+        return await self._run(members(), "manifest")
+
+    async def _load_key(self, key: str) -> bytes:
+        parts = PurePosixPath(key).parts
+        if (
+            len(parts) < 3 or parts[0] not in MANIFEST_PREFIXES
+            or parts[1] != self.user_id or ".." in parts
+        ):
+            raise PermissionError(f"Key {key} is outside the caller's storage prefix")
+
+        parse_pool.check_size(await storage.size(key))
+        return await storage.get_bytes(key)
+
+    @staticmethod
+    def _loader(size: int, content: Optional[bytes]) -> Callable[[], Awaitable[bytes]]:
+        async def load() -> bytes:
+            parse_pool.check_size(size)
+            return content
+
+        return load
+
+    async def _run(
+        self,
+        members: AsyncIterator[Tuple[str, Callable[[], Awaitable[bytes]]]],
+        source: str
+    ) -> Dict[str, Any]:
+        """
+        Start one task per member as slots free up
+
+        Returns:
+            {
+                "files": [{"name": str, "doc_id": str, "status": str, ...}],
+                "total": int,
+                "succeeded": int,
+                "failed": int
+            }
+        """
+        tasks = []
+        source_error = None
+
+        try:
+            async for name, load in members:
+                # Acquiring before reading the next member bounds how much
+                # of the archive is held in memory
+                await self._slots.acquire()
+                task = asyncio.create_task(self._ingest_file(name, load))
+                task.add_done_callback(lambda _: self._slots.release())
+                tasks.append(task)
+        except InvalidArchiveError:
+            for task in tasks:
+                task.cancel()
+            raise
+        except Exception as e:
+            # A truncated or corrupt archive still reports what was ingested
+            logger.error(f"Failed to read {source}: {e}")
+            source_error = {"name": source, "status": "failed", "error": str(e)}
+
+        files = list(await asyncio.gather(*tasks))
+        if source_error:
+            files.append(source_error)
+
+        failed = sum(1 for f in files if f["status"] == "failed")
+        logger.info(f"Bulk ingest for user {self.user_id}: {len(files)} files, {failed} failed")
+
+        return {
+            "files": files,
+            "total": len(files),
+            "succeeded": len(files) - failed,
+            "failed": failed
+        }
+
+    async def _ingest_file(self, name: str, load: Callable[[], Awaitable[bytes]]) -> Dict[str, Any]:
+        """Ingest one member; failures are reported, not raised"""
+        filename = PurePosixPath(name).name
+        doc_id = str(uuid.uuid4())
+
+        try:
+            content = await load()
+            parse_pool.check_size(len(content))
+            content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+            async with AsyncSessionLocal() as db:
+                try:
+                    result = await self._ingest(db, doc_id, filename, content_type, content)
+                except BaseException:
+                    await db.rollback()
+                    raise
+
+            return {"name": name, **result}
+
+        except Exception as e:
+            logger.warning(f"Bulk ingest of {name} failed: {e}")
+            return {"name": name, "doc_id": None, "status": "failed", "error": str(e)}
+
+    async def _ingest(
+        self,
+        db: AsyncSession,
+        doc_id: str,
+        filename: str,
+        content_type: str,
+        content: bytes
+    ) -> Dict[str, Any]:
+        digest = content_hash(content)
+
+        if digest in self._seen:
+            return {"doc_id": self._seen[digest], "status": "duplicate"}
+
+        result = await self._ingest_content(db, doc_id, filename, content_type, content, digest)
+
+        # Only documents that were stored count; copies running concurrently
+        # wait on find_existing's lock instead
+        self._seen[digest] = result["doc_id"]
+        return result
+
+    async def _ingest_content(
+        self,
+        db: AsyncSession,
+        doc_id: str,
+        filename: str,
+        content_type: str,
+        content: bytes,
+        digest: str
+    ) -> Dict[str, Any]:
+        existing = await self.dedup.find_existing(db, self.user_id, digest)
+        if existing:
+            return {"doc_id": existing.id, "status": "duplicate"}
+
+        shared = await self.dedup.find_shared(db, digest)
+        if shared:
+            await self.dedup.clone_document(db, shared, doc_id, self.user_id, filename)
+            await db.commit()
+            await bump_generation(self.user_id)
+            return {"doc_id": doc_id, "status": "ready", "duplicate": True}
+
+        raw_path = f"raw/{self.user_id}/{doc_id}/{filename}"
+        doc = Document(
+            id=doc_id,
+            user_id=self.user_id,
+            filename=filename,
+            content_type=content_type,
+            content_hash=digest,
+            raw_path=raw_path,
+            status="processing",
+            progress=0
+        )
+        db.add(doc)
+
+        if settings.INGEST_ASYNC:
+            await storage.put_bytes(raw_path, content, content_type)
+            await db.commit()
+            await enqueue_ingest(doc_id, self.user_id)
+            return {"doc_id": doc_id, "status": "processing"}
+
+        raw_upload = asyncio.create_task(storage.put_bytes(raw_path, content, content_type))
+
+        try:
+            # PDF pages and images are extracted lazily, so the stream is run
+            # to the end under the slot; embedding then runs without holding it
+            async with governor.parse():
+                parsed = await parse_cache.parse(digest, content_type, filename, content=content)
+                segments = await _spool_segments(parsed["segments"])
+
+            clean_path = f"clean/{self.user_id}/{doc_id}/content.md"
+            doc.clean_path = clean_path
+            doc.doc_metadata = parsed["metadata"]
+            await db.flush()
+
+            pipeline = IngestionPipeline(db, doc_id, self.user_id, parsed["metadata"].get("format"))
+            result = await pipeline.run(segments)
+
+            await asyncio.gather(raw_upload, result["text"].upload(clean_path))
+        except BaseException:
+            raw_upload.cancel()
+            raise
+
+        doc.status = "ready"
+        doc.progress = 100
+        await db.commit()
+        await bump_generation(self.user_id)
+
+        return {"doc_id": doc_id, "status": "ready", "chunks": result["chunks"]}
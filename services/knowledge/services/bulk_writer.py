@@ -0,0 +1,174 @@
+"""
+Bulk persistence for chunks and embeddings
+
+Rows are streamed into knowledge.chunks and knowledge.embeddings with
+PostgreSQL binary COPY instead of one ORM object and INSERT per row. Chunk IDs
+are generated client-side so embeddings can reference them without a round
+trip.
+"""
+import json
+import logging
+import struct
+import uuid
+from typing import List, Dict, Any, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+CHUNK_COLUMNS = ["id", "doc_id", "user_id", "text", "position", "metadata", "section_id", "section_path"]
+EMBEDDING_COLUMNS = ["id", "chunk_id", "vector", "doc_id", "user_id"]
+
+# PGCOPY binary stream framing
+_COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+_COPY_TRAILER = struct.pack(">h", -1)
+_NULL_FIELD = struct.pack(">i", -1)
+
+
+def _text_field(value: Optional[str]) -> bytes:
+    """text/varchar/json fields are sent as UTF-8 in binary COPY"""
+    if value is None:
+        return _NULL_FIELD
+    data = value.encode("utf-8")
+    return struct.pack(">i", len(data)) + data
+
+
+def _int_field(value: Optional[int]) -> bytes:
+    """int4 field"""
+    if value is None:
+        return _NULL_FIELD
+    return struct.pack(">ii", 4, value)
+
+
+def _vector_field(vector: Sequence[float]) -> bytes:
+    """pgvector binary format: int16 dim, int16 unused, dim x float4"""
+    dim = len(vector)
+    return struct.pack(f">iHH{dim}f", 4 + 4 * dim, dim, 0, *vector)
+
+
+class BulkWriter:
+    """Write chunk and embedding rows with binary COPY"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self._in_transaction = False
+
+    async def write_batch(
+        self,
+        doc_id: str,
+        user_id: str,
+        chunks: List[Dict[str, Any]],
+        vectors: List[List[float]]
+    ) -> List[str]:
+        """
+        Write chunks and their embeddings in two COPY round trips
+
+        Runs on the session's connection, inside its transaction; the caller
+        commits.
+
+        Returns:
+            Chunk IDs, in input order
+        """
+        chunk_ids = await self.write_chunks(doc_id, user_id, chunks)
+        await self.write_embeddings(doc_id, user_id, chunk_ids, vectors)
+        return chunk_ids
+
+    async def write_chunks(
+        self,
+        doc_id: str,
+        user_id: str,
+        chunks: List[Dict[str, Any]]
+    ) -> List[str]:
+        """
+        COPY chunk rows
+
+        Chunks may carry a pre-assigned "id"; otherwise one is generated.
+
+        Returns:
+            Chunk IDs, in input order
+        """
+        if not chunks:
+            return []
+
+        chunk_ids = []
+        buffer = bytearray(_COPY_HEADER)
+        field_count = struct.pack(">h", len(CHUNK_COLUMNS))
+
+        for chunk in chunks:
+            chunk_id = chunk.get("id") or str(uuid.uuid4())
+            chunk_ids.append(chunk_id)
+
+            buffer += field_count
+            buffer += _text_field(chunk_id)
+            buffer += _text_field(doc_id)
+            buffer += _text_field(user_id)
+            buffer += _text_field(chunk["text"])
+            buffer += _int_field(chunk.get("position"))
+            buffer += _text_field(json.dumps(chunk.get("metadata") or {}))
+            buffer += _int_field(chunk.get("section_id"))
+            buffer += _text_field(chunk.get("section_path"))
+
+        buffer += _COPY_TRAILER
+        await self._copy("chunks", CHUNK_COLUMNS, bytes(buffer))
+
+        return chunk_ids
+
+    async def write_embeddings(
+        self,
+        doc_id: str,
+        user_id: str,
+        chunk_ids: List[str],
+        vectors: List[List[float]]
+    ):
+        """COPY embedding rows for already written chunks"""
+        if not chunk_ids:
+            return
+
+        buffer = bytearray(_COPY_HEADER)
+        field_count = struct.pack(">h", len(EMBEDDING_COLUMNS))
+
+        for chunk_id, vector in zip(chunk_ids, vectors):
+            buffer += field_count
+            buffer += _text_field(str(uuid.uuid4()))
+            buffer += _text_field(chunk_id)
+            buffer += _vector_field(vector)
+            buffer += _text_field(doc_id)
+            buffer += _text_field(user_id)
+
+        buffer += _COPY_TRAILER
+        await self._copy("embeddings", EMBEDDING_COLUMNS, bytes(buffer))
+
+    async def delete_chunks(self, chunk_ids: List[str]):
+        """Delete chunks and their embeddings in one statement per table"""
+        if not chunk_ids:
+            return
+
+        await self.db.execute(
+            text("DELETE FROM knowledge.embeddings WHERE chunk_id = ANY(:ids)"),
+            {"ids": chunk_ids}
+        )
+        await self.db.execute(
+            text("DELETE FROM knowledge.chunks WHERE id = ANY(:ids)"),
+            {"ids": chunk_ids}
+        )
+
+    async def _copy(self, table: str, columns: List[str], data: bytes):
+        """Run COPY FROM STDIN on the session's asyncpg connection"""
+        conn = await self.db.connection()
+
+        # The asyncpg dialect opens its transaction lazily on the first
+        # statement; COPY on the raw connection would otherwise autocommit
+        if not self._in_transaction:
+            await conn.execute(text("SELECT 1"))
+            self._in_transaction = True
+
+        raw = await conn.get_raw_connection()
+
+        await raw.driver_connection.copy_to_table(
+            table,
+            schema_name="knowledge",
+            columns=columns,
+            source=data,
+            format="binary"
+        )
@@ -1,36 +1,275 @@
 """
 Text chunking service
+
+Two strategies, chosen per document format (CHUNK_STRATEGY_BY_FORMAT):
+"recursive" splits the whole text by separator priority, "section" first
+cuts it at markdown headings and splits each section body on its own, so no
+chunk spans two sections unless one of them is smaller than
+CHUNK_SECTION_MIN_SIZE. Section chunks record their heading path and a
+section ID (the section's character offset in the document); heading lines
+go into the path, never into chunk text.
 """
 import logging
-from typing import List, Dict, Any
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+import re
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 
 from config import settings
+from services.text_splitter import LengthFunction, OffsetTextSplitter
+from services.tokenizer import get_token_counter
 
 logger = logging.getLogger(__name__)
 
+# Markdown ATX headings, as emitted by the HTML, DOCX and PPTX parsers
+_HEADING = re.compile(r"^(#{1,6})[ \t]+(.+?)[ \t#]*$", re.MULTILINE)
+_CODE_FENCE = re.compile(r"^```.*?^```[^\n]*$", re.MULTILINE | re.DOTALL)
+
+SECTION_PATH_SEPARATOR = " > "
+
+
+def chunk_budget() -> Tuple[int, Optional[LengthFunction]]:
+    """
+    Chunk size and batch length function for CHUNK_SIZE_UNIT
+
+    In token mode CHUNK_SIZE is the embedding model's window; room is left
+    for the special tokens it wraps every input in.
+    """
+    if settings.CHUNK_SIZE_UNIT == "tokens":
+        counter = get_token_counter()
+        return settings.CHUNK_SIZE - counter.special_tokens, counter.count_many
+    if settings.CHUNK_SIZE_UNIT != "chars":
+        raise ValueError(f"Unknown chunk size unit: {settings.CHUNK_SIZE_UNIT}")
+    return settings.CHUNK_SIZE, None
+
+
+def chunk_strategy(doc_format: Optional[str]) -> str:
+    """Chunking strategy for a document format"""
+    return settings.CHUNK_STRATEGY_BY_FORMAT.get(doc_format or "", settings.CHUNK_STRATEGY)
+
+
+def split_sections(text: str) -> Iterator[Tuple[int, int, int, List[str]]]:
+    """
+    Cut text at headings into (start, body_start, end, heading_path) sections
+
+    Each section starts at its heading line and its body right after it;
+    text before the first heading has an empty path and no heading. Lines
+    inside fenced code blocks are not headings.
+    """
+    fences = [match.span() for match in _CODE_FENCE.finditer(text)]
+    stack: List[Tuple[int, str]] = []
+    start = body_start = 0
+
+    for match in _HEADING.finditer(text):
+        if any(fence_start <= match.start() < fence_end for fence_start, fence_end in fences):
+            continue
+
+        if match.start() > start:
+            yield start, body_start, match.start(), [title for _, title in stack]
+
+        level = len(match.group(1))
+        while stack and stack[-1][0] >= level:
+            stack.pop()
+        stack.append((level, match.group(2).strip()))
+        start, body_start = match.start(), match.end()
+
+    if len(text) > start:
+        yield start, body_start, len(text), [title for _, title in stack]
+
+
+def _common_path(first: Optional[List[str]], second: Optional[List[str]]) -> Optional[List[str]]:
+    """Shared heading prefix; None stands for a heading-only section"""
+    if first is None or second is None:
+        return second if first is None else first
+    common = []
+    for a, b in zip(first, second):
+        if a != b:
+            break
+        common.append(a)
+    return common
+
 
 class TextChunker:
     """Chunk text into smaller pieces for embedding"""
 
-    def __init__(self):
-        self.splitter = RecursiveCharacterTextSplitter(
-            chunk_size=settings.CHUNK_SIZE,
+    def __init__(self, doc_format: Optional[str] = None):
+        chunk_size, length_function = chunk_budget()
+
+        self.splitter = OffsetTextSplitter(
+            chunk_size=chunk_size,
             chunk_overlap=settings.CHUNK_OVERLAP,
-            length_function=len,
-            separators=["\n\n", "\n", ". ", " ", ""]
+            separators=["\n\n", "\n", ". ", " ", ""],
+            length_function=length_function
         )
 
-    async def chunk(self, text: str, doc_metadata: Dict[str, Any]) -> List[Dict[str, Any]]:
+        self.strategy = chunk_strategy(doc_format)
+        if self.strategy not in ("recursive", "section"):
+            raise ValueError(f"Unknown chunking strategy: {self.strategy}")
+
+    def _sizes(self, texts: List[str]) -> List[int]:
+        if self.splitter.length_function is None:
+            return [len(text) for text in texts]
+        return self.splitter.length_function(texts)
+
+    def _section_groups(self, text: str) -> List[List[Tuple[int, int, int, List[str]]]]:
+        """
+        Sections, (start, body_start, end, heading_path), grouped for chunking
+
+        A section smaller than CHUNK_SECTION_MIN_SIZE joins the one after it
+        when they share a heading ancestor (or it is only a heading, so a
+        parent travels with its first child); one still tiny after that
+        joins the one before on the same terms.
+        """
+        sections = list(split_sections(text))
+        sizes = self._sizes([text[start:end] for start, _, end, _ in sections])
+        min_size = settings.CHUNK_SECTION_MIN_SIZE
+
+        def joinable(group: List[Any], path: List[str]) -> bool:
+            return group[2] < min_size and (group[1] is None or bool(_common_path(group[1], path)))
+
+        # [sections, shared path of sections with a body (None: none yet), size, first section's path]
+        groups: List[List[Any]] = []
+        for section, size in zip(sections, sizes):
+            start, body_start, end, path = section
+            body_path = path if text[body_start:end].strip() else None
+            if groups and joinable(groups[-1], path):
+                group = groups[-1]
+                group[0].append(section)
+                group[1] = _common_path(group[1], body_path)
+                group[2] += size
+            else:
+                groups.append([[section], body_path, size, path])
+
+        merged: List[List[Any]] = []
+        for group in groups:
+            previous = merged[-1] if merged else None
+            if (
+                previous and group[2] < min_size
+                and previous[1] is not None and _common_path(previous[1], group[3])
+            ):
+                previous[0].extend(group[0])
+                previous[1] = _common_path(previous[1], group[1])
+                previous[2] += group[2]
+            else:
+                merged.append(group)
+
+        return [group[0] for group in merged]
+
+    def _split_group(
+        self,
+        text: str,
+        sections: List[Tuple[int, int, int, List[str]]]
+    ) -> Iterator[Tuple[int, int, str, Optional[int], Optional[List[str]]]]:
+        """
+        Split a group's section bodies as one text, without heading lines
+
+        Bodies are joined with blank lines and split together; a chunk of
+        a tiny section left on its own (next to an oversized body) is then
+        merged into its neighbour when the two fit one chunk. Each chunk is
+        labelled with the section that contributes most of its text, so a
+        large section keeps its own path. char offsets map back to the
+        document; a chunk spanning sections covers the heading lines
+        between them without containing them.
+        """
+        bodies = []
+        for start, body_start, end, path in sections:
+            body = text[body_start:end]
+            stripped = body.strip()
+            if stripped:
+                body_start += len(body) - len(body.lstrip())
+                bodies.append((body_start, body_start + len(stripped), start, path))
+
+        if len(bodies) == 1:
+            body_start, end, start, path = bodies[0]
+            for chunk_start, chunk_end, chunk_text in self.splitter.split(text, body_start, end):
+                yield chunk_start, chunk_end, chunk_text, start, path
+            return
+
+        # Offset of each body in the joined text
+        offsets = []
+        offset = 0
+        for body_start, end, _, _ in bodies:
+            offsets.append(offset)
+            offset += end - body_start + 2
+        joined = "\n\n".join(text[body_start:end] for body_start, end, _, _ in bodies)
+
+        # [start, end, text, {body index: characters}]
+        chunks: List[List[Any]] = []
+        for chunk_start, chunk_end, chunk_text in self.splitter.split(joined):
+            weights = {}
+            for i, (body_start, end, _, _) in enumerate(bodies):
+                overlap = min(chunk_end, offsets[i] + end - body_start) - max(chunk_start, offsets[i])
+                if overlap > 0:
+                    weights[i] = overlap
+            first, last = min(weights), max(weights)
+            chunks.append([
+                bodies[first][0] + chunk_start - offsets[first],
+                bodies[last][0] + chunk_end - offsets[last],
+                chunk_text,
+                weights
+            ])
+
+        min_size = settings.CHUNK_SECTION_MIN_SIZE
+        merged: List[List[Any]] = []
+        for chunk in chunks:
+            previous = merged[-1] if merged else None
+            if previous and max(previous[3]) < min(chunk[3]):
+                combined = previous[2] + "\n\n" + chunk[2]
+                sizes = self._sizes([previous[2], chunk[2], combined])
+                if min(sizes[:2]) < min_size and sizes[2] <= self.splitter.chunk_size:
+                    previous[1] = chunk[1]
+                    previous[2] = combined
+                    for i, weight in chunk[3].items():
+                        previous[3][i] = previous[3].get(i, 0) + weight
+                    continue
+            merged.append(chunk)
+
+        for chunk_start, chunk_end, chunk_text, weights in merged:
+            main = max(weights, key=lambda i: (weights[i], -i))
+            yield chunk_start, chunk_end, chunk_text, bodies[main][2], bodies[main][3]
+
+    def _split(self, text: str) -> Iterator[Tuple[int, int, str, Optional[int], Optional[List[str]]]]:
+        """(start, end, chunk_text, section_start, section_path) per chunk"""
+        if self.strategy == "recursive":
+            for start, end, chunk_text in self.splitter.split(text):
+                yield start, end, chunk_text, None, None
+            return
+
+        for sections in self._section_groups(text):
+            yield from self._split_group(text, sections)
+
+    @staticmethod
+    def _chunk(
+        chunk_text: str,
+        position: int,
+        metadata: Dict[str, Any],
+        section_start: Optional[int],
+        section_path: Optional[List[str]],
+        text_offset: int
+    ) -> Dict[str, Any]:
+        return {
+            "text": chunk_text,
+            "position": position,
+            "section_id": None if section_start is None else text_offset + section_start,
+            "section_path": SECTION_PATH_SEPARATOR.join(section_path) if section_path else None,
+            "metadata": metadata
+        }
+
+    async def chunk(self, text: str, metadata: Dict[str, Any] = None) -> List[Dict[str, Any]]:
         """
         Chunk text into smaller pieces
 
+        metadata holds chunk-level fields shared by every chunk; document
+        metadata stays on the document row and is not copied here.
+
+        char_start/char_end in each chunk's metadata are offsets into text.
+
         Returns:
             List of chunks with metadata:
             [
                 {
                     "text": str,
                     "position": int,
+                    "section_id": int or None,  # section strategy only
+                    "section_path": str or None,  # "Heading > Subheading"
                     "metadata": dict
                 },
                 ...
@@ -38,20 +277,25 @@ class TextChunker:
         """
         try:
             # Split text
-            chunks = self.splitter.split_text(text)
+            chunks = list(self._split(text))
 
             # Add metadata to each chunk
             result = []
-            for i, chunk_text in enumerate(chunks):
-                result.append({
-                    "text": chunk_text,
-                    "position": i,
-                    "metadata": {
-                        **doc_metadata,
+            for i, (start, end, chunk_text, section_start, section_path) in enumerate(chunks):
+                result.append(self._chunk(
+                    chunk_text,
+                    i,
+                    {
+                        **(metadata or {}),
                         "chunk_index": i,
-                        "total_chunks": len(chunks)
-                    }
-                })
+                        "total_chunks": len(chunks),
+                        "char_start": start,
+                        "char_end": end
+                    },
+                    section_start,
+                    section_path,
+                    0
+                ))
 
             logger.info(f"Created {len(result)} chunks")
             return result
@@ -59,3 +303,42 @@ class TextChunker:
         except Exception as e:
             logger.error(f"Failed to chunk text: {e}")
             raise
+
+    def chunk_segment(
+        self,
+        text: str,
+        segment_metadata: Dict[str, Any],
+        start_position: int,
+        text_offset: int = 0
+    ) -> List[Dict[str, Any]]:
+        """
+        Chunk one segment of a streamed document
+
+        Positions continue from start_position so a document chunked segment
+        by segment gets the same contiguous numbering as one chunked in full.
+        The total chunk count is not known while streaming, so only
+        chunk_index is recorded.
+
+        text_offset is where the segment starts in the document's clean text
+        (see TextSpool.write), so char_start/char_end index the clean copy.
+        Heading paths restart with each segment; section IDs are offsets in
+        the clean text, so they stay unique across segments.
+        """
+        result = []
+        for offset, (start, end, chunk_text, section_start, section_path) in enumerate(self._split(text)):
+            position = start_position + offset
+            result.append(self._chunk(
+                chunk_text,
+                position,
+                {
+                    **segment_metadata,
+                    "chunk_index": position,
+                    "char_start": text_offset + start,
+                    "char_end": text_offset + end
+                },
+                section_start,
+                section_path,
+                text_offset
+            ))
+
+        return result
@@ -0,0 +1,160 @@
+"""
+Content-addressed document dedup
+
+Documents record a SHA-256 of their raw content. Re-ingesting the same bytes
+returns the existing document instead of parsing, chunking and embedding
+again. With DEDUP_CROSS_TENANT, a ready document owned by another user is
+cloned server-side: its chunk and embedding rows are copied under the new
+owner, so nothing is parsed or embedded.
+"""
+import hashlib
+import logging
+from typing import BinaryIO, Optional, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from models import Document
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(content: bytes) -> str:
+    """SHA-256 hex digest used as the dedup key"""
+    return hashlib.sha256(content).hexdigest()
+
+
+def file_content_hash(fileobj: BinaryIO, chunk_size: int = 1024 * 1024) -> Tuple[str, int]:
+    """
+    SHA-256 hex digest and size of a file object, read in chunks
+
+    Blocking; call it through asyncio.to_thread.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    fileobj.seek(0)
+    for block in iter(lambda: fileobj.read(chunk_size), b""):
+        digest.update(block)
+        size += len(block)
+    fileobj.seek(0)
+    return digest.hexdigest(), size
+
+
+class DedupService:
+    """Look up and reuse documents by content hash"""
+
+    async def find_existing(
+        self,
+        db: AsyncSession,
+        user_id: str,
+        digest: str
+    ) -> Optional[Document]:
+        """
+        The user's own non-failed document with this content, if any
+
+        First takes a transaction-scoped advisory lock on the digest, so a
+        concurrent ingest of the same content waits until this transaction
+        ends and then finds its document instead of ingesting it again.
+        """
+        if not settings.DEDUP_ENABLED:
+            return None
+
+        await db.execute(
+            text("SELECT pg_advisory_xact_lock(hashtextextended(:digest, 0))"),
+            {"digest": digest}
+        )
+
+        result = await db.execute(
+            select(Document)
+            .where(
+                Document.user_id == user_id,
+                Document.content_hash == digest,
+                Document.status != "failed"
+            )
+            .order_by(Document.created_at)
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+    async def find_shared(self, db: AsyncSession, digest: str) -> Optional[Document]:
+        """
+        A ready document with this content owned by anyone (cross-tenant mode)
+
+        Served by the content_hash index.
+        """
+        if not (settings.DEDUP_ENABLED and settings.DEDUP_CROSS_TENANT):
+            return None
+
+        result = await db.execute(
+            select(Document)
+            .where(
+                Document.content_hash == digest,
+                Document.status == "ready"
+            )
+            .order_by(Document.created_at)
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+    async def clone_document(
+        self,
+        db: AsyncSession,
+        source: Document,
+        doc_id: str,
+        user_id: str,
+        filename: str,
+        url: Optional[str] = None
+    ) -> Document:
+        """
+        Give user_id its own copy of an already processed document
+
+        Stored objects (raw and clean text) are shared by path. Chunks and
+        embeddings are copied with INSERT ... SELECT, so vectors never leave
+        the database. The caller commits.
+
+        The copy is labelled with the caller's own filename (or URL, for
+        URL ingests); the source owner's filename and URL never reach it.
+        """
+        metadata = dict(source.doc_metadata or {})
+        metadata["source"] = url or filename
+
+        doc = Document(
+            id=doc_id,
+            user_id=user_id,
+            filename=filename,
+            content_type=source.content_type,
+            content_hash=source.content_hash,
+            raw_path=url or source.raw_path,
+            clean_path=source.clean_path,
+            status="ready",
+            progress=100,
+            doc_metadata=metadata
+        )
+        db.add(doc)
+        await db.flush()
+
+        await db.execute(
+            text("""
+                WITH src AS (
+                    SELECT id, gen_random_uuid()::text AS new_id, text, position, metadata,
+                           section_id, section_path
+                    FROM knowledge.chunks
+                    WHERE doc_id = :source_id
+                ),
+                copied AS (
+                    INSERT INTO knowledge.chunks (id, doc_id, user_id, text, position, metadata, section_id, section_path)
+                    SELECT new_id, :doc_id, :user_id, text, position, metadata, section_id, section_path
+                    FROM src
+                )
+                INSERT INTO knowledge.embeddings (id, chunk_id, vector, doc_id, user_id)
+                SELECT gen_random_uuid()::text, src.new_id, e.vector, :doc_id, :user_id
+                FROM src
+                JOIN knowledge.embeddings e ON e.chunk_id = src.id
+            """),
+            {"source_id": source.id, "doc_id": doc_id, "user_id": user_id}
+        )
+
+        logger.info(f"Cloned document {source.id} to {doc_id} for user {user_id}")
+
+        return doc
@@ -1,67 +1,53 @@
 """
-Embedding service - calls Inference Service
+Embedding service - cached vectors from the configured backend
 """
 import logging
-import httpx
 from typing import List
-import asyncio
 
-from config import settings
+from services.embedding_backends import EmbeddingBackend, get_embedding_backend
+from services.embedding_cache import EmbeddingCache
 
 logger = logging.getLogger(__name__)
 
 
 class EmbeddingService:
-    """Generate embeddings via Inference Service"""
+    """Generate embeddings via the embedding backend (EMBEDDING_BACKEND)"""
 
-    def __init__(self):
-        self.inference_url = settings.INFERENCE_SERVICE_URL
-        self.batch_size = 10  # Process 10 chunks at a time
+    def __init__(self, backend: EmbeddingBackend = None, query: bool = False):
+        self.backend = backend or get_embedding_backend()
+        # Search queries take the backend's query lane
+        self.query = query
+        self.model = self.backend.model
+        self.cache = EmbeddingCache(model=self.model)
 
     async def embed_texts(self, texts: List[str]) -> List[List[float]]:
         """
         Generate embeddings for list of texts
 
+        Cached vectors are served from the LRU/Redis tiers; only misses go to
+        the embedding backend.
+
         Returns:
-            List of embedding vectors
+            List of embedding vectors, in input order
         """
         try:
-            # Process in batches
-            all_embeddings = []
-
-            for i in range(0, len(texts), self.batch_size):
-                batch = texts[i:i + self.batch_size]
-                embeddings = await self._embed_batch(batch)
-                all_embeddings.extend(embeddings)
-
-            return all_embeddings
-
-        except Exception as e:
-            logger.error(f"Failed to generate embeddings: {e}")
-            raise
-
-    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings for a batch"""
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.inference_url}/v1/embeddings",
-                    json={
-                        "model": "main",
-                        "input": texts
-                    },
-                    timeout=60.0
-                )
+            embeddings = await self.cache.get_many(texts)
 
-                if response.status_code != 200:
-                    raise Exception(f"Embedding service returned {response.status_code}: {response.text}")
+            # Embed each distinct missing text once
+            missing = list(dict.fromkeys(
+                text for text, vector in zip(texts, embeddings) if vector is None
+            ))
+            if not missing:
+                return embeddings
 
-                result = response.json()
-                # Extract vectors from response
-                embeddings = [item["embedding"] for item in result["data"]]
+            fresh = dict(zip(missing, await self.backend.embed(missing, query=self.query)))
+            await self.cache.set_many(missing, [fresh[text] for text in missing])
 
-                return embeddings
+            return [
+                vector if vector is not None else fresh[text]
+                for text, vector in zip(texts, embeddings)
+            ]
 
         except Exception as e:
-            logger.error(f"Failed to embed batch: {e}")
+            logger.error(f"Failed to generate embeddings: {e}")
             raise
@@ -0,0 +1,318 @@
+"""
+Embedding backends
+
+RemoteEmbeddingBackend calls the inference service's OpenAI-compatible
+/v1/embeddings through the pooled client, under the adaptive batcher.
+LocalEmbeddingBackend runs an ONNX export of the embedding model (fp32 or
+quantized int8) in-process on CPU, for single-box setups and tests that
+should not need an inference container. Pick one with EMBEDDING_BACKEND.
+
+Either way the vectors go into the embeddings column, so the model must
+produce its dimension (EMBEDDING_DIMENSION, 1024 for BGE-M3).
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+import httpx
+
+from config import settings
+from models import EMBEDDING_DIMENSION
+from services.adaptive_batcher import AdaptiveBatcher, adaptive_batcher, query_adaptive_batcher
+from services.inference_client import inference_client
+
+logger = logging.getLogger(__name__)
+
+# Overload responses worth retrying after a backoff
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class EmbeddingServiceError(Exception):
+    """The inference service rejected or failed an embedding request"""
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
+
+
+class EmbeddingBackend:
+    """Turns texts into vectors"""
+
+    # Model identity in embedding cache keys; vectors of different models
+    # (or quantizations) must not be mixed
+    model: str
+
+    async def embed(self, texts: List[str], query: bool = False) -> List[List[float]]:
+        """
+        Vectors in input order
+
+        query marks latency-sensitive search queries, which backends may
+        keep apart from bulk ingestion.
+        """
+        raise NotImplementedError
+
+    def start(self):
+        """Prepare for the first request (connections, model weights)"""
+
+    async def close(self):
+        pass
+
+
+class RemoteEmbeddingBackend(EmbeddingBackend):
+    """The inference service's /v1/embeddings"""
+
+    def __init__(self):
+        self.model = settings.EMBEDDING_MODEL
+        self.max_retries = settings.EMBEDDING_MAX_RETRIES
+
+    async def embed(self, texts: List[str], query: bool = False) -> List[List[float]]:
+        """
+        Batches are packed and sent concurrently under the adaptive
+        batcher's current size and concurrency, and reassembled in input
+        order. Queries use their own batcher, so they skip ingestion's
+        backoff and queue.
+        """
+        batcher = query_adaptive_batcher if query else adaptive_batcher
+        batches = await asyncio.gather(*[
+            self._embed_batch(texts[start:end], batcher)
+            for start, end in batcher.pack(texts)
+        ])
+
+        return [vector for batch in batches for vector in batch]
+
+    async def _embed_batch(self, texts: List[str], batcher: AdaptiveBatcher, attempt: int = 0) -> List[List[float]]:
+        """
+        Generate embeddings for a batch
+
+        Overload (429/5xx, connection errors) is retried with backoff up to
+        EMBEDDING_MAX_RETRIES times; a batch the server finds too large
+        (413) is split in half.
+        """
+        async with batcher.slot():
+            started = time.monotonic()
+            try:
+                response = await inference_client.client().post(
+                    "/v1/embeddings",
+                    json={
+                        "model": self.model,
+                        "input": texts
+                    }
+                )
+            except httpx.TransportError as e:
+                response, error = None, f"{type(e).__name__}: {e}"
+            else:
+                if response.status_code == 200:
+                    batcher.record_success(time.monotonic() - started, len(texts))
+                    # Extract vectors from response
+                    return [item["embedding"] for item in response.json()["data"]]
+                error = f"Embedding service returned {response.status_code}: {response.text}"
+
+        if response is not None and response.status_code == 413 and len(texts) > 1:
+            batcher.record_overload(attempt)
+            half = len(texts) // 2
+            first, second = await asyncio.gather(
+                self._embed_batch(texts[:half], batcher, attempt),
+                self._embed_batch(texts[half:], batcher, attempt)
+            )
+            return first + second
+
+        retryable = response is None or response.status_code in _RETRY_STATUSES
+        if not retryable or attempt >= self.max_retries:
+            logger.error(f"Failed to embed batch: {error}")
+            raise EmbeddingServiceError(error)
+
+        delay = batcher.record_overload(
+            attempt, _retry_after(response) if response is not None else None
+        )
+        logger.warning(f"Embedding batch of {len(texts)} failed ({error}); retrying in {delay:.1f}s")
+        return await self._embed_batch(texts, batcher, attempt + 1)
+
+    def start(self):
+        inference_client.start()
+
+    async def close(self):
+        await inference_client.close()
+
+
+class LocalEmbeddingBackend(EmbeddingBackend):
+    """
+    ONNX Runtime on CPU, on a bounded thread pool
+
+    EMBEDDING_LOCAL_MODEL_PATH is a directory with model.onnx (or
+    model_quantized.onnx) and tokenizer.json; nothing is downloaded. The
+    model is loaded at startup (or on first use), and a probe text checks
+    that it outputs EMBEDDING_DIMENSION-wide vectors. Its cache identity is
+    EMBEDDING_LOCAL_MODEL_ID, or else the directory and model file with the
+    file's size and mtime, so a quantized or re-exported model never reads
+    the other's vectors; set the id to share cached vectors between hosts
+    holding separate copies of the model. Texts are sorted by length and
+    cut into EMBEDDING_LOCAL_BATCH_SIZE batches, so each batch pads to
+    similar lengths; batches run concurrently on
+    EMBEDDING_LOCAL_THREADS threads, which split the cores between their
+    session runs. Models whose output is already pooled (e.g. BGE-M3's
+    dense_vecs) are used as is; token embeddings are pooled per
+    EMBEDDING_LOCAL_POOLING. Vectors are L2-normalized.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = Path(path or settings.EMBEDDING_LOCAL_MODEL_PATH)
+        self.model_file = next(
+            (self.path / name for name in ("model.onnx", "model_quantized.onnx") if (self.path / name).exists()),
+            None
+        )
+        if self.model_file is None:
+            raise ValueError(f"No model.onnx or model_quantized.onnx in {self.path}")
+        if settings.EMBEDDING_LOCAL_MODEL_ID:
+            self.model = f"local-{settings.EMBEDDING_LOCAL_MODEL_ID}"
+        else:
+            stat = self.model_file.stat()
+            self.model = f"local-{self.path.name}-{self.model_file.stem}-{stat.st_size}-{stat.st_mtime_ns}"
+        self.dimension = EMBEDDING_DIMENSION
+        self.batch_size = settings.EMBEDDING_LOCAL_BATCH_SIZE
+        self.max_length = settings.EMBEDDING_LOCAL_MAX_LENGTH
+        self.pooling = settings.EMBEDDING_LOCAL_POOLING
+        self.workers = settings.EMBEDDING_LOCAL_THREADS
+
+        if self.pooling not in ("cls", "mean"):
+            raise ValueError(f"Unknown pooling: {self.pooling}")
+
+        self._session = None
+        self._tokenizer = None
+        self._input_names: List[str] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._load_lock = threading.Lock()
+
+    def _load(self):
+        with self._load_lock:
+            if self._session is not None:
+                return
+
+            try:
+                import onnxruntime
+                from tokenizers import Tokenizer
+            except ImportError:
+                raise RuntimeError("EMBEDDING_BACKEND=local needs the onnxruntime and tokenizers packages")
+
+            tokenizer = Tokenizer.from_file(str(self.path / "tokenizer.json"))
+            tokenizer.enable_truncation(self.max_length)
+            if tokenizer.padding is None:
+                pad_token = next(
+                    (token for token in ("<pad>", "[PAD]") if tokenizer.token_to_id(token) is not None),
+                    None
+                )
+                if pad_token is None:
+                    raise ValueError(f"No padding token in {self.path / 'tokenizer.json'}")
+                tokenizer.enable_padding(pad_id=tokenizer.token_to_id(pad_token), pad_token=pad_token)
+
+            options = onnxruntime.SessionOptions()
+            options.intra_op_num_threads = max(1, (os.cpu_count() or 1) // self.workers)
+            session = onnxruntime.InferenceSession(
+                str(self.model_file), options, providers=["CPUExecutionProvider"]
+            )
+
+            self._input_names = [model_input.name for model_input in session.get_inputs()]
+            self._tokenizer = tokenizer
+            self._session = session
+
+            logger.info(f"Loaded local embedding model {self.model} from {self.model_file}")
+
+    def _run(self, texts: List[str]) -> List[List[float]]:
+        """One padded batch through the model; runs on a pool thread"""
+        import numpy as np
+
+        if self._session is None:
+            self._load()
+        encodings = self._tokenizer.encode_batch(texts)
+        input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        output = self._session.run(None, {name: feeds[name] for name in self._input_names})[0]
+
+        if output.ndim == 3:
+            if self.pooling == "cls":
+                output = output[:, 0]
+            else:
+                mask = attention_mask[:, :, None].astype(output.dtype)
+                output = (output * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1)
+
+        if output.shape[-1] != self.dimension:
+            raise ValueError(
+                f"{self.model_file} outputs {output.shape[-1]}-dim vectors; "
+                f"the embeddings column holds {self.dimension}"
+            )
+
+        norms = np.linalg.norm(output, axis=1, keepdims=True)
+        return (output / np.maximum(norms, 1e-12)).tolist()
+
+    async def embed(self, texts: List[str], query: bool = False) -> List[List[float]]:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="embed"
+            )
+
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        batches = [order[i:i + self.batch_size] for i in range(0, len(order), self.batch_size)]
+
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(*[
+            loop.run_in_executor(self._executor, self._run, [texts[i] for i in batch])
+            for batch in batches
+        ])
+
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        for batch, batch_vectors in zip(batches, results):
+            for i, vector in zip(batch, batch_vectors):
+                vectors[i] = vector
+        return vectors
+
+    def start(self):
+        self._load()
+        # Fail at startup, not on the first document
+        self._run(["dimension check"])
+
+    async def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+def create_embedding_backend() -> EmbeddingBackend:
+    """Embedding backend selected by EMBEDDING_BACKEND"""
+    if settings.EMBEDDING_BACKEND == "remote":
+        return RemoteEmbeddingBackend()
+    if settings.EMBEDDING_BACKEND == "local":
+        return LocalEmbeddingBackend()
+    raise ValueError(f"Unknown embedding backend: {settings.EMBEDDING_BACKEND}")
+
+
+_embedding_backend: Optional[EmbeddingBackend] = None
+
+
+def get_embedding_backend() -> EmbeddingBackend:
+    """
+    Process-wide backend, created on first use
+
+    Importing this module neither opens the model nor fails without it.
+    """
+    global _embedding_backend
+    if _embedding_backend is None:
+        _embedding_backend = create_embedding_backend()
+    return _embedding_backend
+
+
+async def close_embedding_backend():
+    """Release the backend's connections and threads, if it was created"""
+    if _embedding_backend is not None:
+        await _embedding_backend.close()
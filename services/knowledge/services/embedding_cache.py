@@ -0,0 +1,161 @@
+"""
+Two-tier embedding cache
+
+Tier 1 is an in-process LRU, tier 2 is Redis shared by every knowledge
+service and worker process. Keys are the model name, storage dtype and a
+SHA-256 of the text. Values are packed little-endian float16/float32 blobs,
+which is also what the LRU holds, so an entry costs 2-4 KB for BGE-M3.
+"""
+import asyncio
+import hashlib
+import logging
+import struct
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import redis.asyncio as redis
+from prometheus_client import Counter
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+CACHE_LOOKUPS = Counter(
+    "embedding_cache_lookups_total",
+    "Embedding cache lookups by result",
+    ["namespace", "result"]  # result: memory_hit, redis_hit, miss
+)
+
+_DTYPE_FORMATS = {"float16": ("e", 2), "float32": ("f", 4)}
+
+_redis_client: Optional[redis.Redis] = None
+_redis_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_redis() -> redis.Redis:
+    """
+    Process-wide Redis client for cache tiers
+
+    Recreated when the event loop changes, since Celery tasks run each job
+    in a fresh loop.
+    """
+    global _redis_client, _redis_loop
+    loop = asyncio.get_running_loop()
+    if _redis_client is None or _redis_loop is not loop:
+        _redis_client = redis.from_url(settings.REDIS_URL)
+        _redis_loop = loop
+    return _redis_client
+
+
+async def close_redis():
+    """
+    Close the cache Redis client and its connections
+
+    Call before the event loop ends (app shutdown, end of a Celery task);
+    the next get_redis() on a new loop would otherwise drop the client
+    with its sockets still open.
+    """
+    global _redis_client, _redis_loop
+    client, _redis_client, _redis_loop = _redis_client, None, None
+    if client is not None:
+        await client.aclose()
+
+
+class EmbeddingCache:
+    """LRU + Redis cache of embedding vectors keyed by text hash"""
+
+    # One LRU per namespace, shared by every instance in the process since
+    # services are created per request; bulk ingestion cannot evict queries
+    _memories: Dict[str, "OrderedDict[str, bytes]"] = {}
+
+    def __init__(self, namespace: str = "emb", model: str = None, max_items: int = None):
+        self.namespace = namespace
+        self.model = model or settings.EMBEDDING_MODEL
+        self.enabled = settings.EMBEDDING_CACHE_ENABLED
+        self.max_items = max_items or settings.EMBEDDING_CACHE_MEMORY_ITEMS
+        self._memory = self._memories.setdefault(namespace, OrderedDict())
+        self.ttl = settings.EMBEDDING_CACHE_TTL_SECONDS
+        self.dtype = settings.EMBEDDING_CACHE_DTYPE
+        self.format, self.item_size = _DTYPE_FORMATS[self.dtype]
+
+    def key(self, text: str) -> str:
+        """Cache key for a text under the current model"""
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{self.namespace}:{self.model}:{self.dtype}:{digest}"
+
+    async def get_many(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Look texts up in both tiers
+
+        Returns:
+            One vector or None per input text, in input order
+        """
+        if not self.enabled:
+            return [None] * len(texts)
+
+        keys = [self.key(t) for t in texts]
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        redis_lookups = []
+
+        for i, key in enumerate(keys):
+            blob = self._memory.get(key)
+            if blob is not None:
+                self._memory.move_to_end(key)
+                results[i] = self._decode(blob)
+            else:
+                redis_lookups.append(i)
+
+        memory_hits = len(texts) - len(redis_lookups)
+        redis_hits = 0
+
+        if redis_lookups:
+            try:
+                blobs = await get_redis().mget([keys[i] for i in redis_lookups])
+            except Exception as e:
+                logger.warning(f"Embedding cache Redis lookup failed: {e}")
+                blobs = [None] * len(redis_lookups)
+
+            for i, blob in zip(redis_lookups, blobs):
+                if blob is not None:
+                    self._remember(keys[i], blob)
+                    results[i] = self._decode(blob)
+                    redis_hits += 1
+
+        CACHE_LOOKUPS.labels(self.namespace, "memory_hit").inc(memory_hits)
+        CACHE_LOOKUPS.labels(self.namespace, "redis_hit").inc(redis_hits)
+        CACHE_LOOKUPS.labels(self.namespace, "miss").inc(len(redis_lookups) - redis_hits)
+
+        return results
+
+    async def set_many(self, texts: List[str], vectors: List[List[float]]):
+        """Store vectors in both tiers"""
+        if not self.enabled or not texts:
+            return
+
+        entries = {}
+        for text, vector in zip(texts, vectors):
+            key = self.key(text)
+            blob = self._encode(vector)
+            self._remember(key, blob)
+            entries[key] = blob
+
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for key, blob in entries.items():
+                pipe.set(key, blob, ex=self.ttl)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Embedding cache Redis write failed: {e}")
+
+    def _remember(self, key: str, blob: bytes):
+        """Insert into the LRU, evicting the oldest entries"""
+        self._memory[key] = blob
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def _encode(self, vector: List[float]) -> bytes:
+        return struct.pack(f"<{len(vector)}{self.format}", *vector)
+
+    def _decode(self, blob: bytes) -> List[float]:
+        return list(struct.unpack(f"<{len(blob) // self.item_size}{self.format}", blob))
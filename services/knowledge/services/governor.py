@@ -0,0 +1,53 @@
+"""
+Process-wide ingestion concurrency limits
+
+Bulk ingestion fans out over many files at once. The governor caps how many
+documents are parsed concurrently (each holds its bytes and a pool worker)
+and how many embedding batches are in flight against the inference service
+across every pipeline in the process, so throughput saturates the inference
+service without overloading it.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from config import settings
+
+
+class IngestGovernor:
+    """Shared parse and embed semaphores"""
+
+    def __init__(self):
+        self.parse_limit = settings.INGEST_MAX_PARSES or max(settings.PARSE_WORKERS, 1)
+        self.embed_limit = settings.INGEST_MAX_EMBED_BATCHES
+        self._parse: Optional[asyncio.Semaphore] = None
+        self._embed: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _semaphores(self):
+        # Semaphores bind to one event loop; Celery tasks run each job in a
+        # fresh loop
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._parse = asyncio.Semaphore(self.parse_limit)
+            self._embed = asyncio.Semaphore(self.embed_limit)
+            self._loop = loop
+        return self._parse, self._embed
+
+    @asynccontextmanager
+    async def parse(self):
+        """Hold one parse slot"""
+        semaphore, _ = self._semaphores()
+        async with semaphore:
+            yield
+
+    @asynccontextmanager
+    async def embed(self):
+        """Hold one in-flight embedding batch slot"""
+        _, semaphore = self._semaphores()
+        async with semaphore:
+            yield
+
+
+# Process-wide governor shared by every ingestion pipeline
+governor = IngestGovernor()
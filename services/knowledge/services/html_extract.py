@@ -0,0 +1,167 @@
+"""
+Single-pass HTML extraction on lxml
+
+Produces the same markdown-like text and metadata as the BeautifulSoup
+extractor in DocumentParser, but builds the tree with lxml's C parser and
+walks it once: title, meta tags, main-content candidates and block text are
+all collected in the same iterwalk, and the main-content choice is applied
+to the collected blocks afterwards.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+import lxml.html
+from lxml import etree
+
+# Subtrees dropped from the output
+SKIP_TAGS = {"script", "style", "nav", "header", "footer"}
+
+BLOCK_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6", "p", "li", "blockquote"}
+
+# Metadata key -> meta tags in order of preference
+META_FIELDS = {
+    "author": [("name", "author"), ("property", "article:author")],
+    "published_date": [("property", "article:published_time"), ("name", "date")],
+    "description": [("name", "description"), ("property", "og:description")],
+}
+_META_ATTRS = {pair for pairs in META_FIELDS.values() for pair in pairs}
+
+# Main-content candidates in order of preference
+_MAIN_KINDS = ("article", "main", "role")
+
+
+def _format_block(tag: str, text: str) -> str:
+    if tag[0] == "h":
+        return f"{'#' * int(tag[1])} {text}"
+    if tag == "li":
+        return f"- {text}"
+    if tag == "blockquote":
+        return f"> {text}"
+    return text
+
+
+def extract_html(html_content: str, url: str) -> Dict[str, Any]:
+    """
+    Parse HTML to clean markdown-like text
+
+    Returns:
+        {
+            "text": str,
+            "metadata": dict
+        }
+    """
+    empty = {"text": "", "metadata": {"source": url, "format": "article", "title": ""}}
+    if not html_content.strip():
+        return empty
+
+    # lxml rejects str input with an XML encoding declaration (XHTML), so
+    # parse UTF-8 bytes with the encoding fixed over any declaration
+    try:
+        root = lxml.html.document_fromstring(
+            html_content.encode("utf-8", "surrogatepass"),
+            parser=lxml.html.HTMLParser(encoding="utf-8")
+        )
+    except etree.ParserError:
+        # Nothing but comments, whitespace or a doctype
+        return empty
+
+    title: Optional[str] = None
+    first_h1: Optional[str] = None
+    metas: Dict[Tuple[str, str], str] = {}
+
+    # First element of each main-content kind, and the candidates enclosing
+    # the current position
+    mains: Dict[str, Any] = {}
+    open_mains: List[Any] = []
+
+    # Open blocks collect text from every descendant; nested blocks each
+    # get their own copy, as with find_all + get_text. Blocks take their
+    # output slot when they open, so nested blocks keep document order.
+    open_blocks: List[Tuple[Any, int, List[str]]] = []
+    blocks: List[Optional[Tuple[str, str, Tuple[Any, ...]]]] = []
+
+    skip_depth = 0
+
+    def add_text(text: Optional[str]):
+        if text and open_blocks:
+            for _, _, parts in open_blocks:
+                parts.append(text)
+
+    for event, element in etree.iterwalk(root, events=("start", "end", "comment", "pi")):
+        # Comments and processing instructions: only their tail is text
+        if event in ("comment", "pi"):
+            if not skip_depth:
+                add_text(element.tail)
+            continue
+
+        tag = element.tag
+
+        if event == "start":
+            if skip_depth or tag in SKIP_TAGS:
+                skip_depth += 1
+                continue
+
+            if tag == "title" and title is None:
+                title = (element.text_content() or "").strip()
+            elif tag == "meta":
+                for attr in ("name", "property"):
+                    key = (attr, element.get(attr))
+                    if key in _META_ATTRS and key not in metas:
+                        metas[key] = element.get("content", "")
+
+            kind = tag if tag in ("article", "main") else None
+            if kind is None and element.get("role") == "main":
+                kind = "role"
+            if kind:
+                mains.setdefault(kind, element)
+                open_mains.append(element)
+
+            if tag in BLOCK_TAGS:
+                open_blocks.append((element, len(blocks), []))
+                blocks.append(None)
+
+            add_text(element.text)
+
+        else:
+            if skip_depth:
+                skip_depth -= 1
+                if not skip_depth:
+                    add_text(element.tail)
+                continue
+
+            if open_blocks and open_blocks[-1][0] is element:
+                _, slot, parts = open_blocks.pop()
+                text = "".join(parts).strip()
+                if tag == "h1" and first_h1 is None:
+                    first_h1 = text
+                if text:
+                    blocks[slot] = (tag, text, tuple(open_mains))
+
+            if open_mains and open_mains[-1] is element:
+                open_mains.pop()
+
+            add_text(element.tail)
+
+    main = next((mains[kind] for kind in _MAIN_KINDS if kind in mains), None)
+
+    text_parts = [
+        _format_block(tag, text)
+        for tag, text, containers in filter(None, blocks)
+        if main is None or any(container is main for container in containers)
+    ]
+
+    metadata = {
+        "source": url,
+        "format": "article",
+        "title": title if title is not None else (first_h1 or "")
+    }
+
+    for field, candidates in META_FIELDS.items():
+        for key in candidates:
+            if key in metas:
+                metadata[field] = metas[key]
+                break
+
+    return {
+        "text": "\n\n".join(text_parts),
+        "metadata": metadata
+    }
@@ -0,0 +1,67 @@
+"""
+Shared HTTP client for the inference service
+
+One pooled keep-alive httpx client per process instead of a client (and a
+TCP/TLS handshake) per request. HTTP/2 is negotiated over TLS when
+INFERENCE_HTTP2 is set; plain http:// URLs use pooled HTTP/1.1 connections.
+The pool holds EMBEDDING_MAX_CONCURRENCY plus QUERY_EMBEDDING_MAX_CONCURRENCY
+connections, the most requests the adaptive batchers ever allow in flight,
+so queries never wait for a connection held by ingestion.
+"""
+import asyncio
+import logging
+from typing import Optional
+
+import httpx
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceClient:
+    """Long-lived pooled client"""
+
+    def __init__(self):
+        self.concurrency = settings.EMBEDDING_MAX_CONCURRENCY + settings.QUERY_EMBEDDING_MAX_CONCURRENCY
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _create(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=settings.INFERENCE_SERVICE_URL,
+            http2=settings.INFERENCE_HTTP2,
+            timeout=httpx.Timeout(settings.INFERENCE_TIMEOUT_SECONDS),
+            limits=httpx.Limits(
+                max_connections=self.concurrency,
+                max_keepalive_connections=self.concurrency
+            )
+        )
+
+    def _bind(self):
+        # Clients bind to one event loop; Celery tasks run each job in a
+        # fresh loop, whose predecessor is already closed
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._client = self._create()
+            self._loop = loop
+
+    def start(self):
+        """Create the client for the running loop"""
+        self._bind()
+        logger.info(f"Inference client started ({self.concurrency} pooled connections)")
+
+    def client(self) -> httpx.AsyncClient:
+        """The client for the running loop"""
+        self._bind()
+        return self._client
+
+    async def close(self):
+        """Close pooled connections"""
+        client, self._client, self._loop = self._client, None, None
+        if client is not None:
+            await client.aclose()
+
+
+# Process-wide client, started and closed in the app lifespan
+inference_client = InferenceClient()
@@ -0,0 +1,226 @@
+"""
+Background ingestion jobs
+
+The knowledge service stores the raw upload and enqueues a parse job; Celery
+workers (services/workers/tasks.py) import this module to parse and chunk the
+document, embed chunk batches in parallel as a chord, and finalize the
+document when every batch is done.
+"""
+import asyncio
+import logging
+from typing import List, Dict, Any
+
+from celery import Celery
+from sqlalchemy import update, select, delete, func
+
+from config import settings
+from database import AsyncSessionLocal
+from models import Document, Chunk, Embedding
+from services.bulk_writer import BulkWriter
+from services.chunker import TextChunker
+from services.embedder import EmbeddingService
+from services.parse_cache import parse_cache
+from services.reprocess import ReprocessService
+from services.search_cache import bump_generation
+from services.text_spool import TextSpool
+
+logger = logging.getLogger(__name__)
+
+# Progress reported once parsing and chunking are done; embedding batches
+# fill the rest of the range
+PARSED_PROGRESS = 10
+
+# Producer-side Celery client; tasks are dispatched by name so the knowledge
+# service does not import the worker code
+celery_app = Celery(
+    "career_mentor_workers",
+    broker=settings.CELERY_BROKER_URL or settings.REDIS_URL,
+    backend=settings.CELERY_RESULT_BACKEND or settings.REDIS_URL
+)
+
+
+async def enqueue_ingest(doc_id: str, user_id: str):
+    """Hand a stored upload off to the document workers"""
+    await asyncio.to_thread(
+        celery_app.send_task,
+        "tasks.parse_document",
+        args=[doc_id, user_id],
+        queue="documents"
+    )
+    logger.info(f"Queued document {doc_id} for ingestion")
+
+
+async def enqueue_reprocess(doc_id: str, reparse: bool = False):
+    """Hand an incremental reprocess off to the document workers"""
+    await asyncio.to_thread(
+        celery_app.send_task,
+        "tasks.reprocess_document",
+        args=[doc_id, reparse],
+        queue="documents"
+    )
+    logger.info(f"Queued document {doc_id} for reprocessing")
+
+
+async def parse_and_chunk(doc_id: str, user_id: str) -> Dict[str, Any]:
+    """
+    Parse the raw upload, store the clean text and write chunk rows
+
+    Returns:
+        {
+            "batches": [[{"id": str, "text": str}, ...], ...],
+            "total": int
+        }
+    """
+    async with AsyncSessionLocal() as db:
+        doc = await db.get(Document, doc_id)
+        if not doc:
+            raise ValueError(f"Document {doc_id} not found")
+
+        # Start clean if a previous attempt got part of the way
+        await db.execute(delete(Embedding).where(Embedding.doc_id == doc_id))
+        await db.execute(delete(Chunk).where(Chunk.doc_id == doc_id))
+
+        # Cache hits skip the raw download and the parse
+        parsed = await parse_cache.parse(
+            doc.content_hash, doc.content_type, doc.filename, raw_path=doc.raw_path
+        )
+
+        chunker = TextChunker(parsed["metadata"].get("format"))
+        writer = BulkWriter(db)
+        batch_size = settings.INGEST_BATCH_SIZE
+
+        text = TextSpool()
+        pending: List[Dict[str, Any]] = []
+        batches: List[List[Dict[str, str]]] = []
+        position = 0
+
+        async def flush(chunks: List[Dict[str, Any]]):
+            chunk_ids = await writer.write_chunks(doc_id, user_id, chunks)
+            batches.append([
+                {"id": chunk_id, "text": chunk["text"]}
+                for chunk_id, chunk in zip(chunk_ids, chunks)
+            ])
+
+        try:
+            async for segment in parsed["segments"]:
+                text_offset = text.write(segment["text"])
+
+                chunks = chunker.chunk_segment(
+                    segment["text"],
+                    segment["metadata"],
+                    position,
+                    text_offset
+                )
+                position += len(chunks)
+                pending.extend(chunks)
+
+                while len(pending) >= batch_size:
+                    await flush(pending[:batch_size])
+                    pending = pending[batch_size:]
+        except BaseException:
+            text.close()
+            raise
+
+        if pending:
+            await flush(pending)
+
+        # Save processed text to S3
+        clean_path = f"clean/{user_id}/{doc_id}/content.md"
+        await text.upload(clean_path)
+
+        doc.clean_path = clean_path
+        doc.doc_metadata = parsed["metadata"]
+        doc.progress = PARSED_PROGRESS
+        await db.commit()
+
+    logger.info(f"Document {doc_id} parsed: {position} chunks in {len(batches)} batches")
+
+    return {"batches": batches, "total": position}
+
+
+async def embed_chunk_batch(
+    doc_id: str,
+    user_id: str,
+    chunks: List[Dict[str, str]],
+    total: int
+) -> int:
+    """Embed one batch of stored chunks and advance document progress"""
+    embedder = EmbeddingService()
+    vectors = await embedder.embed_texts([c["text"] for c in chunks])
+
+    async with AsyncSessionLocal() as db:
+        writer = BulkWriter(db)
+        await writer.write_embeddings(doc_id, user_id, [c["id"] for c in chunks], vectors)
+
+        # Batches finish in any order across workers, so derive progress
+        # from what is stored rather than incrementing
+        embedded = (
+            select(func.count(Embedding.id))
+            .where(Embedding.doc_id == doc_id)
+            .scalar_subquery()
+        )
+        await db.execute(
+            update(Document)
+            .where(Document.id == doc_id)
+            .values(progress=PARSED_PROGRESS + (99 - PARSED_PROGRESS) * embedded // max(total, 1))
+        )
+        await db.commit()
+
+    return len(chunks)
+
+
+async def reprocess_document(doc_id: str, reparse: bool = False) -> Dict[str, int]:
+    """Re-chunk a document and embed only new or changed chunks"""
+    async with AsyncSessionLocal() as db:
+        doc = await db.get(Document, doc_id)
+        if not doc:
+            raise ValueError(f"Document {doc_id} not found")
+
+        stats = await ReprocessService().reprocess(db, doc, reparse)
+        await db.commit()
+        await bump_generation(doc.user_id)
+
+    return stats
+
+
+async def finalize_document(doc_id: str):
+    """Mark a document ready once all embedding batches are stored"""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(Document)
+            .where(Document.id == doc_id)
+            .values(status="ready", progress=100)
+            .returning(Document.user_id)
+        )
+        user_id = result.scalar_one_or_none()
+        await db.commit()
+
+    if user_id is not None:
+        await bump_generation(user_id)
+
+    logger.info(f"Document {doc_id} processed successfully")
+
+
+async def mark_failed(doc_id: str, error: str):
+    """
+    Record an ingestion failure on the document
+
+    Its chunks are committed at the parse stage, before any embedding, so
+    they are dropped here; a retry or re-upload starts from nothing.
+    """
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(Embedding).where(Embedding.doc_id == doc_id))
+        await db.execute(delete(Chunk).where(Chunk.doc_id == doc_id))
+        result = await db.execute(
+            update(Document)
+            .where(Document.id == doc_id)
+            .values(status="failed", error_message=error)
+            .returning(Document.user_id)
+        )
+        user_id = result.scalar_one_or_none()
+        await db.commit()
+
+    if user_id is not None:
+        await bump_generation(user_id)
+
+    logger.error(f"Document {doc_id} failed: {error}")
@@ -0,0 +1,131 @@
+"""
+OCR for scanned PDF pages and images
+
+Everything here is blocking and runs inside parse pool workers, so OCR of
+different pages proceeds on all cores at once. PDF pages whose text layer
+has fewer than OCR_MIN_TEXT_CHARS characters are treated as scanned:
+pdftoppm renders them and tesseract reads the render. Images are OCR'd
+frame by frame, so multi-page TIFFs come back whole.
+
+Results are cached in Redis by a hash of the rendered page (or frame
+pixels), so the same scan is never OCR'd twice, even inside another PDF.
+pytesseract and Pillow are optional; without them OCR is reported as
+unavailable and the text layer is used as is.
+"""
+import hashlib
+import io
+import logging
+import shutil
+import subprocess
+from typing import BinaryIO, List, Optional, Union
+
+import redis
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_redis_client: Optional[redis.Redis] = None
+
+
+def available() -> bool:
+    """Whether the OCR libraries and the tesseract binary are installed"""
+    try:
+        import pytesseract  # noqa: F401
+        from PIL import Image  # noqa: F401
+    except ImportError:
+        return False
+    return shutil.which("tesseract") is not None
+
+
+def _cache() -> redis.Redis:
+    # Sync client: workers run outside any event loop
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.REDIS_URL)
+    return _redis_client
+
+
+def _cache_key(digest: str) -> str:
+    return f"ocr:{settings.OCR_LANG}:{digest}"
+
+
+def _cached_ocr(digest: str, image_factory) -> str:
+    """OCR through the Redis cache; image_factory builds the PIL image on a miss"""
+    key = _cache_key(digest)
+    try:
+        cached = _cache().get(key)
+        if cached is not None:
+            return cached.decode("utf-8")
+    except Exception as e:
+        logger.warning(f"OCR cache lookup failed: {e}")
+
+    import pytesseract
+    text = pytesseract.image_to_string(image_factory(), lang=settings.OCR_LANG)
+
+    try:
+        _cache().set(key, text.encode("utf-8"), ex=settings.OCR_CACHE_TTL_SECONDS)
+    except Exception as e:
+        logger.warning(f"OCR cache write failed: {e}")
+
+    return text
+
+
+def is_scanned(text: Optional[str]) -> bool:
+    """A PDF page with (almost) no text layer"""
+    return len((text or "").strip()) < settings.OCR_MIN_TEXT_CHARS
+
+
+def ocr_pdf_page(path: str, page_index: int) -> Optional[str]:
+    """
+    Render one PDF page and OCR it
+
+    Returns None when OCR is disabled or unavailable, or rendering fails.
+    """
+    if not (settings.OCR_ENABLED and available()):
+        return None
+
+    page = page_index + 1
+    try:
+        # Without an output root, pdftoppm writes the single page to stdout
+        render = subprocess.run(
+            ["pdftoppm", "-png", "-r", str(settings.OCR_DPI), "-f", str(page), "-l", str(page), "-singlefile", path],
+            check=True,
+            capture_output=True,
+            timeout=settings.PARSE_TIMEOUT_SECONDS
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.warning(f"Failed to render page {page} of {path}: {e}")
+        return None
+
+    from PIL import Image
+    png = render.stdout
+    return _cached_ocr(hashlib.sha256(png).hexdigest(), lambda: Image.open(io.BytesIO(png)))
+
+
+def image_frame_count(source: Union[str, BinaryIO]) -> int:
+    """Frames in an image (pages of a multi-page TIFF); 1 without Pillow"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return 1
+
+    with Image.open(source) as image:
+        return getattr(image, "n_frames", 1)
+
+
+def ocr_image_frames(source: Union[str, BinaryIO], start: int, end: int) -> List[str]:
+    """OCR frames [start, end) of an image; callers check available() first"""
+    from PIL import Image
+
+    texts = []
+    with Image.open(source) as image:
+        for index in range(start, min(end, getattr(image, "n_frames", 1))):
+            image.seek(index)
+            frame = image.copy()
+            digest = hashlib.sha256(
+                f"{frame.mode}:{frame.size}".encode("utf-8") + frame.tobytes()
+            ).hexdigest()
+            texts.append(_cached_ocr(digest, lambda: frame))
+
+    return texts
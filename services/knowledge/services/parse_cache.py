@@ -0,0 +1,148 @@
+"""
+Parse result cache
+
+Parsed segments are stored in object storage as JSON Lines (one metadata
+line, then one line per segment), keyed by PARSER_VERSION, the document's
+content hash and its format. Re-ingests, reprocessing and re-chunking
+experiments read the segments back instead of running PDF/OCR/HTML
+extraction again. Bumping PARSER_VERSION invalidates every entry.
+"""
+import hashlib
+import json
+import logging
+import tempfile
+from typing import Any, AsyncIterator, Dict, Optional
+
+from config import settings
+from services.parse_pool import parse_pool
+from services.parser import PARSER_VERSION, iterate_in_thread
+from services.storage import storage, ObjectNotFoundError
+
+logger = logging.getLogger(__name__)
+
+
+class ParseCache:
+    """Read and write cached parse results"""
+
+    def __init__(self):
+        self.enabled = settings.PARSE_CACHE_ENABLED
+
+    @staticmethod
+    def key(digest: str, content_type: str, filename: str) -> str:
+        """Object key; the format matters since parsers dispatch on it"""
+        ext = filename.lower().split('.')[-1] if '.' in filename else ''
+        parser_format = hashlib.sha256(f"{content_type}\n{ext}".encode("utf-8")).hexdigest()[:16]
+        return f"parsed/v{PARSER_VERSION}/{digest}/{parser_format}.jsonl"
+
+    async def load(
+        self,
+        digest: Optional[str],
+        content_type: str,
+        filename: str,
+        source: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Cached parse result in DocumentParser.stream shape, or None on a miss
+
+        source labels the result (the filename by default, a URL for web
+        pages) in place of whatever upload first filled the entry.
+        """
+        if not (self.enabled and digest):
+            return None
+
+        spool = tempfile.SpooledTemporaryFile(max_size=settings.CLEAN_TEXT_SPOOL_BYTES)
+        try:
+            await storage.get_file(self.key(digest, content_type, filename), spool)
+        except ObjectNotFoundError:
+            spool.close()
+            return None
+        except Exception as e:
+            spool.close()
+            logger.warning(f"Parse cache read failed for {digest}: {e}")
+            return None
+
+        spool.seek(0)
+        header = json.loads(spool.readline())
+
+        # The cache is shared by content, so the entry may come from an
+        # upload with another filename
+        metadata = header["metadata"]
+        if "source" in metadata:
+            metadata["source"] = source or filename
+
+        logger.info(f"Parse cache hit for {filename} ({digest})")
+
+        return {"metadata": metadata, "segments": self._read(spool)}
+
+    @staticmethod
+    async def _read(spool) -> AsyncIterator[Dict[str, Any]]:
+        try:
+            async for line in iterate_in_thread(spool):
+                yield json.loads(line)
+        finally:
+            spool.close()
+
+    def record(self, digest: Optional[str], content_type: str, filename: str, parsed: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Pass a fresh parse result through, storing it once fully consumed
+
+        Segments are spooled as they stream past, so caching costs no extra
+        parse pass; a partially consumed stream is not stored.
+        """
+        if not (self.enabled and digest):
+            return parsed
+
+        key = self.key(digest, content_type, filename)
+
+        async def segments() -> AsyncIterator[Dict[str, Any]]:
+            spool = tempfile.SpooledTemporaryFile(max_size=settings.CLEAN_TEXT_SPOOL_BYTES)
+            try:
+                spool.write(self._line({"metadata": parsed["metadata"], "parser_version": PARSER_VERSION}))
+                async for segment in parsed["segments"]:
+                    spool.write(self._line(segment))
+                    yield segment
+
+                try:
+                    await storage.put_file(key, spool, "application/x-ndjson")
+                except Exception as e:
+                    logger.warning(f"Parse cache write failed for {digest}: {e}")
+            finally:
+                spool.close()
+                if hasattr(parsed["segments"], "aclose"):
+                    await parsed["segments"].aclose()
+
+        return {"metadata": parsed["metadata"], "segments": segments()}
+
+    async def parse(
+        self,
+        digest: Optional[str],
+        content_type: str,
+        filename: str,
+        content: Optional[bytes] = None,
+        raw_path: Optional[str] = None,
+        refresh: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Cached parse result, or a fresh parse in the pool that gets recorded
+
+        content is read from raw_path only on a miss, so cache hits skip the
+        raw download too. refresh skips the lookup and overwrites the entry.
+        """
+        if not refresh:
+            cached = await self.load(digest, content_type, filename)
+            if cached:
+                return cached
+
+        if content is None:
+            content = await storage.get_bytes(raw_path)
+
+        parsed = await parse_pool.stream(content, content_type, filename)
+        return self.record(digest, content_type, filename, parsed)
+
+    @staticmethod
+    def _line(record: Dict[str, Any]) -> bytes:
+        return json.dumps(record, default=str).encode("utf-8") + b"\n"
+
+
+# Process-wide cache
+parse_cache = ParseCache()
@@ -0,0 +1,351 @@
+"""
+Process-pool offload for CPU-bound document parsing
+
+pypdf, python-docx, openpyxl, python-pptx, BeautifulSoup and pytesseract all
+run synchronously, so parsing on the event loop stalls every concurrent
+request on the worker. ParsePool runs DocumentParser in a
+ProcessPoolExecutor instead. Only bytes/str go in, and results come back as
+a UTF-8 JSON payload of text and metadata, so no parser objects are ever
+pickled across the process boundary.
+
+CSV, Excel, JSON and JSON Lines files are read record by record in a worker
+that writes segments to a JSONL spool file, which is then streamed back line
+by line.
+
+PDFs are split into page ranges that run on all workers at once. Pages are
+yielded in order as ranges finish, and only a bounded number of ranges is in
+flight, so peak memory tracks in-flight pages rather than the whole document.
+Scanned PDFs and images are OCR'd the same way, OCR_PAGES_PER_TASK pages or
+frames per task, so tesseract runs on every worker at once.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, Any, AsyncIterator, List, Optional
+
+from config import settings
+from services import ocr
+from services.parser import DocumentParser, TempFileSegments, iterate_in_thread
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentTooLargeError(ValueError):
+    """Upload exceeds PARSE_MAX_BYTES"""
+
+
+class ParseTimeoutError(TimeoutError):
+    """Parsing exceeded PARSE_TIMEOUT_SECONDS"""
+
+
+def _encode(result: Dict[str, Any]) -> bytes:
+    return json.dumps(result, default=str).encode("utf-8")
+
+
+def _run_with_deadline(timeout: float, func, *args) -> bytes:
+    """
+    Worker-side wrapper: fail the task once it has run for timeout seconds
+
+    The clock starts when a worker picks the task up, so time spent queued
+    behind other documents never counts. SIGALRM interrupts pure-Python
+    parsing and subprocess waits (pdftoppm, tesseract); the worker process
+    stays up for the next task.
+    """
+    if not timeout or not hasattr(signal, "setitimer"):
+        return func(*args)
+
+    def expire(signum, frame):
+        raise ParseTimeoutError(f"Parsing timed out after {timeout}s")
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return func(*args)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _stream_in_worker(content: bytes, content_type: str, filename: str) -> bytes:
+    """Worker entry point: parse into segments and return them as JSON"""
+    async def collect():
+        parsed = await DocumentParser.stream(content, content_type, filename)
+        return {
+            "metadata": parsed["metadata"],
+            "segments": [segment async for segment in parsed["segments"]]
+        }
+
+    return _encode(asyncio.run(collect()))
+
+
+def _parse_html_in_worker(html_content: str, url: str) -> bytes:
+    """Worker entry point: parse fetched HTML and return it as JSON"""
+    return _encode(asyncio.run(DocumentParser.parse_html(html_content, url)))
+
+
+def _pdf_info_in_worker(path: str, filename: str) -> bytes:
+    """Worker entry point: PDF page count and document metadata"""
+    return _encode(DocumentParser.pdf_info(path, filename))
+
+
+def _pdf_pages_in_worker(path: str, start: int, end: int) -> bytes:
+    """Worker entry point: text of one page range"""
+    return _encode({"pages": DocumentParser.extract_pdf_pages(path, start, end)})
+
+
+def _image_info_in_worker(path: str, filename: str, content_type: str) -> bytes:
+    """Worker entry point: image frame count and metadata"""
+    return _encode(DocumentParser.image_info(path, filename, content_type))
+
+
+def _image_frames_in_worker(path: str, start: int, end: int) -> bytes:
+    """Worker entry point: OCR text of one frame range"""
+    return _encode({"pages": ocr.ocr_image_frames(path, start, end)})
+
+
+def _records_in_worker(in_path: str, out_path: str, record_format: str, filename: str) -> bytes:
+    """Worker entry point: write record segments as JSONL, return metadata"""
+    with open(in_path, "rb") as source, open(out_path, "w", encoding="utf-8") as out:
+        metadata, segments = DocumentParser.record_segments(source, record_format, filename)
+        for segment in segments:
+            out.write(json.dumps(segment, default=str))
+            out.write("\n")
+
+    return _encode(metadata)
+
+
+def _is_pdf(content_type: str, filename: str) -> bool:
+    return content_type == "application/pdf" or filename.lower().endswith(".pdf")
+
+
+async def _iterate(segments: List[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+    for segment in segments:
+        yield segment
+
+
+class ParsePool:
+    """Run DocumentParser in worker processes with timeouts and a size guard"""
+
+    def __init__(self):
+        self.workers = settings.PARSE_WORKERS
+        self.timeout = settings.PARSE_TIMEOUT_SECONDS
+        self.max_bytes = settings.PARSE_MAX_BYTES
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def enabled(self) -> bool:
+        # Daemonic processes (Celery prefork children) cannot have children,
+        # so they parse inline, one page at a time; the documents queue runs
+        # on a solo-pool worker to get page-parallel parsing and OCR
+        return self.workers > 0 and not multiprocessing.current_process().daemon
+
+    def start(self):
+        """Create the worker processes"""
+        if self.enabled and self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            logger.info(f"Parse pool started with {self.workers} workers")
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def check_size(self, size: int):
+        """Reject documents over PARSE_MAX_BYTES before doing any work"""
+        if size > self.max_bytes:
+            raise DocumentTooLargeError(
+                f"Document is {size} bytes, limit is {self.max_bytes}"
+            )
+
+    async def stream(self, content: bytes, content_type: str, filename: str) -> Dict[str, Any]:
+        """
+        Parse a document into segments off the event loop
+
+        Returns the same shape as DocumentParser.stream.
+        """
+        self.check_size(len(content))
+
+        if not self.enabled:
+            return await DocumentParser.stream(content, content_type, filename)
+
+        if _is_pdf(content_type, filename):
+            return await self._stream_pdf(content, filename)
+
+        if DocumentParser.is_image(content_type, filename):
+            return await self._stream_image(content, content_type, filename)
+
+        record_format = DocumentParser.record_format(content_type, filename)
+        if record_format:
+            return await self._stream_records(content, record_format, filename)
+
+        parsed = await self._run(_stream_in_worker, content, content_type, filename)
+        return {"metadata": parsed["metadata"], "segments": _iterate(parsed["segments"])}
+
+    async def parse_html(self, html_content: str, url: str) -> Dict[str, Any]:
+        """Parse fetched HTML off the event loop"""
+        # PARSE_MAX_BYTES is a byte limit, as for files
+        self.check_size(len(html_content.encode("utf-8")))
+
+        if not self.enabled:
+            return await DocumentParser.parse_html(html_content, url)
+
+        return await self._run(_parse_html_in_worker, html_content, url)
+
+    @staticmethod
+    async def _spool_input(content: bytes, suffix: str) -> str:
+        """Write content to a temp file workers can open by path"""
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        try:
+            with os.fdopen(fd, "wb") as spool:
+                await asyncio.to_thread(spool.write, content)
+        except BaseException:
+            os.unlink(path)
+            raise
+        return path
+
+    async def _stream_records(self, content: bytes, record_format: str, filename: str) -> Dict[str, Any]:
+        """Record-format parsing; segments come back through a JSONL spool"""
+        in_path = await self._spool_input(content, Path(filename).suffix)
+        fd, out_path = tempfile.mkstemp(suffix=".jsonl")
+        os.close(fd)
+
+        try:
+            metadata = await self._run(_records_in_worker, in_path, out_path, record_format, filename)
+        except BaseException:
+            os.unlink(out_path)
+            raise
+        finally:
+            os.unlink(in_path)
+
+        return {"metadata": metadata, "segments": TempFileSegments(out_path, self._read_spool(out_path))}
+
+    @staticmethod
+    async def _read_spool(path: str) -> AsyncIterator[Dict[str, Any]]:
+        with open(path, encoding="utf-8") as spool:
+            async for line in iterate_in_thread(spool):
+                yield json.loads(line)
+
+    async def _stream_pdf(self, content: bytes, filename: str) -> Dict[str, Any]:
+        """Page-parallel PDF extraction; workers read the PDF from a temp file"""
+        path = await self._spool_input(content, ".pdf")
+        try:
+            metadata = await self._run(_pdf_info_in_worker, path, filename)
+        except BaseException:
+            os.unlink(path)
+            raise
+
+        step = DocumentParser.pages_per_task(metadata)
+        return {
+            "metadata": metadata,
+            "segments": TempFileSegments(
+                path, self._page_ranges(_pdf_pages_in_worker, path, metadata["pages"], step)
+            )
+        }
+
+    async def _stream_image(self, content: bytes, content_type: str, filename: str) -> Dict[str, Any]:
+        """Frame-parallel image OCR; workers read the image from a temp file"""
+        path = await self._spool_input(content, Path(filename).suffix)
+        try:
+            metadata = await self._run(_image_info_in_worker, path, filename, content_type)
+        except BaseException:
+            os.unlink(path)
+            raise
+
+        if "error" in metadata:
+            # Nothing to OCR; the inline parser produces the placeholder
+            os.unlink(path)
+            return await DocumentParser.stream(content, content_type, filename)
+
+        step = DocumentParser.pages_per_task(metadata)
+        return {
+            "metadata": metadata,
+            "segments": TempFileSegments(
+                path, self._page_ranges(_image_frames_in_worker, path, metadata["pages"], step)
+            )
+        }
+
+    async def _page_ranges(self, worker, path: str, page_count: int, step: int) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield pages in order while later ranges are still being extracted
+
+        The caller's TempFileSegments owns the file at path.
+        """
+        max_inflight = settings.PDF_MAX_INFLIGHT_RANGES or self.workers * 2
+        starts = iter(range(0, page_count, step))
+        pending = deque()
+
+        try:
+            for start in itertools.islice(starts, max_inflight):
+                pending.append((start, self._submit(worker, path, start, start + step)))
+
+            while pending:
+                start, future = pending.popleft()
+                result = await self._wait(future)
+
+                next_start = next(starts, None)
+                if next_start is not None:
+                    pending.append((
+                        next_start,
+                        self._submit(worker, path, next_start, next_start + step)
+                    ))
+
+                for offset, text in enumerate(result["pages"]):
+                    yield {"text": text, "metadata": {"page": start + offset + 1}}
+
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+    async def _run(self, func, *args) -> Dict[str, Any]:
+        """Submit to the pool and wait for the result"""
+        return await self._wait(self._submit(func, *args))
+
+    def _submit(self, func, *args) -> asyncio.Future:
+        self.start()
+        executor = self._executor
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(executor, _run_with_deadline, self.timeout, func, *args)
+        future.add_done_callback(lambda done: self._discard_if_broken(executor, done))
+        return future
+
+    def _discard_if_broken(self, executor: ProcessPoolExecutor, future: asyncio.Future):
+        """
+        Drop a pool whose worker died (segfault in a C extension, OOM kill)
+
+        Every task of a broken pool fails with BrokenProcessPool, and so
+        would every later submit; the next one starts a fresh pool instead.
+        """
+        if future.cancelled() or not isinstance(future.exception(), BrokenProcessPool):
+            return
+        if self._executor is executor:
+            logger.error("Parse pool worker died; restarting the pool")
+            self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    async def _wait(future: asyncio.Future) -> Dict[str, Any]:
+        """
+        Wait for a submitted task
+
+        Workers enforce PARSE_TIMEOUT_SECONDS themselves (ParseTimeoutError
+        comes back through the future), so a backlog only means waiting and
+        a timeout fails only its own task.
+        """
+        return json.loads(await future)
+
+
+# Process-wide pool, started in the app lifespan
+parse_pool = ParsePool()
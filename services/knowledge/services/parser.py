@@ -1,10 +1,15 @@
 """
 Document parsing service
-Supports: PDF, DOCX, TXT, MD, HTML, CSV, XLSX, XLS, RTF, ODT, PPTX, Images (OCR)
+Supports: PDF, DOCX, TXT, MD, HTML, CSV, XLSX, XLS, JSON, JSONL, RTF, ODT, PPTX, Images (OCR)
 """
 import logging
+import asyncio
+import itertools
+import os
+import tempfile
+import weakref
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator, BinaryIO, Callable, Iterator, List, Optional, Tuple
 from pypdf import PdfReader
 from docx import Document
 import io
@@ -13,8 +18,194 @@ import re
 import json
 import csv
 
+from config import settings
+from services import ocr
+from services.chunker import chunk_budget
+from services.html_extract import extract_html
+
 logger = logging.getLogger(__name__)
 
+# Bump whenever parser output (text, segments or metadata) changes; cached
+# parse results from other versions are then ignored
+PARSER_VERSION = 3
+
+
+async def iterate_in_thread(iterator: Iterator, batch_size: int = 64) -> AsyncIterator:
+    """Drain a blocking iterator off the event loop, batch_size items per hop"""
+    while True:
+        batch = await asyncio.to_thread(lambda: list(itertools.islice(iterator, batch_size)))
+        if not batch:
+            return
+        for item in batch:
+            yield item
+
+
+def _remove_file(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+class TempFileSegments:
+    """
+    A segment stream read from a temp file, which it removes when done
+
+    An async generator's finally block never runs if the generator is
+    dropped before its first iteration, so the file belongs to this wrapper
+    instead: it is removed once the stream is exhausted, fails or is
+    closed, or when the wrapper is garbage-collected, started or not.
+    """
+
+    def __init__(self, path: str, segments: AsyncIterator[Dict[str, Any]]):
+        self._segments = segments
+        self._remove = weakref.finalize(self, _remove_file, path)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Dict[str, Any]:
+        try:
+            return await self._segments.__anext__()
+        except BaseException:
+            await self.aclose()
+            raise
+
+    async def aclose(self):
+        try:
+            await self._segments.aclose()
+        finally:
+            self._remove()
+
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+# Characters that can continue a number after raw_decode stops
+_NUMBER_TAIL = re.compile(r"[0-9.eE+-]*")
+
+
+class _JsonStream:
+    """Decode JSON values incrementally from a text stream"""
+
+    def __init__(self, text_io, read_size: int = 64 * 1024):
+        self.text_io = text_io
+        self.read_size = read_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size: int) -> bool:
+        data = self.text_io.read(size)
+        if not data:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character without consuming it; "" at EOF"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill(self.read_size):
+                return ""
+
+    def _expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"Malformed JSON: expected {char!r} at offset {self.pos}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode the next complete value, reading more input as needed"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A number ending at the buffer edge, or cut before its
+                # fraction or exponent ("12." / "1e"), may continue
+                if self.eof or not _NUMBER_TAIL.fullmatch(self.buffer, end):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Grow reads with the record so huge records are not re-scanned
+            # once per read_size
+            self._fill(max(self.read_size, len(self.buffer) - self.pos))
+
+    def array(self) -> Iterator[Any]:
+        """Elements of the array starting at the cursor"""
+        self._expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self._expect("]")
+            return
+
+    def keys(self) -> Iterator[str]:
+        """
+        Keys of the object starting at the cursor
+
+        Each key is yielded with the cursor on its value, which the caller
+        must consume (value(), array() or keys()) before the next key.
+        """
+        self._expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self._expect(":")
+            yield key
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self._expect("}")
+            return
+
+    def members(self) -> Iterator[Tuple[str, Any]]:
+        """Key/value pairs of the object starting at the cursor"""
+        for key in self.keys():
+            yield key, self.value()
+
+
+def _flatten(value: Any, prefix: str = "") -> Iterator[str]:
+    """Flatten nested JSON into "a.b[0].c: value" lines"""
+    if isinstance(value, dict):
+        if not value and prefix:
+            yield f"{prefix}: {{}}"
+        for key, item in value.items():
+            yield from _flatten(item, f"{prefix}.{key}" if prefix else str(key))
+    elif isinstance(value, list):
+        if not value and prefix:
+            yield f"{prefix}: []"
+        for index, item in enumerate(value):
+            yield from _flatten(item, f"{prefix}[{index}]")
+    else:
+        text = value if isinstance(value, str) else json.dumps(value)
+        yield f"{prefix}: {text}" if prefix else text
+
+
+def _group_budget() -> Tuple[int, Callable[[str], int]]:
+    """
+    Record/row group budget and a size function, in CHUNK_SIZE_UNIT
+
+    Matches the chunker's window, so a group fills one chunk in token mode
+    too (token-sized groups measured in characters come out ~4x small).
+    """
+    budget, length_function = chunk_budget()
+    if length_function is None:
+        return budget, len
+    return budget, lambda text: length_function([text])[0]
+
 
 class DocumentParser:
     """Parse various document formats to text"""
@@ -55,8 +246,8 @@ class DocumentParser:
                 return await DocumentParser._parse_excel(file_content, filename)
 
             # JSON
-            elif content_type == "application/json" or ext == 'json':
-                return await DocumentParser._parse_json(file_content, filename)
+            elif content_type in ["application/json", "application/x-ndjson", "application/jsonl"] or ext in ['json', 'jsonl', 'ndjson']:
+                return await DocumentParser._parse_json(file_content, filename, content_type)
 
             # HTML
             elif content_type == "text/html" or ext in ['html', 'htm']:
@@ -71,7 +262,7 @@ class DocumentParser:
                 return await DocumentParser._parse_rtf(file_content, filename)
 
             # Images (OCR)
-            elif content_type.startswith("image/") or ext in ['png', 'jpg', 'jpeg', 'gif', 'bmp', 'tiff']:
+            elif DocumentParser.is_image(content_type, filename):
                 return await DocumentParser._parse_image(file_content, filename, content_type)
 
             else:
@@ -90,18 +281,128 @@ class DocumentParser:
             raise
 
     @staticmethod
-    async def _parse_pdf(content: bytes, filename: str) -> Dict[str, Any]:
-        """Parse PDF file"""
-        pdf_file = io.BytesIO(content)
-        reader = PdfReader(pdf_file)
+    async def stream(file_content: bytes, content_type: str, filename: str) -> Dict[str, Any]:
+        """
+        Parse document into a stream of text segments for the ingestion pipeline
 
-        text_parts = []
-        for page_num, page in enumerate(reader.pages):
-            text = page.extract_text()
-            text_parts.append(text)
+        Formats with natural page structure (PDF, multi-frame images) yield one
+        segment per page as soon as it is extracted or OCR'd, and record formats (CSV, Excel, JSON, JSON
+        Lines) yield row or record groups as they are read; everything else
+        is parsed in full and yielded as a single segment.
 
-        full_text = "\n\n".join(text_parts)
+        Returns:
+            {
+                "metadata": dict,
+                "segments": async iterator of {"text": str, "metadata": dict}
+            }
+        """
+        ext = filename.lower().split('.')[-1] if '.' in filename else ''
+
+        if content_type == "application/pdf" or ext == 'pdf':
+            return await DocumentParser._stream_pdf(file_content, filename)
+
+        if DocumentParser.is_image(content_type, filename):
+            metadata = await asyncio.to_thread(
+                DocumentParser.image_info, io.BytesIO(file_content), filename, content_type
+            )
+            return {
+                "metadata": metadata,
+                "segments": DocumentParser._stream_image_frames(file_content, metadata)
+            }
+
+        record_format = DocumentParser.record_format(content_type, filename)
+        if record_format:
+            metadata, segments = await asyncio.to_thread(
+                DocumentParser.record_segments, io.BytesIO(file_content), record_format, filename
+            )
+            return {"metadata": metadata, "segments": iterate_in_thread(segments)}
+
+        parsed = await DocumentParser.parse(file_content, content_type, filename)
+        return DocumentParser.as_stream(parsed)
+
+    @staticmethod
+    def as_stream(parsed: Dict[str, Any]) -> Dict[str, Any]:
+        """Wrap an already parsed document as a single-segment stream"""
+        async def segments() -> AsyncIterator[Dict[str, Any]]:
+            yield {"text": parsed["text"], "metadata": {}}
+
+        return {"metadata": parsed["metadata"], "segments": segments()}
+
+    @staticmethod
+    async def _joined(parsed: Dict[str, Any]) -> Dict[str, Any]:
+        """Collapse a segment stream back into a single text"""
+        texts = [segment["text"] async for segment in parsed["segments"]]
+        return {"text": "\n\n".join(texts), "metadata": parsed["metadata"]}
+
+    @staticmethod
+    def pages_per_task(metadata: Dict[str, Any]) -> int:
+        """Pages extracted per step; OCR'd pages go one range at a time"""
+        if metadata.get("scanned") or metadata.get("ocr"):
+            return settings.OCR_PAGES_PER_TASK
+        return settings.PDF_PAGES_PER_TASK
+
+    @staticmethod
+    async def _stream_pdf(content: bytes, filename: str) -> Dict[str, Any]:
+        """Inline PDF stream, read from a temp file so scanned pages can be rendered"""
+        fd, path = tempfile.mkstemp(suffix=".pdf")
+        try:
+            with os.fdopen(fd, "wb") as spool:
+                await asyncio.to_thread(spool.write, content)
+            metadata = await asyncio.to_thread(DocumentParser.pdf_info, path, filename)
+        except BaseException:
+            os.unlink(path)
+            raise
+
+        return {
+            "metadata": metadata,
+            "segments": TempFileSegments(path, DocumentParser._stream_pdf_pages(path, metadata))
+        }
+
+    @staticmethod
+    async def _stream_pdf_pages(path: str, metadata: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Yield PDF pages range by range, extracting off the event loop"""
+        step = DocumentParser.pages_per_task(metadata)
+        for start in range(0, metadata["pages"], step):
+            texts = await asyncio.to_thread(DocumentParser.extract_pdf_pages, path, start, start + step)
+            for offset, text in enumerate(texts):
+                yield {"text": text, "metadata": {"page": start + offset + 1}}
+
+    @staticmethod
+    def pdf_info(path: str, filename: str) -> Dict[str, Any]:
+        """
+        Document-level metadata for a PDF on disk (pages are read lazily)
 
+        A PDF whose first page has no text layer is marked scanned when OCR
+        is available, so its pages are spread thinly across workers.
+        """
+        reader = PdfReader(path)
+        metadata = DocumentParser._pdf_metadata(reader, filename)
+
+        if settings.OCR_ENABLED and reader.pages and ocr.available():
+            if ocr.is_scanned(reader.pages[0].extract_text()):
+                metadata["scanned"] = True
+
+        return metadata
+
+    @staticmethod
+    def extract_pdf_pages(path: str, start: int, end: int) -> List[str]:
+        """
+        Extract text for pages [start, end) of a PDF on disk
+
+        Pages with (almost) no text layer are rendered and OCR'd instead.
+        """
+        reader = PdfReader(path)
+        pages = []
+        for i in range(start, min(end, len(reader.pages))):
+            text = reader.pages[i].extract_text()
+            if settings.OCR_ENABLED and ocr.is_scanned(text):
+                text = ocr.ocr_pdf_page(path, i) or text
+            pages.append(text)
+        return pages
+
+    @staticmethod
+    def _pdf_metadata(reader: PdfReader, filename: str) -> Dict[str, Any]:
+        """Document-level metadata for a PDF"""
         metadata = {
             "pages": len(reader.pages),
             "source": filename,
@@ -116,10 +417,12 @@ class DocumentParser:
                 "subject": reader.metadata.get("/Subject", ""),
             })
 
-        return {
-            "text": full_text,
-            "metadata": metadata
-        }
+        return metadata
+
+    @staticmethod
+    async def _parse_pdf(content: bytes, filename: str) -> Dict[str, Any]:
+        """Parse PDF file"""
+        return await DocumentParser._joined(await DocumentParser._stream_pdf(content, filename))
 
     @staticmethod
     async def _parse_docx(content: bytes, filename: str) -> Dict[str, Any]:
@@ -127,8 +430,14 @@ class DocumentParser:
         docx_file = io.BytesIO(content)
         doc = Document(docx_file)
 
-        # Extract all paragraphs
-        text_parts = [para.text for para in doc.paragraphs if para.text.strip()]
+        # Extract all paragraphs; headings become markdown headings so
+        # section chunking can follow the document outline
+        text_parts = []
+        for para in doc.paragraphs:
+            if not para.text.strip():
+                continue
+            level = DocumentParser._docx_heading_level(para)
+            text_parts.append(f"{'#' * level} {para.text.strip()}" if level else para.text)
         full_text = "\n\n".join(text_parts)
 
         metadata = {
@@ -150,6 +459,19 @@ class DocumentParser:
             "metadata": metadata
         }
 
+    @staticmethod
+    def _docx_heading_level(para) -> int:
+        """1-6 for Title/Heading N paragraphs, 0 otherwise"""
+        style = para.style.name if para.style is not None else ""
+        if style == "Title":
+            return 1
+        if style.startswith("Heading "):
+            try:
+                return min(max(int(style.split(" ", 1)[1]), 1), 6)
+            except ValueError:
+                return 0
+        return 0
+
     @staticmethod
     async def _parse_text(content: bytes, filename: str) -> Dict[str, Any]:
         """Parse plain text or markdown file"""
@@ -170,6 +492,9 @@ class DocumentParser:
         """
         Parse HTML content from URL to clean markdown-like text
 
+        HTML_PARSER_BACKEND selects the single-pass lxml extractor or the
+        BeautifulSoup one; both produce the same text and metadata.
+
         Args:
             html_content: Raw HTML content
             url: Source URL
@@ -180,6 +505,18 @@ class DocumentParser:
                 "metadata": dict
             }
         """
+        try:
+            if settings.HTML_PARSER_BACKEND == "lxml":
+                return extract_html(html_content, url)
+            return DocumentParser.parse_html_bs4(html_content, url)
+
+        except Exception as e:
+            logger.error(f"Failed to parse HTML from {url}: {e}")
+            raise
+
+    @staticmethod
+    def parse_html_bs4(html_content: str, url: str) -> Dict[str, Any]:
+        """BeautifulSoup extractor (html.parser); see parse_html"""
         try:
             soup = BeautifulSoup(html_content, 'html.parser')
 
@@ -190,17 +527,13 @@ class DocumentParser:
             # Extract title
             title = ""
             if soup.title:
-                title = soup.title.string.strip()
+                title = soup.title.get_text().strip()
             elif soup.find('h1'):
                 title = soup.find('h1').get_text().strip()
 
             # Extract main content
             # Try to find main content area
-            main_content = None
-            for tag in ['article', 'main', '[role="main"]']:
-                main_content = soup.find(tag)
-                if main_content:
-                    break
+            main_content = soup.find('article') or soup.find('main') or soup.find(attrs={'role': 'main'})
 
             if not main_content:
                 main_content = soup.find('body') or soup
@@ -261,77 +594,280 @@ class DocumentParser:
 
     @staticmethod
     async def _parse_csv(content: bytes, filename: str) -> Dict[str, Any]:
-        """Parse CSV file"""
-        text_io = io.StringIO(content.decode('utf-8'))
-        reader = csv.DictReader(text_io)
-        
-        rows = list(reader)
-        text_parts = []
-        
-        # Convert CSV to readable format
-        for i, row in enumerate(rows):
-            row_text = f"Row {i+1}:\n"
-            for key, value in row.items():
-                row_text += f"  {key}: {value}\n"
-            text_parts.append(row_text)
-        
+        """Parse CSV file into header-prefixed row groups"""
+        metadata, segments = DocumentParser.record_segments(io.BytesIO(content), "csv", filename)
         return {
-            "text": "\n".join(text_parts),
-            "metadata": {
-                "source": filename,
-                "format": "csv",
-                "rows": len(rows),
-                "columns": len(rows[0].keys()) if rows else 0
-            }
+            "text": "\n\n".join(segment["text"] for segment in segments),
+            "metadata": metadata
         }
 
     @staticmethod
     async def _parse_excel(content: bytes, filename: str) -> Dict[str, Any]:
-        """Parse Excel file (XLSX/XLS)"""
+        """Parse Excel file (XLSX/XLS) into header-prefixed row groups"""
+        metadata, segments = DocumentParser.record_segments(io.BytesIO(content), "excel", filename)
+        return {
+            "text": "\n\n".join(segment["text"] for segment in segments),
+            "metadata": metadata
+        }
+
+    @staticmethod
+    def record_format(content_type: str, filename: str) -> Optional[str]:
+        """"csv", "excel", "json" or "jsonl" for record documents, None otherwise"""
+        ext = filename.lower().split('.')[-1] if '.' in filename else ''
+
+        if content_type == "text/csv" or ext == 'csv':
+            return "csv"
+        if content_type in ["application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "application/vnd.ms-excel"] or ext in ['xlsx', 'xls']:
+            return "excel"
+        if content_type in ["application/x-ndjson", "application/jsonl"] or ext in ['jsonl', 'ndjson']:
+            return "jsonl"
+        if content_type == "application/json" or ext == 'json':
+            return "json"
+        return None
+
+    @staticmethod
+    def record_segments(
+        source: BinaryIO,
+        record_format: str,
+        filename: str
+    ) -> Tuple[Dict[str, Any], Iterator[Dict[str, Any]]]:
+        """
+        Read a CSV, Excel, JSON or JSON Lines file incrementally (blocking)
+
+        Returns document metadata and a lazy iterator of segments.
+
+        Tabular segments repeat the header row and carry sheet (Excel only),
+        row_start and row_end metadata; row numbers are 1-based as in the
+        file, so the header is row 1. JSON segments hold whole flattened
+        records and carry their json_path.
+        """
+        if record_format == "csv":
+            return DocumentParser._csv_segments(source, filename)
+        if record_format in ("json", "jsonl"):
+            return DocumentParser._json_segments(source, record_format, filename)
+        return DocumentParser._excel_segments(source, filename)
+
+    @staticmethod
+    def _csv_segments(source: BinaryIO, filename: str) -> Tuple[Dict[str, Any], Iterator[Dict[str, Any]]]:
+        reader = csv.reader(io.TextIOWrapper(source, encoding="utf-8-sig", newline=""))
+        header = next(reader, [])
+
+        metadata = {
+            "source": filename,
+            "format": "csv",
+            "columns": len(header)
+        }
+        rows = enumerate(reader, start=2)
+
+        return metadata, DocumentParser._row_groups(" | ".join(header), rows, {})
+
+    @staticmethod
+    def _excel_segments(source: BinaryIO, filename: str) -> Tuple[Dict[str, Any], Iterator[Dict[str, Any]]]:
         try:
             import openpyxl
-            wb = openpyxl.load_workbook(io.BytesIO(content))
-            
-            text_parts = []
-            for sheet_name in wb.sheetnames:
-                sheet = wb[sheet_name]
-                text_parts.append(f"Sheet: {sheet_name}\n")
-                
-                for row in sheet.iter_rows(values_only=True):
-                    row_text = " | ".join(str(cell) if cell is not None else "" for cell in row)
-                    if row_text.strip():
-                        text_parts.append(row_text)
-            
-            return {
-                "text": "\n".join(text_parts),
-                "metadata": {
-                    "source": filename,
-                    "format": "excel",
-                    "sheets": len(wb.sheetnames)
-                }
-            }
         except ImportError:
+            return (
+                {"source": filename, "format": "excel", "error": "parser_unavailable"},
+                iter([{"text": f"Excel file: {filename} (Excel parser not available)", "metadata": {}}])
+            )
+
+        # Read-only mode streams rows from the XML instead of building the
+        # whole workbook in memory
+        wb = openpyxl.load_workbook(source, read_only=True, data_only=True)
+        metadata = {
+            "source": filename,
+            "format": "excel",
+            "sheets": len(wb.sheetnames)
+        }
+
+        def segments() -> Iterator[Dict[str, Any]]:
+            try:
+                for sheet in wb.worksheets:
+                    rows = (
+                        (row_num, ["" if cell is None else str(cell) for cell in row])
+                        # Read-only iter_rows() always starts at row 1, padding
+                        # empty leading rows, whatever min_row says
+                        for row_num, row in enumerate(sheet.iter_rows(values_only=True), start=1)
+                    )
+                    rows = ((row_num, values) for row_num, values in rows if any(values))
+
+                    # The first non-empty row is the sheet's header
+                    first = next(rows, None)
+                    if first is None:
+                        continue
+
+                    header = f"Sheet: {sheet.title}\n" + " | ".join(first[1])
+                    yield from DocumentParser._row_groups(header, rows, {"sheet": sheet.title})
+            finally:
+                wb.close()
+
+        return metadata, segments()
+
+    @staticmethod
+    def _row_groups(
+        header: str,
+        rows: Iterator[Tuple[int, List[str]]],
+        group_metadata: Dict[str, Any]
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Pack consecutive rows into segments of up to one chunk
+
+        Each group fits in one chunk, so a table becomes a few self-describing
+        chunks instead of one fragment per row. A single row longer than the
+        budget forms its own group and is split by the chunker.
+        """
+        budget, measure = _group_budget()
+        header_size = measure(header)
+        lines: List[str] = []
+        size = header_size
+        row_start = row_end = 0
+
+        def group() -> Dict[str, Any]:
             return {
-                "text": f"Excel file: {filename} (Excel parser not available)",
-                "metadata": {"source": filename, "format": "excel", "error": "parser_unavailable"}
+                "text": header + "\n" + "\n".join(lines),
+                "metadata": {**group_metadata, "row_start": row_start, "row_end": row_end}
             }
 
+        for row_num, values in rows:
+            line = " | ".join(values)
+            if not line.strip(" |"):
+                continue
+
+            line_size = 1 + measure(line)
+            if lines and size + line_size > budget:
+                yield group()
+                lines = []
+                size = header_size
+
+            if not lines:
+                row_start = row_num
+            lines.append(line)
+            size += line_size
+            row_end = row_num
+
+        if lines:
+            yield group()
+
     @staticmethod
-    async def _parse_json(content: bytes, filename: str) -> Dict[str, Any]:
-        """Parse JSON file"""
-        data = json.loads(content.decode('utf-8'))
-        
-        # Convert JSON to readable text
-        text = json.dumps(data, indent=2)
-        
+    async def _parse_json(content: bytes, filename: str, content_type: str = "") -> Dict[str, Any]:
+        """Parse JSON or JSON Lines file into flattened records"""
+        record_format = DocumentParser.record_format(content_type, filename) or "json"
+        metadata, segments = DocumentParser.record_segments(io.BytesIO(content), record_format, filename)
         return {
-            "text": text,
-            "metadata": {
-                "source": filename,
-                "format": "json"
-            }
+            "text": "\n\n".join(segment["text"] for segment in segments),
+            "metadata": metadata
         }
 
+    @staticmethod
+    def _json_segments(
+        source: BinaryIO,
+        record_format: str,
+        filename: str
+    ) -> Tuple[Dict[str, Any], Iterator[Dict[str, Any]]]:
+        """
+        Stream records from a top-level array, object or JSON Lines file
+
+        Array elements and JSON Lines records are decoded one at a time, so
+        memory follows the largest record rather than the file. Objects are
+        walked member by member at any depth: arrays and objects inside
+        them are streamed the same way, and every other member is one
+        record that keeps its dotted key in the text.
+        """
+        text_io = io.TextIOWrapper(source, encoding="utf-8-sig")
+        metadata = {"source": filename, "format": record_format}
+        stream = _JsonStream(text_io)
+
+        def members(path: str, prefix: str) -> Iterator[Tuple[str, Any, Any]]:
+            for key in stream.keys():
+                name = f"{prefix}.{key}" if prefix else str(key)
+                first = stream.peek()
+                empty = True
+
+                if first == "[":
+                    for index, item in enumerate(stream.array()):
+                        empty = False
+                        # Objects read as records; anything else keeps its key
+                        yield f"{path}.{key}", index, item if isinstance(item, dict) else {f"{name}[{index}]": item}
+                elif first == "{":
+                    for record in members(f"{path}.{key}", name):
+                        empty = False
+                        yield record
+                else:
+                    empty = False
+                    yield path, key, {name: stream.value()}
+
+                if empty:
+                    yield path, key, {name: [] if first == "[" else {}}
+
+        def records() -> Iterator[Tuple[str, Any, Any]]:
+            if record_format == "jsonl":
+                index = 0
+                for line in text_io:
+                    if line.strip():
+                        yield "$", index, json.loads(line)
+                        index += 1
+                return
+
+            first = stream.peek()
+            if first == "[":
+                for index, value in enumerate(stream.array()):
+                    yield "$", index, value
+            elif first == "{":
+                yield from members("$", "")
+            elif first:
+                yield "$", None, stream.value()
+
+        return metadata, DocumentParser._record_groups(records())
+
+    @staticmethod
+    def _record_groups(records: Iterator[Tuple[str, Any, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Pack consecutive array elements, or members of one object, into
+        segments of up to one chunk
+
+        Records come as (path, index or key, value). They are never split
+        across segments; json_path is the element ($[3]), the element range
+        ($[3:7]), the member ($.key) or the object ($.parent) covered.
+        """
+        budget, measure = _group_budget()
+        texts: List[str] = []
+        size = 0
+        group_path = None
+        start = end = None
+
+        def group() -> Dict[str, Any]:
+            if start is None:
+                json_path = group_path
+            elif isinstance(start, str):
+                json_path = f"{group_path}.{start}" if start == end else group_path
+            elif start == end:
+                json_path = f"{group_path}[{start}]"
+            else:
+                json_path = f"{group_path}[{start}:{end + 1}]"
+            return {"text": "\n\n".join(texts), "metadata": {"json_path": json_path}}
+
+        for path, index, value in records:
+            text = "\n".join(_flatten(value)) or "{}"
+            text_size = 2 + measure(text)
+
+            # Only consecutive elements of the same array, or members of the
+            # same object, share a segment
+            joinable = index is not None and path == group_path and start is not None
+            if texts and (not joinable or size + text_size > budget):
+                yield group()
+                texts = []
+                size = 0
+
+            if not texts:
+                group_path = path
+                start = index
+            texts.append(text)
+            size += text_size
+            end = index
+
+        if texts:
+            yield group()
+
     @staticmethod
     async def _parse_html_file(content: bytes, filename: str) -> Dict[str, Any]:
         """Parse HTML file"""
@@ -347,9 +883,13 @@ class DocumentParser:
             
             text_parts = []
             for i, slide in enumerate(prs.slides):
-                text_parts.append(f"Slide {i+1}:")
+                # One section per slide, headed by its title
+                title_shape = slide.shapes.title
+                title = title_shape.text.strip() if title_shape is not None else ""
+                text_parts.append(f"# Slide {i+1}: {title}" if title else f"# Slide {i+1}")
+                title_id = title_shape.shape_id if title_shape is not None else None
                 for shape in slide.shapes:
-                    if hasattr(shape, "text"):
+                    if hasattr(shape, "text") and shape.shape_id != title_id:
                         text_parts.append(shape.text)
             
             return {
@@ -398,30 +938,42 @@ class DocumentParser:
 
     @staticmethod
     async def _parse_image(content: bytes, filename: str, content_type: str) -> Dict[str, Any]:
-        """Parse image file using OCR"""
-        try:
-            import pytesseract
-            from PIL import Image
-            
-            image = Image.open(io.BytesIO(content))
-            text = pytesseract.image_to_string(image)
-            
-            return {
-                "text": text,
-                "metadata": {
-                    "source": filename,
-                    "format": "image",
-                    "type": content_type,
-                    "ocr": "tesseract"
-                }
-            }
-        except ImportError:
-            return {
-                "text": f"Image file: {filename} (OCR not available - install pytesseract and PIL)",
-                "metadata": {
-                    "source": filename,
-                    "format": "image",
-                    "type": content_type,
-                    "error": "ocr_unavailable"
-                }
+        """Parse image file using OCR, one segment per frame"""
+        return await DocumentParser._joined(await DocumentParser.stream(content, content_type, filename))
+
+    @staticmethod
+    def is_image(content_type: str, filename: str) -> bool:
+        ext = filename.lower().split('.')[-1] if '.' in filename else ''
+        return content_type.startswith("image/") or ext in ['png', 'jpg', 'jpeg', 'gif', 'bmp', 'tiff', 'tif']
+
+    @staticmethod
+    def image_info(source: Any, filename: str, content_type: str) -> Dict[str, Any]:
+        """Document-level metadata for an image; pages counts its frames"""
+        metadata = {
+            "source": filename,
+            "format": "image",
+            "type": content_type
+        }
+
+        if not (settings.OCR_ENABLED and ocr.available()):
+            metadata["error"] = "ocr_unavailable"
+            return metadata
+
+        metadata.update({"ocr": "tesseract", "pages": ocr.image_frame_count(source)})
+        return metadata
+
+    @staticmethod
+    async def _stream_image_frames(content: bytes, metadata: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Yield OCR'd frames in order, running tesseract off the event loop"""
+        if "error" in metadata:
+            yield {
+                "text": f"Image file: {metadata['source']} (OCR not available - install pytesseract and PIL)",
+                "metadata": {}
             }
+            return
+
+        step = DocumentParser.pages_per_task(metadata)
+        for start in range(0, metadata["pages"], step):
+            texts = await asyncio.to_thread(ocr.ocr_image_frames, io.BytesIO(content), start, start + step)
+            for offset, text in enumerate(texts):
+                yield {"text": text, "metadata": {"page": start + offset + 1}}
@@ -0,0 +1,145 @@
+"""
+Staged ingestion pipeline
+
+Parse -> chunk -> embed -> write, connected by bounded asyncio queues so each
+stage works on the next batch while the stage after it is still busy. Wall
+clock time tracks the slowest stage instead of the sum of all stages.
+"""
+import asyncio
+import logging
+from typing import List, Dict, Any, AsyncIterator
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from services.bulk_writer import BulkWriter
+from services.chunker import TextChunker
+from services.embedder import EmbeddingService
+from services.governor import governor
+from services.text_spool import TextSpool
+
+logger = logging.getLogger(__name__)
+
+# End-of-stream marker passed between stages
+_DONE = object()
+
+
+class IngestionPipeline:
+    """Stream parsed segments through chunking, embedding and storage"""
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        doc_id: str,
+        user_id: str,
+        doc_format: str = None
+    ):
+        self.db = db
+        self.doc_id = doc_id
+        self.user_id = user_id
+        self.batch_size = settings.INGEST_BATCH_SIZE
+        self.chunker = TextChunker(doc_format)
+        self.embedder = EmbeddingService()
+        self.writer = BulkWriter(db)
+
+        # Bounded queues give backpressure: a fast parser can only run
+        # INGEST_QUEUE_SIZE batches ahead of the embedder
+        self._embed_queue: asyncio.Queue = asyncio.Queue(maxsize=settings.INGEST_QUEUE_SIZE)
+        self._write_queue: asyncio.Queue = asyncio.Queue(maxsize=settings.INGEST_QUEUE_SIZE)
+
+        self.text = TextSpool()
+        self._chunk_count = 0
+
+    async def run(self, segments: AsyncIterator[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Run all stages until the segment stream is exhausted
+
+        Rows are flushed to the session but not committed; the caller owns
+        the transaction and uploads (or closes) the clean text spool.
+
+        Returns:
+            {
+                "chunks": int,
+                "text": TextSpool  # full normalized text, for the clean copy
+            }
+        """
+        tasks = [
+            asyncio.create_task(self._chunk_stage(segments)),
+            asyncio.create_task(self._embed_stage()),
+            asyncio.create_task(self._write_stage()),
+        ]
+
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # One stage failed; the others may be blocked on a full queue
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.text.close()
+            raise
+
+        logger.info(f"Pipeline finished for document {self.doc_id}: {self._chunk_count} chunks")
+
+        return {
+            "chunks": self._chunk_count,
+            "text": self.text
+        }
+
+    async def _chunk_stage(self, segments: AsyncIterator[Dict[str, Any]]):
+        """Chunk segments as they arrive and hand off fixed-size batches"""
+        batch: List[Dict[str, Any]] = []
+        position = 0
+
+        try:
+            async for segment in segments:
+                text_offset = self.text.write(segment["text"])
+
+                chunks = self.chunker.chunk_segment(
+                    segment["text"],
+                    segment["metadata"],
+                    position,
+                    text_offset
+                )
+                position += len(chunks)
+
+                for chunk in chunks:
+                    batch.append(chunk)
+                    if len(batch) >= self.batch_size:
+                        await self._embed_queue.put(batch)
+                        batch = []
+        finally:
+            # Release parser resources (temp files, pool tasks) on failure
+            if hasattr(segments, "aclose"):
+                await segments.aclose()
+
+        if batch:
+            await self._embed_queue.put(batch)
+        await self._embed_queue.put(_DONE)
+
+    async def _embed_stage(self):
+        """Embed chunk batches in arrival order"""
+        while True:
+            batch = await self._embed_queue.get()
+            if batch is _DONE:
+                await self._write_queue.put(_DONE)
+                return
+
+            async with governor.embed():
+                vectors = await self.embedder.embed_texts([c["text"] for c in batch])
+            await self._write_queue.put((batch, vectors))
+
+    async def _write_stage(self):
+        """Write embedded batches while later batches are still embedding"""
+        while True:
+            item = await self._write_queue.get()
+            if item is _DONE:
+                return
+
+            batch, vectors = item
+            await self._write_batch(batch, vectors)
+            self._chunk_count += len(batch)
+
+    async def _write_batch(self, batch: List[Dict[str, Any]], vectors: List[List[float]]):
+        """Persist one batch of chunks and their embeddings"""
+        await self.writer.write_batch(self.doc_id, self.user_id, batch, vectors)
@@ -0,0 +1,107 @@
+"""
+Cross-request micro-batching of query embeddings
+
+Each /search embeds a single query. Queries arriving within
+QUERY_BATCH_WINDOW_MS of the first one in a window (or until
+QUERY_BATCH_MAX_ITEMS are waiting) are embedded together through one
+EmbeddingService.embed_texts call, so concurrent searches share cache
+lookups and /v1/embeddings requests; each caller gets its own vector back.
+A query waits at most the window before its batch is sent.
+"""
+import asyncio
+import logging
+from typing import List, Optional, Set, Tuple
+
+from prometheus_client import Histogram
+
+from config import settings
+from services.embedder import EmbeddingService
+
+logger = logging.getLogger(__name__)
+
+QUERY_BATCH_SIZE = Histogram(
+    "query_embedding_batch_size",
+    "Queries embedded per micro-batch",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+
+
+class QueryBatcher:
+    """Process-wide collector of single-query embedding requests"""
+
+    def __init__(self):
+        self.window = settings.QUERY_BATCH_WINDOW_MS / 1000
+        self.max_items = settings.QUERY_BATCH_MAX_ITEMS
+        # Created on first use, so importing does not build the backend
+        self.embedder: Optional[EmbeddingService] = None
+
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # The loop keeps only weak references to tasks; in-flight batches
+        # are held here so they are not collected before they finish
+        self._tasks: Set[asyncio.Task] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _embedder(self) -> EmbeddingService:
+        if self.embedder is None:
+            self.embedder = EmbeddingService(query=True)
+        return self.embedder
+
+    def _bind(self) -> asyncio.AbstractEventLoop:
+        # Futures and timers bind to one event loop; Celery tasks run each
+        # job in a fresh loop
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._pending = []
+            self._timer = None
+            self._tasks = set()
+            self._loop = loop
+        return loop
+
+    async def embed(self, text: str) -> List[float]:
+        """Embedding for one query, batched with concurrent callers"""
+        if self.max_items <= 1 or self.window <= 0:
+            return (await self._embedder().embed_texts([text]))[0]
+
+        loop = self._bind()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_items:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        """Send everything waiting as one batch"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            QUERY_BATCH_SIZE.observe(len(batch))
+            task = self._loop.create_task(self._embed_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _embed_batch(self, batch: List[Tuple[str, asyncio.Future]]):
+        try:
+            vectors = await self._embedder().embed_texts([text for text, _ in batch])
+        except Exception as e:
+            logger.error(f"Failed to embed batch of {len(batch)} queries: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), vector in zip(batch, vectors):
+            # A caller that was cancelled no longer wants its vector
+            if not future.done():
+                future.set_result(vector)
+
+
+# Process-wide batcher shared by every SearchService
+query_batcher = QueryBatcher()
@@ -0,0 +1,174 @@
+"""
+Incremental document reprocessing
+
+Re-parses and re-chunks a document, then diffs the new chunks against the
+stored ones by content hash. Unchanged chunks keep their rows and
+embeddings (only position/metadata are refreshed), new or changed chunks are
+embedded, and orphaned chunks are deleted in bulk. Reprocessing after a
+small chunking or parser change costs only the delta.
+"""
+import hashlib
+import logging
+import uuid
+from collections import defaultdict
+from typing import List, Dict, Any
+
+from sqlalchemy import select, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from models import Document, Chunk
+from services.bulk_writer import BulkWriter
+from services.chunker import TextChunker
+from services.embedder import EmbeddingService
+from services.governor import governor
+from services.parser import DocumentParser
+from services.parse_cache import parse_cache
+from services.storage import storage
+from services.text_spool import TextSpool
+
+logger = logging.getLogger(__name__)
+
+
+def _chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ReprocessService:
+    """Re-chunk a document and re-embed only what changed"""
+
+    def __init__(self):
+        self.embedder = EmbeddingService()
+
+    async def reprocess(self, db: AsyncSession, doc: Document, reparse: bool = False) -> Dict[str, int]:
+        """
+        Reprocess one document in place; the caller commits
+
+        reparse re-runs extraction on the raw file instead of reading the
+        parse cache, e.g. after a parser fix shipped without a
+        PARSER_VERSION bump.
+
+        Returns:
+            {"kept": int, "added": int, "removed": int}
+        """
+        parsed = await self._load(doc, reparse)
+
+        # Re-chunk the whole document
+        chunker = TextChunker(parsed["metadata"].get("format"))
+        text = TextSpool()
+        new_chunks: List[Dict[str, Any]] = []
+        try:
+            async for segment in parsed["segments"]:
+                text_offset = text.write(segment["text"])
+                new_chunks.extend(chunker.chunk_segment(
+                    segment["text"],
+                    segment["metadata"],
+                    len(new_chunks),
+                    text_offset
+                ))
+        except BaseException:
+            text.close()
+            raise
+
+        # Index stored chunks by content hash (a text can repeat in a document)
+        result = await db.execute(select(Chunk.id, Chunk.text).where(Chunk.doc_id == doc.id))
+        stored = defaultdict(list)
+        for chunk_id, chunk_text in result.all():
+            stored[_chunk_hash(chunk_text)].append(chunk_id)
+
+        kept = []
+        added = []
+        for chunk in new_chunks:
+            matches = stored.get(_chunk_hash(chunk["text"]))
+            if matches:
+                kept.append({
+                    "id": matches.pop(),
+                    "position": chunk["position"],
+                    "chunk_metadata": chunk["metadata"],
+                    "section_id": chunk["section_id"],
+                    "section_path": chunk["section_path"]
+                })
+            else:
+                added.append(chunk)
+
+        orphans = [chunk_id for ids in stored.values() for chunk_id in ids]
+
+        writer = BulkWriter(db)
+        await writer.delete_chunks(orphans)
+
+        if kept:
+            # Bulk UPDATE by primary key
+            await db.execute(update(Chunk), kept)
+
+        batch_size = settings.INGEST_BATCH_SIZE
+        for i in range(0, len(added), batch_size):
+            batch = added[i:i + batch_size]
+            async with governor.embed():
+                vectors = await self.embedder.embed_texts([c["text"] for c in batch])
+            await writer.write_batch(doc.id, doc.user_id, batch, vectors)
+
+        # Refresh the clean copy for URL and file documents alike
+        clean_path = await self._clean_path(db, doc)
+        await text.upload(clean_path)
+
+        doc.clean_path = clean_path
+        doc.doc_metadata = parsed["metadata"]
+        doc.status = "ready"
+        doc.progress = 100
+        doc.error_message = None
+
+        stats = {"kept": len(kept), "added": len(added), "removed": len(orphans)}
+        logger.info(f"Reprocessed document {doc.id}: {stats}")
+
+        return stats
+
+    @staticmethod
+    async def _clean_path(db: AsyncSession, doc: Document) -> str:
+        """
+        Where to write the refreshed clean text
+
+        Dedup clones share the source document's clean copy; overwriting a
+        shared object would change the text behind other documents' chunks,
+        so a shared path is replaced by one of this document's own.
+        """
+        own_path = f"clean/{doc.user_id}/{doc.id}/content.md"
+        if not doc.clean_path:
+            return own_path
+
+        shared = await db.scalar(
+            select(func.count()).select_from(Document).where(
+                Document.id != doc.id,
+                Document.clean_path == doc.clean_path
+            )
+        )
+        if not shared:
+            return doc.clean_path
+        if doc.clean_path != own_path:
+            return own_path
+        # The clones point at this document's own path; keep it for them
+        return f"clean/{doc.user_id}/{doc.id}/content-{uuid.uuid4().hex[:12]}.md"
+
+    async def _load(self, doc: Document, reparse: bool) -> Dict[str, Any]:
+        """
+        Load the document's segments
+
+        Files come from the parse cache, or are parsed from their raw copy
+        on a miss or when reparse is set; a fresh result replaces the cache
+        entry. URL documents keep the page URL as raw_path and no raw HTML,
+        so they are re-chunked from a cached parse or, failing that, their
+        clean text.
+        """
+        if doc.raw_path and not doc.raw_path.startswith(("http://", "https://")):
+            return await parse_cache.parse(
+                doc.content_hash, doc.content_type, doc.filename, raw_path=doc.raw_path, refresh=reparse
+            )
+
+        cached = await parse_cache.load(doc.content_hash, doc.content_type, doc.filename, source=doc.raw_path)
+        if cached:
+            return cached
+
+        content = await storage.get_bytes(doc.clean_path)
+        return DocumentParser.as_stream({
+            "text": content.decode("utf-8"),
+            "metadata": doc.doc_metadata or {}
+        })
@@ -2,23 +2,30 @@
 Hybrid search service (BM25 + Vector)
 """
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, text
 from pgvector.sqlalchemy import Vector
 
-from models import Chunk, Embedding
+from models import Chunk, Document, Embedding
 from config import settings
-from services.embedder import EmbeddingService
+from services.chunker import SECTION_PATH_SEPARATOR
+from services.query_batcher import query_batcher
+from services.search_cache import SearchCache, normalize_query
 
 logger = logging.getLogger(__name__)
 
+# Chunks of documents (aliased d) that have been fully processed at least
+# once: an async ingest commits chunk rows before they are embedded, and a
+# reprocess keeps progress at 100 while it replaces chunks in one transaction
+_SEARCHABLE_SQL = "d.status <> 'failed' AND d.progress = 100"
+
 
 class SearchService:
     """Hybrid search combining BM25 and vector similarity"""
 
     def __init__(self):
-        self.embedder = EmbeddingService()
+        self.cache = SearchCache()
 
     async def search(
         self,
@@ -31,6 +38,14 @@ class SearchService:
         """
         Hybrid search
 
+        filters narrows the candidates before ranking:
+            doc_id: str or list of str
+            section_id: int (with doc_id, one section of a document)
+            section_path: heading path prefix, e.g. "Guide > Setup"
+
+        Repeat queries (after normalization) are answered from the result
+        cache until the user's documents change.
+
         Returns:
             List of chunks with scores
         """
@@ -38,49 +53,102 @@ class SearchService:
             top_k = settings.RETRIEVAL_TOP_K
 
         try:
-            # Step 1: Generate query embedding
-            query_embedding = await self.embedder.embed_texts([query])
-            query_vector = query_embedding[0]
+            normalized = normalize_query(query)
+            result_key = self.cache.result_key(user_id, normalized, top_k, filters)
+            cached = await self.cache.get_results(user_id, result_key)
+            if cached["results"] is not None:
+                return cached["results"]
+
+            # Step 1: Generate query embedding, batched with concurrent searches
+            query_vector = await self.cache.get_embedding(normalized)
+            if query_vector is None:
+                query_vector = await query_batcher.embed(query)
+                await self.cache.set_embedding(normalized, query_vector)
 
             # Step 2: BM25 search
-            bm25_results = await self._bm25_search(db, query, user_id, top_k)
+            bm25_results = await self._bm25_search(db, query, user_id, top_k, filters)
 
             # Step 3: Vector search
-            vector_results = await self._vector_search(db, query_vector, user_id, top_k)
+            vector_results = await self._vector_search(db, query_vector, user_id, top_k, filters)
+
+            # A failed leg degrades this response to the other one, but
+            # must not be cached as the answer
+            degraded = bm25_results is None or vector_results is None
 
             # Step 4: Merge and rank
-            merged_results = self._merge_results(bm25_results, vector_results, top_k)
+            merged_results = self._merge_results(bm25_results or [], vector_results or [], top_k)
 
             # Step 5: Rerank (if needed)
             # For now, skip reranking - can add later
+            results = merged_results[:settings.RERANK_TOP_K]
+
+            # Step 6: Document metadata, once per document in the result set
+            await self._attach_document_metadata(db, results, user_id)
 
-            return merged_results[:settings.RERANK_TOP_K]
+            if not degraded:
+                await self.cache.set_results(result_key, cached["generation"], results)
+
+            return results
 
         except Exception as e:
             logger.error(f"Search failed: {e}")
             raise
 
+    @staticmethod
+    def _filter_sql(filters: Optional[Dict[str, Any]]) -> Tuple[str, Dict[str, Any]]:
+        """AND clauses on knowledge.chunks (aliased c) and their parameters"""
+        clauses = []
+        params: Dict[str, Any] = {}
+        filters = filters or {}
+
+        doc_ids = filters.get("doc_id")
+        if doc_ids:
+            clauses.append("c.doc_id = ANY(:filter_doc_ids)")
+            params["filter_doc_ids"] = [doc_ids] if isinstance(doc_ids, str) else list(doc_ids)
+
+        if filters.get("section_id") is not None:
+            clauses.append("c.section_id = :filter_section_id")
+            params["filter_section_id"] = int(filters["section_id"])
+
+        section_path = filters.get("section_path")
+        if section_path:
+            # The section itself and everything under it; served by the
+            # (user_id, section_path text_pattern_ops) index
+            clauses.append("(c.section_path = :filter_section_path OR c.section_path LIKE :filter_section_prefix)")
+            params["filter_section_path"] = section_path
+            escaped = section_path.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params["filter_section_prefix"] = f"{escaped}{SECTION_PATH_SEPARATOR}%"
+
+        return "".join(f"\n                  AND {clause}" for clause in clauses), params
+
     async def _bm25_search(
         self,
         db: AsyncSession,
         query: str,
         user_id: str,
-        top_k: int
-    ) -> List[Dict[str, Any]]:
-        """BM25 full-text search using PostgreSQL"""
+        top_k: int,
+        filters: Dict[str, Any] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """BM25 full-text search using PostgreSQL; None if it failed"""
         try:
+            filter_sql, filter_params = self._filter_sql(filters)
+
             # Use PostgreSQL full-text search with ts_rank
-            sql = text("""
+            sql = text(f"""
                 SELECT
                     c.id,
                     c.doc_id,
                     c.text,
                     c.metadata,
-                    ts_rank(to_tsvector('english', c.text), query) as score
-                FROM knowledge.chunks c,
+                    ts_rank(to_tsvector('english', c.text), query) as score,
+                    c.section_id,
+                    c.section_path
+                FROM knowledge.chunks c
+                JOIN knowledge.documents d ON d.id = c.doc_id,
                      to_tsquery('english', :query_text) query
                 WHERE c.user_id = :user_id
-                  AND to_tsvector('english', c.text) @@ query
+                  AND {_SEARCHABLE_SQL}
+                  AND to_tsvector('english', c.text) @@ query{filter_sql}
                 ORDER BY score DESC
                 LIMIT :top_k
             """)
@@ -90,7 +158,7 @@ class SearchService:
 
             result = await db.execute(
                 sql,
-                {"query_text": query_text, "user_id": user_id, "top_k": top_k}
+                {"query_text": query_text, "user_id": user_id, "top_k": top_k, **filter_params}
             )
             rows = result.fetchall()
 
@@ -100,42 +168,51 @@ class SearchService:
                     "doc_id": row[1],
                     "text": row[2],
                     "metadata": row[3],
-                    "bm25_score": float(row[4])
+                    "bm25_score": float(row[4]),
+                    "section_id": row[5],
+                    "section_path": row[6]
                 }
                 for row in rows
             ]
 
         except Exception as e:
             logger.error(f"BM25 search failed: {e}")
-            return []
+            return None
 
     async def _vector_search(
         self,
         db: AsyncSession,
         query_vector: List[float],
         user_id: str,
-        top_k: int
-    ) -> List[Dict[str, Any]]:
-        """Vector similarity search using pgvector"""
+        top_k: int,
+        filters: Dict[str, Any] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Vector similarity search using pgvector; None if it failed"""
         try:
+            filter_sql, filter_params = self._filter_sql(filters)
+
             # Use pgvector cosine similarity
-            sql = text("""
+            sql = text(f"""
                 SELECT
                     e.chunk_id,
                     e.doc_id,
                     c.text,
                     c.metadata,
-                    1 - (e.vector <=> :query_vector) as similarity
+                    1 - (e.vector <=> :query_vector) as similarity,
+                    c.section_id,
+                    c.section_path
                 FROM knowledge.embeddings e
                 JOIN knowledge.chunks c ON c.id = e.chunk_id
+                JOIN knowledge.documents d ON d.id = e.doc_id
                 WHERE e.user_id = :user_id
+                  AND {_SEARCHABLE_SQL}{filter_sql}
                 ORDER BY e.vector <=> :query_vector
                 LIMIT :top_k
             """)
 
             result = await db.execute(
                 sql,
-                {"query_vector": str(query_vector), "user_id": user_id, "top_k": top_k}
+                {"query_vector": str(query_vector), "user_id": user_id, "top_k": top_k, **filter_params}
             )
             rows = result.fetchall()
 
@@ -145,14 +222,48 @@ class SearchService:
                     "doc_id": row[1],
                     "text": row[2],
                     "metadata": row[3],
-                    "vector_score": float(row[4])
+                    "vector_score": float(row[4]),
+                    "section_id": row[5],
+                    "section_path": row[6]
                 }
                 for row in rows
             ]
 
         except Exception as e:
             logger.error(f"Vector search failed: {e}")
-            return []
+            return None
+
+    async def _attach_document_metadata(
+        self,
+        db: AsyncSession,
+        results: List[Dict[str, Any]],
+        user_id: str
+    ):
+        """
+        Merge document metadata into each result's chunk metadata
+
+        Chunk rows only hold chunk-specific fields (page, chunk_index,
+        offsets), so title, source etc. are read from the documents table in
+        a single query and shared by every result from the same document.
+        """
+        doc_ids = list({result["doc_id"] for result in results})
+        if not doc_ids:
+            return
+
+        rows = await db.execute(
+            select(Document.id, Document.filename, Document.doc_metadata)
+            .where(Document.id.in_(doc_ids), Document.user_id == user_id)
+        )
+        documents = {
+            doc_id: {"source": filename, **(doc_metadata or {})}
+            for doc_id, filename, doc_metadata in rows.all()
+        }
+
+        for result in results:
+            result["metadata"] = {
+                **documents.get(result["doc_id"], {}),
+                **(result["metadata"] or {})
+            }
 
     def _merge_results(
         self,
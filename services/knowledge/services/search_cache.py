@@ -0,0 +1,122 @@
+"""
+Search caches
+
+Query embeddings are cached in an LRU + Redis EmbeddingCache under the
+normalized query text (NFKC, case-folded, whitespace collapsed), so near-
+identical queries share one vector. Search results are cached in Redis per
+(user_id, normalized query, top_k, filters), stamped with the user's
+generation counter. Ingest, delete and reprocess bump the counter, which
+orphans every cached result of that user; a lookup reads the counter and
+the result in one MGET and ignores results from an older generation.
+"""
+import hashlib
+import json
+import logging
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional
+
+from prometheus_client import Counter
+
+from config import settings
+from services.embedding_backends import get_embedding_backend
+from services.embedding_cache import EmbeddingCache, get_redis
+
+logger = logging.getLogger(__name__)
+
+RESULT_LOOKUPS = Counter(
+    "search_result_cache_lookups_total",
+    "Search result cache lookups by result",
+    ["result"]  # result: hit, miss
+)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Cache identity of a query"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", query).casefold()).strip()
+
+
+def _generation_key(user_id: str) -> str:
+    return f"search:gen:{user_id}"
+
+
+async def bump_generation(user_id: str):
+    """
+    Invalidate a user's cached search results
+
+    Call after committing any change to the user's chunks. A failed bump
+    is logged; stale results then live until SEARCH_RESULT_CACHE_TTL_SECONDS.
+    """
+    if not settings.SEARCH_CACHE_ENABLED:
+        return
+    try:
+        await get_redis().incr(_generation_key(user_id))
+    except Exception as e:
+        logger.warning(f"Search cache invalidation failed for user {user_id}: {e}")
+
+
+class SearchCache:
+    """Query embedding and result cache for SearchService"""
+
+    def __init__(self):
+        self.enabled = settings.SEARCH_CACHE_ENABLED
+        self.ttl = settings.SEARCH_RESULT_CACHE_TTL_SECONDS
+        self.embeddings = EmbeddingCache(
+            namespace="query",
+            model=get_embedding_backend().model,
+            max_items=settings.QUERY_EMBEDDING_CACHE_MEMORY_ITEMS
+        )
+
+    async def get_embedding(self, normalized: str) -> Optional[List[float]]:
+        if not self.enabled:
+            return None
+        return (await self.embeddings.get_many([normalized]))[0]
+
+    async def set_embedding(self, normalized: str, vector: List[float]):
+        if self.enabled:
+            await self.embeddings.set_many([normalized], [vector])
+
+    @staticmethod
+    def result_key(user_id: str, normalized: str, top_k: int, filters: Optional[Dict[str, Any]]) -> str:
+        identity = json.dumps([normalized, top_k, filters or {}], sort_keys=True, default=str)
+        digest = hashlib.sha256(identity.encode("utf-8")).hexdigest()
+        return f"search:result:{user_id}:{digest}"
+
+    async def get_results(self, user_id: str, key: str) -> Dict[str, Any]:
+        """
+        Cached results, or None, and the generation they must be stored
+        under on a miss
+        """
+        if not self.enabled:
+            return {"results": None, "generation": 0}
+
+        try:
+            generation, blob = await get_redis().mget([_generation_key(user_id), key])
+        except Exception as e:
+            logger.warning(f"Search cache Redis lookup failed: {e}")
+            return {"results": None, "generation": None}
+
+        generation = int(generation or 0)
+        if blob is not None:
+            cached = json.loads(blob)
+            if cached["generation"] == generation:
+                RESULT_LOOKUPS.labels("hit").inc()
+                return {"results": cached["results"], "generation": generation}
+
+        RESULT_LOOKUPS.labels("miss").inc()
+        return {"results": None, "generation": generation}
+
+    async def set_results(self, key: str, generation: Optional[int], results: List[Dict[str, Any]]):
+        """Store results under the generation read before computing them"""
+        if not self.enabled or generation is None:
+            return
+
+        # A bump between the lookup and this write leaves the entry on an
+        # older generation, so it is never served
+        blob = json.dumps({"generation": generation, "results": results}, default=str)
+        try:
+            await get_redis().set(key, blob, ex=self.ttl)
+        except Exception as e:
+            logger.warning(f"Search cache Redis write failed: {e}")
@@ -0,0 +1,255 @@
+"""
+Object storage for raw uploads and processed text
+
+boto3 is synchronous, so S3Storage runs every call on a bounded thread pool
+sized to the client's connection pool: the event loop never blocks on S3,
+and an upload burst queues on the pool instead of opening unbounded
+connections. LocalStorage keeps the same interface on the filesystem for
+tests and single-box setups. Pick one with STORAGE_BACKEND.
+"""
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, List, Optional
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.client import Config
+from botocore.exceptions import ClientError
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bucket for raw uploads and processed text
+BUCKET = "career-mentor"
+
+# S3 DeleteObjects accepts at most this many keys per request
+_DELETE_BATCH = 1000
+
+
+class ObjectNotFoundError(KeyError):
+    """No object under the requested key"""
+
+
+class ObjectStorage:
+    """Async interface over an object store"""
+
+    async def put_bytes(self, key: str, data: bytes, content_type: str):
+        raise NotImplementedError
+
+    async def put_file(self, key: str, fileobj: BinaryIO, content_type: str):
+        """Upload a file object from its start"""
+        raise NotImplementedError
+
+    async def get_bytes(self, key: str) -> bytes:
+        """Raises ObjectNotFoundError for missing keys"""
+        raise NotImplementedError
+
+    async def get_file(self, key: str, fileobj: BinaryIO):
+        """Download into a file object; raises ObjectNotFoundError for missing keys"""
+        raise NotImplementedError
+
+    async def size(self, key: str) -> int:
+        """Object size in bytes, without downloading it; raises ObjectNotFoundError"""
+        raise NotImplementedError
+
+    async def delete_many(self, keys: List[str]) -> int:
+        """Delete keys in as few requests as possible; returns the count"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class S3Storage(ObjectStorage):
+    """S3/MinIO through boto3 on a bounded thread pool"""
+
+    def __init__(self):
+        self.workers = settings.STORAGE_MAX_WORKERS
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        # Each worker may run a multipart upload with its own part threads
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=settings.S3_ENDPOINT if settings.S3_ENDPOINT else None,
+            aws_access_key_id=settings.S3_ACCESS_KEY,
+            aws_secret_access_key=settings.S3_SECRET_KEY,
+            region_name=settings.S3_REGION,
+            config=Config(
+                signature_version="s3v4",
+                max_pool_connections=self.workers * settings.S3_MULTIPART_CONCURRENCY
+            )
+        )
+
+        # Files past the threshold go up as concurrent multipart parts, read
+        # from the file object one part at a time
+        self.transfer_config = TransferConfig(
+            multipart_threshold=settings.S3_MULTIPART_THRESHOLD,
+            multipart_chunksize=settings.S3_MULTIPART_CHUNK_BYTES,
+            max_concurrency=settings.S3_MULTIPART_CONCURRENCY
+        )
+
+    async def _call(self, func, *args, **kwargs):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="s3"
+            )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: func(*args, **kwargs))
+
+    async def put_bytes(self, key: str, data: bytes, content_type: str):
+        await self._call(
+            self.client.put_object,
+            Bucket=BUCKET,
+            Key=key,
+            Body=data,
+            ContentType=content_type
+        )
+
+    async def put_file(self, key: str, fileobj: BinaryIO, content_type: str):
+        fileobj.seek(0)
+        await self._call(
+            self.client.upload_fileobj,
+            fileobj,
+            BUCKET,
+            key,
+            ExtraArgs={"ContentType": content_type},
+            Config=self.transfer_config
+        )
+
+    async def get_bytes(self, key: str) -> bytes:
+        def download():
+            response = self.client.get_object(Bucket=BUCKET, Key=key)
+            return response["Body"].read()
+
+        return await self._missing_as_not_found(key, download)
+
+    async def get_file(self, key: str, fileobj: BinaryIO):
+        await self._missing_as_not_found(
+            key,
+            self.client.download_fileobj,
+            BUCKET,
+            key,
+            fileobj,
+            Config=self.transfer_config
+        )
+
+    async def size(self, key: str) -> int:
+        response = await self._missing_as_not_found(key, self.client.head_object, Bucket=BUCKET, Key=key)
+        return response["ContentLength"]
+
+    async def _missing_as_not_found(self, key: str, func, *args, **kwargs):
+        try:
+            return await self._call(func, *args, **kwargs)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                raise ObjectNotFoundError(key)
+            raise
+
+    async def delete_many(self, keys: List[str]) -> int:
+        batches = [keys[i:i + _DELETE_BATCH] for i in range(0, len(keys), _DELETE_BATCH)]
+
+        responses = await asyncio.gather(*[
+            self._call(
+                self.client.delete_objects,
+                Bucket=BUCKET,
+                Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True}
+            )
+            for batch in batches
+        ])
+
+        errors = [error for response in responses for error in response.get("Errors", [])]
+        for error in errors:
+            logger.warning(f"Failed to delete {error.get('Key')}: {error.get('Message')}")
+
+        return len(keys) - len(errors)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+class LocalStorage(ObjectStorage):
+    """Objects as files under STORAGE_LOCAL_PATH, for tests and local runs"""
+
+    def __init__(self, root: str = None):
+        self.root = Path(root or settings.STORAGE_LOCAL_PATH) / BUCKET
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if not path.is_relative_to(self.root.resolve()):
+            raise ValueError(f"Invalid object key: {key}")
+        return path
+
+    def _write(self, key: str, data: bytes):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+    async def put_bytes(self, key: str, data: bytes, content_type: str):
+        await asyncio.to_thread(self._write, key, data)
+
+    async def put_file(self, key: str, fileobj: BinaryIO, content_type: str):
+        def copy():
+            path = self._path(key)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fileobj.seek(0)
+            with open(path, "wb") as out:
+                for block in iter(lambda: fileobj.read(1024 * 1024), b""):
+                    out.write(block)
+
+        await asyncio.to_thread(copy)
+
+    async def get_bytes(self, key: str) -> bytes:
+        try:
+            return await asyncio.to_thread(self._path(key).read_bytes)
+        except FileNotFoundError:
+            raise ObjectNotFoundError(key)
+
+    async def size(self, key: str) -> int:
+        try:
+            return (await asyncio.to_thread(self._path(key).stat)).st_size
+        except FileNotFoundError:
+            raise ObjectNotFoundError(key)
+
+    async def get_file(self, key: str, fileobj: BinaryIO):
+        def copy():
+            with open(self._path(key), "rb") as source:
+                for block in iter(lambda: source.read(1024 * 1024), b""):
+                    fileobj.write(block)
+
+        try:
+            await asyncio.to_thread(copy)
+        except FileNotFoundError:
+            raise ObjectNotFoundError(key)
+
+    async def delete_many(self, keys: List[str]) -> int:
+        def remove():
+            deleted = 0
+            for key in keys:
+                try:
+                    os.remove(self._path(key))
+                    deleted += 1
+                except FileNotFoundError:
+                    pass
+            return deleted
+
+        return await asyncio.to_thread(remove)
+
+
+def create_storage() -> ObjectStorage:
+    """Storage backend selected by STORAGE_BACKEND"""
+    if settings.STORAGE_BACKEND == "local":
+        return LocalStorage()
+    if settings.STORAGE_BACKEND == "s3":
+        return S3Storage()
+    raise ValueError(f"Unknown storage backend: {settings.STORAGE_BACKEND}")
+
+
+# Process-wide storage, closed in the app lifespan
+storage = create_storage()
@@ -0,0 +1,146 @@
+"""
+Offset-tracking recursive text splitter
+
+Same chunk boundaries as langchain's RecursiveCharacterTextSplitter with
+keep_separator and strip_whitespace (the settings TextChunker used), but
+every split is a (start, end) range into the one source string: separators
+are found with bounded str.find, merging only moves range ends, and text is
+sliced once per emitted chunk. Chunks are produced lazily, in order, with
+their character offsets.
+
+Sizes are characters by default. With a length function (e.g. token
+counts) the pieces of each split level are measured in one batch call.
+"""
+from collections import deque
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_SEPARATORS = ["\n\n", "\n", ". ", " ", ""]
+
+# (start, end) range into the source text
+Span = Tuple[int, int]
+
+# Sizes for a batch of texts, in input order
+LengthFunction = Callable[[List[str]], List[int]]
+
+
+class OffsetTextSplitter:
+    """Split text into overlapping chunks of at most chunk_size characters (or units)"""
+
+    def __init__(
+        self,
+        chunk_size: int,
+        chunk_overlap: int,
+        separators: Sequence[str] = DEFAULT_SEPARATORS,
+        length_function: Optional[LengthFunction] = None
+    ):
+        if chunk_overlap > chunk_size:
+            raise ValueError(
+                f"Chunk overlap ({chunk_overlap}) is larger than chunk size ({chunk_size})"
+            )
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = list(separators)
+        self.length_function = length_function
+
+    def split(self, text: str, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, int, str]]:
+        """
+        Yield (start, end, chunk_text) with text[start:end] == chunk_text
+
+        start/end restrict splitting to a range; offsets stay absolute.
+        """
+        return self._split(text, start, len(text) if end is None else end, self.separators)
+
+    def split_text(self, text: str) -> List[str]:
+        """Chunk texts only, as RecursiveCharacterTextSplitter.split_text"""
+        return [chunk for _, _, chunk in self.split(text)]
+
+    def _split(self, text: str, start: int, end: int, separators: List[str]) -> Iterator[Tuple[int, int, str]]:
+        # Highest-priority separator present in the range; "" splits characters
+        separator = separators[-1]
+        remaining: List[str] = []
+        for i, candidate in enumerate(separators):
+            if candidate == "":
+                separator = candidate
+                break
+            if text.find(candidate, start, end) != -1:
+                separator = candidate
+                remaining = separators[i + 1:]
+                break
+
+        pieces = list(self._pieces(text, start, end, separator))
+        if self.length_function is None:
+            lengths = [piece_end - piece_start for piece_start, piece_end in pieces]
+        else:
+            lengths = self.length_function([text[piece_start:piece_end] for piece_start, piece_end in pieces])
+
+        small: List[Tuple[int, int, int]] = []
+        for (piece_start, piece_end), length in zip(pieces, lengths):
+            if length < self.chunk_size:
+                small.append((piece_start, piece_end, length))
+                continue
+
+            # Oversized piece: flush what came before it, then split it finer
+            if small:
+                yield from self._merge(text, small)
+                small = []
+            if remaining:
+                yield from self._split(text, piece_start, piece_end, remaining)
+            else:
+                yield piece_start, piece_end, text[piece_start:piece_end]
+
+        if small:
+            yield from self._merge(text, small)
+
+    @staticmethod
+    def _pieces(text: str, start: int, end: int, separator: str) -> Iterator[Span]:
+        """Ranges between separators; each separator starts the piece after it"""
+        if not separator:
+            for i in range(start, end):
+                yield i, i + 1
+            return
+
+        previous = start
+        found = text.find(separator, start, end)
+        while found != -1:
+            if found > previous:
+                yield previous, found
+            previous = found
+            found = text.find(separator, found + len(separator), end)
+
+        if end > previous:
+            yield previous, end
+
+    def _merge(self, text: str, pieces: List[Tuple[int, int, int]]) -> Iterator[Tuple[int, int, str]]:
+        """
+        Greedily merge adjacent pieces up to chunk_size
+
+        Pieces are contiguous, so a chunk is just the range from its first
+        piece's start to its last piece's end. After each chunk, pieces are
+        dropped from the front until at most chunk_overlap remains to carry
+        into the next one.
+        """
+        current: deque = deque()
+        total = 0
+
+        for piece_start, piece_end, length in pieces:
+            if current and total + length > self.chunk_size:
+                yield from self._stripped(text, current[0][0], current[-1][1])
+
+                while total > self.chunk_overlap or (total > 0 and total + length > self.chunk_size):
+                    total -= current.popleft()[2]
+
+            current.append((piece_start, piece_end, length))
+            total += length
+
+        if current:
+            yield from self._stripped(text, current[0][0], current[-1][1])
+
+    @staticmethod
+    def _stripped(text: str, start: int, end: int) -> Iterator[Tuple[int, int, str]]:
+        """The range without surrounding whitespace, if anything is left"""
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if start < end:
+            yield start, end, text[start:end]
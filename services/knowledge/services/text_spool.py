@@ -0,0 +1,43 @@
+"""
+Clean-text spool
+
+Parsed segments are appended here as they stream past instead of being
+joined in memory, so the clean copy of a large document spills to a temp
+file once it passes CLEAN_TEXT_SPOOL_BYTES and is uploaded from there.
+"""
+import tempfile
+
+from config import settings
+from services.storage import storage
+
+
+class TextSpool:
+    """Append-only buffer for a document's clean text"""
+
+    SEPARATOR = b"\n\n"
+
+    def __init__(self):
+        self._file = tempfile.SpooledTemporaryFile(max_size=settings.CLEAN_TEXT_SPOOL_BYTES)
+        self._empty = True
+        self._chars = 0
+
+    def write(self, text: str) -> int:
+        """Append one segment; returns its character offset in the clean text"""
+        if not self._empty:
+            self._file.write(self.SEPARATOR)
+            self._chars += len(self.SEPARATOR)
+        offset = self._chars
+        self._file.write(text.encode("utf-8"))
+        self._chars += len(text)
+        self._empty = False
+        return offset
+
+    async def upload(self, key: str):
+        """Upload the spooled text to object storage and release it"""
+        try:
+            await storage.put_file(key, self._file, "text/markdown")
+        finally:
+            self.close()
+
+    def close(self):
+        self._file.close()
@@ -0,0 +1,87 @@
+"""
+Token counting for token-budgeted chunking
+
+Loads a Hugging Face fast tokenizer (tokenizer.json) from TOKENIZER_PATH;
+nothing is downloaded. Counts are computed with batch encoding and kept in
+an in-process LRU keyed by text, since the splitter measures the same
+separators, sentences and overlap pieces over and over.
+"""
+import logging
+from collections import OrderedDict
+from typing import List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Longer texts (whole sections) are counted but not kept in the LRU
+_MAX_CACHED_CHARS = 4096
+
+
+class TokenCounter:
+    """Batch token counts with an LRU in front of the tokenizer"""
+
+    def __init__(self, path: str = None, max_items: int = None):
+        try:
+            from tokenizers import Tokenizer
+        except ImportError:
+            raise RuntimeError("Token chunking needs the tokenizers package")
+
+        path = path or settings.TOKENIZER_PATH
+        if not path:
+            raise ValueError("CHUNK_SIZE_UNIT=tokens needs TOKENIZER_PATH (a tokenizer.json)")
+
+        self.tokenizer = Tokenizer.from_file(path)
+        self.tokenizer.no_truncation()
+        self.tokenizer.no_padding()
+
+        # Tokens the model adds around every input ([CLS]/[SEP], <s>/</s>)
+        post_processor = self.tokenizer.post_processor
+        self.special_tokens = post_processor.num_special_tokens_to_add(False) if post_processor else 0
+
+        self.max_items = max_items or settings.TOKENIZER_CACHE_ITEMS
+        self._memory: "OrderedDict[str, int]" = OrderedDict()
+
+        logger.info(f"Loaded tokenizer from {path}")
+
+    def count_many(self, texts: List[str]) -> List[int]:
+        """Token counts without special tokens, in input order"""
+        counts: List[Optional[int]] = [None] * len(texts)
+        missing = {}
+
+        for i, text in enumerate(texts):
+            count = self._memory.get(text)
+            if count is not None:
+                self._memory.move_to_end(text)
+                counts[i] = count
+            else:
+                missing.setdefault(text, []).append(i)
+
+        if missing:
+            unique = list(missing)
+            encodings = self.tokenizer.encode_batch(unique, add_special_tokens=False)
+            for text, encoding in zip(unique, encodings):
+                count = len(encoding.ids)
+                if len(text) <= _MAX_CACHED_CHARS:
+                    self._remember(text, count)
+                for i in missing[text]:
+                    counts[i] = count
+
+        return counts
+
+    def _remember(self, text: str, count: int):
+        """Insert into the LRU, evicting the oldest entries"""
+        self._memory[text] = count
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+
+_token_counter: Optional[TokenCounter] = None
+
+
+def get_token_counter() -> TokenCounter:
+    """Process-wide counter, loaded on first use"""
+    global _token_counter
+    if _token_counter is None:
+        _token_counter = TokenCounter()
+    return _token_counter
@@ -0,0 +1,109 @@
+"""
+Shared test setup
+
+Run from services/knowledge with `python -m pytest`. Settings are read at
+import time, so placeholders for the required ones are set before any
+service module is imported; nothing connects to them, and objects are
+stored on the local filesystem. Tests that need a
+real PostgreSQL skip unless TEST_DATABASE_URL is set.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://test@localhost/test")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+os.environ.setdefault("S3_ACCESS_KEY", "test")
+os.environ.setdefault("S3_SECRET_KEY", "test")
+os.environ.setdefault("INFERENCE_SERVICE_URL", "http://inference.invalid")
+# The process-wide storage is a LocalStorage under a throwaway directory
+os.environ.setdefault("STORAGE_BACKEND", "local")
+os.environ.setdefault("STORAGE_LOCAL_PATH", tempfile.mkdtemp(prefix="knowledge-tests-"))
+
+
+class FakeRedis:
+    """The subset of redis.asyncio.Redis the caches use, in memory"""
+
+    def __init__(self):
+        self.data = {}
+        self.fail = False
+
+    def _check(self):
+        if self.fail:
+            raise ConnectionError("redis unavailable")
+
+    async def get(self, key):
+        self._check()
+        return self.data.get(key)
+
+    async def mget(self, keys):
+        self._check()
+        return [self.data.get(key) for key in keys]
+
+    async def set(self, key, value, ex=None):
+        self._check()
+        self.data[key] = value if isinstance(value, bytes) else str(value).encode("utf-8")
+
+    async def incr(self, key):
+        self._check()
+        value = int(self.data.get(key, b"0")) + 1
+        self.data[key] = str(value).encode("utf-8")
+        return value
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def set(self, key, value, ex=None):
+        self.commands.append((key, value, ex))
+
+    async def execute(self):
+        for key, value, ex in self.commands:
+            await self.redis.set(key, value, ex=ex)
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """FakeRedis behind every get_redis() the caches call"""
+    from services import embedding_cache, search_cache
+
+    redis = FakeRedis()
+    monkeypatch.setattr(embedding_cache, "get_redis", lambda: redis)
+    monkeypatch.setattr(search_cache, "get_redis", lambda: redis)
+    monkeypatch.setattr(embedding_cache.EmbeddingCache, "_memories", {})
+    return redis
+
+
+@pytest.fixture
+async def pg_session():
+    """Session on TEST_DATABASE_URL, rolled back afterwards; skips without one"""
+    url = os.getenv("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL not set")
+
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+    # Importing Base through models registers the tables
+    from models import Base
+
+    engine = create_async_engine(url.replace("postgresql://", "postgresql+asyncpg://"))
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE SCHEMA IF NOT EXISTS knowledge"))
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncSession(engine) as session:
+        yield session
+        await session.rollback()
+    await engine.dispose()
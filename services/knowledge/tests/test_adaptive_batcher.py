@@ -0,0 +1,160 @@
+import asyncio
+
+import httpx
+import pytest
+
+from config import settings
+from services import embedding_backends
+from services.adaptive_batcher import AdaptiveBatcher
+
+
+@pytest.fixture
+def batcher(monkeypatch):
+    monkeypatch.setattr(settings, "CHUNK_SIZE_UNIT", "chars")
+    batcher = AdaptiveBatcher()
+    batcher.min_batch, batcher.max_batch, batcher.batch_size = 1, 64, 8
+    batcher.max_concurrency, batcher.concurrency = 8, 2
+    batcher.budget = 100
+    batcher.target_latency = 1.0
+    batcher.backoff_base, batcher.backoff_max = 0.01, 0.05
+    return batcher
+
+
+class TestPack:
+    def test_count_limit(self, batcher):
+        batcher.batch_size = 3
+        assert batcher.pack(["a"] * 7) == [(0, 3), (3, 6), (6, 7)]
+
+    def test_size_budget(self, batcher):
+        # 40 + 40 + 40 > 100; 40 + 10 + 50 fills the budget exactly
+        texts = ["x" * 40, "x" * 40, "x" * 40, "x" * 10, "x" * 50, "x"]
+        assert batcher.pack(texts) == [(0, 2), (2, 5), (5, 6)]
+
+    def test_oversized_text_goes_alone(self, batcher):
+        assert batcher.pack(["a", "x" * 500, "b"]) == [(0, 1), (1, 2), (2, 3)]
+
+    def test_empty(self, batcher):
+        assert batcher.pack([]) == []
+
+
+class TestAimd:
+    def test_full_fast_batches_grow(self, batcher):
+        batcher.record_success(latency=0.1, items=8)
+        assert batcher.batch_size == 9
+
+    def test_partial_batches_do_not_grow(self, batcher):
+        batcher.record_success(latency=0.1, items=3)
+        assert batcher.batch_size == 8
+
+    def test_slow_batches_shrink(self, batcher):
+        batcher.record_success(latency=5.0, items=8)
+        assert batcher.batch_size == 6
+
+    def test_concurrency_grows_once_per_round(self, batcher):
+        batcher.record_success(0.1, 1)
+        assert batcher.concurrency == 2
+        batcher.record_success(0.1, 1)
+        assert batcher.concurrency == 3
+
+    def test_growth_is_capped(self, batcher):
+        for _ in range(200):
+            batcher.record_success(0.1, batcher.batch_size)
+        assert (batcher.batch_size, batcher.concurrency) == (64, 8)
+
+    async def test_overload_halves_once_per_backoff(self, batcher):
+        batcher.batch_size, batcher.concurrency = 32, 8
+
+        delay = batcher.record_overload(attempt=0)
+        batcher.record_overload(attempt=0)
+
+        assert 0 <= delay <= 0.01
+        assert (batcher.batch_size, batcher.concurrency) == (16, 4)
+
+    async def test_retry_after_is_capped(self, batcher):
+        assert batcher.record_overload(attempt=0, retry_after=0.03) == 0.03
+        assert batcher.record_overload(attempt=0, retry_after=60) == 0.05
+
+    async def test_floor(self, batcher):
+        batcher.batch_size, batcher.concurrency = 1, 1
+        batcher.record_overload(attempt=5, retry_after=0)
+        assert (batcher.batch_size, batcher.concurrency) == (1, 1)
+
+
+async def test_slot_bounds_concurrency(batcher):
+    inflight = peak = 0
+
+    async def request():
+        nonlocal inflight, peak
+        async with batcher.slot():
+            inflight += 1
+            peak = max(peak, inflight)
+            await asyncio.sleep(0.01)
+            inflight -= 1
+
+    await asyncio.gather(*[request() for _ in range(10)])
+
+    assert peak == 2
+
+
+async def test_slot_waits_out_backoff(batcher):
+    batcher.record_overload(attempt=0, retry_after=0.05)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+
+    async with batcher.slot():
+        pass
+
+    assert loop.time() - started >= 0.04
+
+
+class FakeInferenceClient:
+    """Answers /v1/embeddings with queued status codes, then 200"""
+
+    def __init__(self, statuses=()):
+        self.statuses = list(statuses)
+        self.requests = []
+
+    async def post(self, path, json):
+        self.requests.append(json["input"])
+        status = self.statuses.pop(0) if self.statuses else 200
+        if status != 200:
+            return httpx.Response(status, text="busy")
+        return httpx.Response(200, json={"data": [{"embedding": [float(len(t))]} for t in json["input"]]})
+
+
+@pytest.fixture
+def lanes(monkeypatch, batcher):
+    query = AdaptiveBatcher("query", max_concurrency=2)
+    query.backoff_base, query.backoff_max = 0.01, 0.05
+    batcher.backoff_max = 30.0
+    client = FakeInferenceClient()
+    monkeypatch.setattr(embedding_backends, "adaptive_batcher", batcher)
+    monkeypatch.setattr(embedding_backends, "query_adaptive_batcher", query)
+    monkeypatch.setattr(embedding_backends.inference_client, "client", lambda: client)
+    return batcher, query, client
+
+
+async def test_queries_skip_the_ingest_backoff(lanes):
+    ingest, query, client = lanes
+    backend = embedding_backends.RemoteEmbeddingBackend()
+    ingest.record_overload(attempt=0, retry_after=30)
+
+    vectors = await asyncio.wait_for(backend.embed(["query"], query=True), timeout=1)
+
+    assert vectors == [[5.0]]
+    # The ingest lane is still backing off
+    assert ingest._backoff_until > asyncio.get_running_loop().time()
+
+
+async def test_ingest_overload_leaves_the_query_lane_alone(lanes):
+    ingest, query, client = lanes
+    ingest.backoff_max = 0.01
+    backend = embedding_backends.RemoteEmbeddingBackend()
+    client.statuses = [429]
+    query_state = (query.batch_size, query.concurrency)
+
+    assert await backend.embed(["chunk"]) == [[5.0]]
+
+    assert len(client.requests) == 2
+    assert ingest.batch_size == 4
+    assert (query.batch_size, query.concurrency) == query_state
@@ -0,0 +1,191 @@
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+from config import settings
+from services import bulk_ingest
+from services.bulk_ingest import BulkIngestService, InvalidArchiveError
+from services.governor import governor
+
+
+class FakeSession:
+    def __init__(self):
+        self.added = []
+        self.commits = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    async def flush(self):
+        pass
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        pass
+
+
+class FakeText:
+    async def upload(self, key):
+        pass
+
+
+class FakePipeline:
+    """Consumes the segments, noting whether a parse slot was held meanwhile"""
+
+    runs = []
+
+    def __init__(self, db, doc_id, user_id, source_format):
+        pass
+
+    async def run(self, segments):
+        parse_slots_free = governor._parse._value
+        texts = [segment["text"] async for segment in segments]
+        FakePipeline.runs.append((texts, parse_slots_free))
+        return {"text": FakeText(), "chunks": len(texts)}
+
+
+async def fake_parse(digest, content_type, filename, content=None):
+    async def segments():
+        for line in content.decode("utf-8").splitlines():
+            yield {"text": line, "metadata": {}}
+
+    return {"metadata": {"format": "text"}, "segments": segments()}
+
+
+async def no_generation_bump(user_id):
+    pass
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_ASYNC", False)
+    monkeypatch.setattr(settings, "DEDUP_ENABLED", False)
+    monkeypatch.setattr(bulk_ingest, "AsyncSessionLocal", FakeSession)
+    monkeypatch.setattr(bulk_ingest, "IngestionPipeline", FakePipeline)
+    monkeypatch.setattr(bulk_ingest, "bump_generation", no_generation_bump)
+    monkeypatch.setattr(bulk_ingest.parse_cache, "parse", fake_parse)
+    FakePipeline.runs = []
+    return BulkIngestService("user")
+
+
+def zip_archive(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, content in members:
+            archive.writestr(name, content)
+    return buffer
+
+
+def tar_archive(members):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, content in members:
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+    return buffer
+
+
+@pytest.mark.parametrize("build", [zip_archive, tar_archive])
+async def test_archive_members_are_ingested(service, build):
+    archive = build([
+        ("docs/a.txt", b"alpha\nbeta"),
+        ("docs/.hidden.txt", b"skipped"),
+        ("__MACOSX/docs/._a.txt", b"skipped"),
+        ("docs/b.txt", b"gamma"),
+    ])
+
+    result = await service.ingest_archive(archive, "docs")
+
+    assert (result["total"], result["succeeded"], result["failed"]) == (2, 2, 0)
+    assert sorted(f["name"] for f in result["files"]) == ["docs/a.txt", "docs/b.txt"]
+    assert sorted(f["chunks"] for f in result["files"]) == [1, 2]
+
+
+async def test_not_an_archive(service):
+    with pytest.raises(InvalidArchiveError):
+        await service.ingest_archive(io.BytesIO(b"plain text, not an archive"), "notes.txt")
+
+
+async def test_oversized_member_is_reported_without_reading(service, monkeypatch):
+    monkeypatch.setattr(bulk_ingest.parse_pool, "max_bytes", 8)
+    archive = zip_archive([("big.txt", b"x" * 100), ("small.txt", b"ok")])
+
+    result = await service.ingest_archive(archive, "docs")
+
+    statuses = {f["name"]: f["status"] for f in result["files"]}
+    assert statuses == {"big.txt": "failed", "small.txt": "ready"}
+
+
+async def test_parse_slot_is_free_while_embedding(service):
+    archive = zip_archive([("a.txt", b"one\ntwo\nthree")])
+
+    await service.ingest_archive(archive, "docs")
+
+    [(texts, parse_slots_free)] = FakePipeline.runs
+    assert texts == ["one", "two", "three"]
+    assert parse_slots_free == governor.parse_limit
+
+
+async def test_duplicate_of_a_stored_copy(service, monkeypatch):
+    monkeypatch.setattr(settings, "BULK_INGEST_CONCURRENCY", 1)
+    service = BulkIngestService("user")
+    archive = zip_archive([("a.txt", b"same"), ("b.txt", b"same")])
+
+    result = await service.ingest_archive(archive, "docs")
+
+    first, second = result["files"]
+    assert first["status"] == "ready"
+    assert second == {"name": "b.txt", "doc_id": first["doc_id"], "status": "duplicate"}
+
+
+async def test_copy_of_a_failed_member_is_ingested(service, monkeypatch):
+    monkeypatch.setattr(settings, "BULK_INGEST_CONCURRENCY", 1)
+    service = BulkIngestService("user")
+    calls = []
+
+    async def flaky_parse(digest, content_type, filename, content=None):
+        calls.append(filename)
+        if len(calls) == 1:
+            raise ValueError("parser crashed")
+        return await fake_parse(digest, content_type, filename, content=content)
+
+    monkeypatch.setattr(bulk_ingest.parse_cache, "parse", flaky_parse)
+    archive = zip_archive([("a.txt", b"same"), ("b.txt", b"same")])
+
+    result = await service.ingest_archive(archive, "docs")
+
+    first, second = result["files"]
+    assert first["status"] == "failed"
+    assert second["status"] == "ready" and second["doc_id"]
+    assert calls == ["a.txt", "b.txt"]
+
+
+async def test_manifest_keys_outside_the_callers_prefix(service):
+    result = await service.ingest_keys([
+        "raw/other-user/doc/secret.pdf",
+        "raw/user/../other-user/secret.pdf",
+        "clean/user/doc/content.md",
+    ])
+
+    assert result["failed"] == 3
+    assert all("outside the caller's storage prefix" in f["error"] for f in result["files"])
+
+
+async def test_manifest_keys_are_read_from_storage(service):
+    await bulk_ingest.storage.put_bytes("uploads/user/notes.txt", b"from storage", "text/plain")
+
+    result = await service.ingest_keys(["uploads/user/notes.txt"])
+
+    assert result["succeeded"] == 1
+    assert FakePipeline.runs[0][0] == ["from storage"]
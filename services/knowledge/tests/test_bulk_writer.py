@@ -0,0 +1,117 @@
+import json
+import struct
+import uuid
+
+from services.bulk_writer import BulkWriter, CHUNK_COLUMNS, EMBEDDING_COLUMNS, _vector_field
+
+
+def decode_copy(data: bytes):
+    """Rows of a PGCOPY binary stream as lists of raw field bytes (None for NULL)"""
+    assert data[:11] == b"PGCOPY\n\xff\r\n\x00"
+    pos = 19
+    rows = []
+    while True:
+        (fields,) = struct.unpack_from(">h", data, pos)
+        pos += 2
+        if fields == -1:
+            assert pos == len(data)
+            return rows
+        row = []
+        for _ in range(fields):
+            (length,) = struct.unpack_from(">i", data, pos)
+            pos += 4
+            if length == -1:
+                row.append(None)
+            else:
+                row.append(data[pos:pos + length])
+                pos += length
+        rows.append(row)
+
+
+class CapturingWriter(BulkWriter):
+    """BulkWriter that keeps the COPY payloads instead of sending them"""
+
+    def __init__(self):
+        super().__init__(db=None)
+        self.copies = []
+
+    async def _copy(self, table, columns, data):
+        self.copies.append((table, columns, data))
+
+
+def test_vector_field_is_pgvector_binary():
+    field = _vector_field([1.0, -0.5, 0.25])
+    length, dim, unused = struct.unpack_from(">iHH", field)
+    assert (length, dim, unused) == (4 + 4 * 3, 3, 0)
+    assert struct.unpack_from(">3f", field, 8) == (1.0, -0.5, 0.25)
+    assert len(field) == 4 + length
+
+
+async def test_write_batch_encodes_chunks_and_embeddings():
+    writer = CapturingWriter()
+    chunks = [
+        {"text": "héllo", "position": 0, "metadata": {"page": 1}, "section_id": 5, "section_path": "A > B"},
+        {"id": "fixed-id", "text": "world", "position": 1},
+    ]
+    vectors = [[0.5, 1.5], [2.0, -1.0]]
+
+    chunk_ids = await writer.write_batch("doc", "user", chunks, vectors)
+
+    assert uuid.UUID(chunk_ids[0]) and chunk_ids[1] == "fixed-id"
+    (chunk_table, chunk_columns, chunk_data), (emb_table, emb_columns, emb_data) = writer.copies
+    assert (chunk_table, chunk_columns) == ("chunks", CHUNK_COLUMNS)
+    assert (emb_table, emb_columns) == ("embeddings", EMBEDDING_COLUMNS)
+
+    first, second = decode_copy(chunk_data)
+    assert first == [
+        chunk_ids[0].encode(), b"doc", b"user", "héllo".encode("utf-8"),
+        struct.pack(">i", 0), b'{"page": 1}', struct.pack(">i", 5), b"A > B"
+    ]
+    assert second[0] == b"fixed-id"
+    assert json.loads(second[5]) == {}
+    assert second[6] is None and second[7] is None
+
+    rows = decode_copy(emb_data)
+    assert [row[1] for row in rows] == [chunk_id.encode() for chunk_id in chunk_ids]
+    assert [row[3:] for row in rows] == [[b"doc", b"user"]] * 2
+    assert rows[1][2] == _vector_field([2.0, -1.0])[4:]
+
+
+async def test_empty_batch_sends_nothing():
+    writer = CapturingWriter()
+    assert await writer.write_batch("doc", "user", [], []) == []
+    assert writer.copies == []
+
+
+async def test_copy_round_trip(pg_session):
+    from sqlalchemy import text
+
+    doc_id = str(uuid.uuid4())
+    chunks = [
+        {"text": f"chunk {i} – ünïcode", "position": i, "metadata": {"i": i}, "section_id": i, "section_path": "A"}
+        for i in range(3)
+    ]
+    vectors = [[float(i)] * 1024 for i in range(3)]
+
+    writer = BulkWriter(pg_session)
+    chunk_ids = await writer.write_batch(doc_id, "user", chunks, vectors)
+
+    rows = (await pg_session.execute(
+        text(
+            "SELECT c.id, c.text, c.position, c.metadata, c.section_id, e.vector::text "
+            "FROM knowledge.chunks c JOIN knowledge.embeddings e ON e.chunk_id = c.id "
+            "WHERE c.doc_id = :doc ORDER BY c.position"
+        ),
+        {"doc": doc_id}
+    )).all()
+
+    assert [row[0] for row in rows] == chunk_ids
+    assert [row[1] for row in rows] == [chunk["text"] for chunk in chunks]
+    assert [row[3] for row in rows] == [{"i": 0}, {"i": 1}, {"i": 2}]
+    assert [json.loads(row[5]) for row in rows] == vectors
+
+    await writer.delete_chunks(chunk_ids[:1])
+    remaining = (await pg_session.execute(
+        text("SELECT count(*) FROM knowledge.embeddings WHERE doc_id = :doc"), {"doc": doc_id}
+    )).scalar()
+    assert remaining == 2
@@ -0,0 +1,121 @@
+import pytest
+
+from config import settings
+from services.chunker import TextChunker, chunk_strategy, split_sections
+
+ALPHA = "Alpha sentence here. " * 6
+BETA = "Beta sentence here. " * 6
+GAMMA = "Gamma sentence here. " * 20
+
+
+@pytest.fixture(autouse=True)
+def section_chunking(monkeypatch):
+    monkeypatch.setattr(settings, "CHUNK_SIZE_UNIT", "chars")
+    monkeypatch.setattr(settings, "CHUNK_SIZE", 200)
+    monkeypatch.setattr(settings, "CHUNK_OVERLAP", 0)
+    monkeypatch.setattr(settings, "CHUNK_SECTION_MIN_SIZE", 60)
+    monkeypatch.setattr(settings, "CHUNK_STRATEGY", "section")
+
+
+async def chunks(text):
+    return await TextChunker().chunk(text)
+
+
+def test_split_sections():
+    text = "Preface.\n# Guide\nBody.\n## Setup\n```\n# not a heading\n```\n# Other\nEnd."
+
+    assert [(text[start:body], path) for start, body, _, path in split_sections(text)] == [
+        ("", []),
+        ("# Guide", ["Guide"]),
+        ("## Setup", ["Guide", "Setup"]),
+        ("# Other", ["Other"]),
+    ]
+
+
+def test_strategy_by_format(monkeypatch):
+    monkeypatch.setattr(settings, "CHUNK_STRATEGY", "recursive")
+    monkeypatch.setattr(settings, "CHUNK_STRATEGY_BY_FORMAT", {"article": "section"})
+
+    assert chunk_strategy("article") == "section"
+    assert chunk_strategy("pdf") == chunk_strategy(None) == "recursive"
+    monkeypatch.setattr(settings, "CHUNK_STRATEGY", "sentences")
+    with pytest.raises(ValueError):
+        TextChunker()
+
+
+async def test_large_sections_are_chunked_apart():
+    text = f"# Guide\n## Install\n{ALPHA}\n## Use\n{BETA}\n"
+
+    result = await chunks(text)
+
+    assert [(c["section_path"], c["section_id"]) for c in result] == [
+        ("Guide > Install", text.index("## Install")),
+        ("Guide > Use", text.index("## Use")),
+    ]
+    assert [c["text"] for c in result] == [ALPHA.strip(), BETA.strip()]
+    for c in result:
+        assert text[c["metadata"]["char_start"]:c["metadata"]["char_end"]] == c["text"]
+
+
+async def test_tiny_section_joins_its_next_sibling():
+    text = f"# Guide\n## Intro\nShort intro.\n## Setup\n{ALPHA}\n"
+
+    (chunk,) = await chunks(text)
+
+    assert chunk["text"].startswith("Short intro.\n\nAlpha sentence here.")
+    assert "#" not in chunk["text"]
+    # Labelled with the section contributing most of the text
+    assert chunk["section_path"] == "Guide > Setup"
+    assert chunk["metadata"]["char_start"] == text.index("Short intro.")
+
+
+async def test_tiny_last_section_joins_the_one_before():
+    text = f"# Guide\n## Setup\n{ALPHA}\n## Notes\nTiny note.\n"
+
+    (chunk,) = await chunks(text)
+
+    assert chunk["text"].endswith("\n\nTiny note.")
+    assert chunk["section_path"] == "Guide > Setup"
+
+
+async def test_tiny_sections_without_a_shared_heading_stay_apart():
+    text = "Preface.\n# A\nTiny a.\n# B\nTiny b.\n"
+
+    result = await chunks(text)
+
+    assert [(c["text"], c["section_path"]) for c in result] == [
+        ("Preface.", None),
+        ("Tiny a.", "A"),
+        ("Tiny b.", "B"),
+    ]
+
+
+async def test_tiny_section_before_an_oversized_one():
+    text = f"# Guide\n## Small\nTiny.\n## Big\n{GAMMA}\n"
+
+    result = await chunks(text)
+
+    assert len(result) > 1
+    assert result[0]["text"].startswith("Tiny.\n\nGamma")
+    assert {c["section_path"] for c in result} == {"Guide > Big"}
+    assert all(len(c["text"]) <= settings.CHUNK_SIZE for c in result)
+
+
+async def test_recursive_strategy_has_no_sections(monkeypatch):
+    monkeypatch.setattr(settings, "CHUNK_STRATEGY", "recursive")
+
+    result = await chunks(f"# Guide\n{ALPHA}")
+
+    assert result[0]["text"].startswith("# Guide")
+    assert {(c["section_id"], c["section_path"]) for c in result} == {(None, None)}
+
+
+def test_segment_offsets_follow_the_clean_text():
+    text = f"# Guide\n{ALPHA}\n"
+
+    (chunk,) = TextChunker().chunk_segment(text, {"page": 2}, start_position=5, text_offset=1000)
+
+    assert chunk["position"] == 5 and chunk["metadata"]["chunk_index"] == 5
+    assert chunk["section_id"] == 1000
+    assert chunk["metadata"]["char_start"] == 1000 + text.index("Alpha")
+    assert chunk["metadata"]["page"] == 2
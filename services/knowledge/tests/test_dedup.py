@@ -0,0 +1,102 @@
+import hashlib
+import io
+
+import pytest
+
+from config import settings
+from models import Document
+from services.dedup import DedupService, content_hash, file_content_hash
+
+
+class FakeResult:
+    def scalar_one_or_none(self):
+        return None
+
+
+class FakeSession:
+    def __init__(self):
+        self.statements = []
+        self.added = []
+
+    async def execute(self, statement, params=None):
+        self.statements.append((str(statement), params))
+        return FakeResult()
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    async def flush(self):
+        pass
+
+
+@pytest.fixture
+def dedup(monkeypatch):
+    monkeypatch.setattr(settings, "DEDUP_ENABLED", True)
+    monkeypatch.setattr(settings, "DEDUP_CROSS_TENANT", True)
+    return DedupService()
+
+
+def test_file_hash_matches_content_hash():
+    content = b"x" * (3 * 1024 + 17)
+    fileobj = io.BytesIO(content)
+    fileobj.seek(100)
+
+    digest, size = file_content_hash(fileobj, chunk_size=1024)
+
+    assert (digest, size) == (content_hash(content), len(content))
+    assert digest == hashlib.sha256(content).hexdigest()
+    assert fileobj.tell() == 0
+
+
+async def test_lookup_locks_the_digest_first(dedup):
+    db = FakeSession()
+
+    assert await dedup.find_existing(db, "user", "abc") is None
+
+    (lock_sql, lock_params), (lookup_sql, _) = db.statements
+    assert "pg_advisory_xact_lock" in lock_sql and lock_params == {"digest": "abc"}
+    assert "knowledge.documents" in lookup_sql
+
+
+async def test_disabled(dedup, monkeypatch):
+    monkeypatch.setattr(settings, "DEDUP_ENABLED", False)
+    db = FakeSession()
+
+    assert await dedup.find_existing(db, "user", "abc") is None
+    assert await dedup.find_shared(db, "abc") is None
+    assert db.statements == []
+
+
+async def test_shared_lookup_needs_cross_tenant(dedup, monkeypatch):
+    monkeypatch.setattr(settings, "DEDUP_CROSS_TENANT", False)
+    db = FakeSession()
+
+    assert await dedup.find_shared(db, "abc") is None
+    assert db.statements == []
+
+
+async def test_clone_is_labelled_for_the_new_owner(dedup):
+    source = Document(
+        id="src", user_id="owner", filename="owner-secret.pdf", content_type="application/pdf",
+        content_hash="abc", raw_path="raw/owner/src/owner-secret.pdf", clean_path="clean/owner/src/content.md",
+        doc_metadata={"source": "owner-secret.pdf", "title": "Guide", "pages": 3}
+    )
+    db = FakeSession()
+
+    doc = await dedup.clone_document(db, source, "new", "caller", "mine.pdf")
+
+    assert db.added == [doc]
+    assert (doc.user_id, doc.filename, doc.status, doc.progress) == ("caller", "mine.pdf", "ready", 100)
+    assert doc.doc_metadata == {"source": "mine.pdf", "title": "Guide", "pages": 3}
+    assert doc.clean_path == source.clean_path and doc.raw_path == source.raw_path
+    (copy_sql, params), = db.statements
+    assert "INSERT INTO knowledge.embeddings" in copy_sql
+    assert params == {"source_id": "src", "doc_id": "new", "user_id": "caller"}
+
+
+async def test_url_clone_points_at_the_callers_url(dedup):
+    source = Document(id="src", content_hash="abc", raw_path="https://owner.example/a", doc_metadata={})
+
+    doc = await dedup.clone_document(FakeSession(), source, "new", "caller", "Title", url="https://example.com/b")
+
+    assert doc.doc_metadata["source"] == doc.raw_path == "https://example.com/b"
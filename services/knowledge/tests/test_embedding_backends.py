@@ -0,0 +1,129 @@
+import os
+
+import pytest
+
+from config import settings
+from services import embedding_backends
+from services.embedding_backends import LocalEmbeddingBackend, close_embedding_backend, get_embedding_backend
+from services.query_batcher import QueryBatcher
+
+onnx = pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+tokenizers = pytest.importorskip("tokenizers")
+
+VOCAB = {"[PAD]": 0, "[UNK]": 1, "a": 2, "b": 3, "c": 4}
+# One row per token id; token embeddings are looked up, nothing else
+TABLE = [
+    [0, 0, 0, 0],
+    [1, 1, 1, 1],
+    [3, 0, 0, 0],
+    [0, 4, 0, 0],
+    [0, 0, 5, 0],
+]
+
+
+def write_model(path, table=TABLE, name="model.onnx"):
+    """Model directory whose ONNX graph outputs token embeddings from table"""
+    from onnx import TensorProto, helper, numpy_helper
+    import numpy as np
+
+    path.mkdir(exist_ok=True)
+    graph = helper.make_graph(
+        [helper.make_node("Gather", ["table", "input_ids"], ["last_hidden_state"])],
+        "lookup",
+        [
+            helper.make_tensor_value_info("input_ids", TensorProto.INT64, ["batch", "tokens"]),
+            helper.make_tensor_value_info("attention_mask", TensorProto.INT64, ["batch", "tokens"]),
+        ],
+        [helper.make_tensor_value_info("last_hidden_state", TensorProto.FLOAT, ["batch", "tokens", len(table[0])])],
+        [numpy_helper.from_array(np.array(table, dtype=np.float32), "table")],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    onnx.save(model, str(path / name))
+
+    tokenizer = tokenizers.Tokenizer(tokenizers.models.WordLevel(VOCAB, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = tokenizers.pre_tokenizers.Whitespace()
+    tokenizer.save(str(path / "tokenizer.json"))
+    return str(path)
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    return write_model(tmp_path / "tiny")
+
+
+@pytest.fixture(autouse=True)
+def local_settings(monkeypatch):
+    monkeypatch.setattr(embedding_backends, "EMBEDDING_DIMENSION", 4)
+    monkeypatch.setattr(embedding_backends, "_embedding_backend", None)
+    monkeypatch.setattr(settings, "EMBEDDING_LOCAL_MODEL_ID", "")
+    monkeypatch.setattr(settings, "EMBEDDING_LOCAL_POOLING", "mean")
+    monkeypatch.setattr(settings, "EMBEDDING_LOCAL_BATCH_SIZE", 2)
+
+
+async def embed(backend, texts):
+    try:
+        return await backend.embed(texts)
+    finally:
+        await backend.close()
+
+
+async def test_mean_pooling_in_input_order(model_path):
+    vectors = await embed(LocalEmbeddingBackend(model_path), ["a b", "c", "a", "b b c"])
+
+    assert vectors[0] == pytest.approx([0.6, 0.8, 0, 0])
+    assert vectors[1] == pytest.approx([0, 0, 1, 0])
+    # Padding in a batch with longer texts does not count towards the mean
+    assert vectors[2] == pytest.approx([1, 0, 0, 0])
+    assert vectors[3] == pytest.approx([0, 8 / 89 ** 0.5, 5 / 89 ** 0.5, 0])
+
+
+async def test_cls_pooling_takes_the_first_token(model_path, monkeypatch):
+    monkeypatch.setattr(settings, "EMBEDDING_LOCAL_POOLING", "cls")
+
+    vectors = await embed(LocalEmbeddingBackend(model_path), ["b a", "c a b"])
+
+    assert vectors == [pytest.approx([0, 1, 0, 0]), pytest.approx([0, 0, 1, 0])]
+
+
+def test_dimension_must_match_the_column(model_path, monkeypatch):
+    monkeypatch.setattr(embedding_backends, "EMBEDDING_DIMENSION", 1024)
+
+    with pytest.raises(ValueError, match="4-dim vectors; the embeddings column holds 1024"):
+        LocalEmbeddingBackend(model_path).start()
+
+
+def test_identity_follows_the_model_file(tmp_path, model_path, monkeypatch):
+    quantized = write_model(tmp_path / "tiny-q", name="model_quantized.onnx")
+    model = LocalEmbeddingBackend(model_path).model
+
+    assert model.startswith("local-tiny-model-")
+    assert LocalEmbeddingBackend(model_path).model == model
+    assert LocalEmbeddingBackend(quantized).model.startswith("local-tiny-q-model_quantized-")
+
+    # A re-exported model of the same size is told apart by its mtime
+    model_file = os.path.join(model_path, "model.onnx")
+    stat = os.stat(model_file)
+    os.utime(model_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert LocalEmbeddingBackend(model_path).model != model
+
+    monkeypatch.setattr(settings, "EMBEDDING_LOCAL_MODEL_ID", "bge-m3-int8")
+    assert LocalEmbeddingBackend(model_path).model == "local-bge-m3-int8"
+
+
+async def test_backend_is_created_on_first_use(tmp_path, model_path, monkeypatch):
+    monkeypatch.setattr(settings, "EMBEDDING_BACKEND", "local")
+    monkeypatch.setattr(settings, "EMBEDDING_LOCAL_MODEL_PATH", str(tmp_path / "missing"))
+
+    # Nothing to close, and nothing built by a query batcher either
+    await close_embedding_backend()
+    assert QueryBatcher().embedder is None
+    with pytest.raises(ValueError, match="No model.onnx"):
+        get_embedding_backend()
+
+    monkeypatch.setattr(settings, "EMBEDDING_LOCAL_MODEL_PATH", model_path)
+    backend = get_embedding_backend()
+    assert isinstance(backend, LocalEmbeddingBackend)
+    assert get_embedding_backend() is backend
+    await close_embedding_backend()
@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from config import settings
+from services import embedding_cache
+from services.embedding_cache import EmbeddingCache, close_redis, get_redis
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(settings, "EMBEDDING_CACHE_ENABLED", True)
+
+
+class TestEmbeddingCache:
+    async def test_round_trip_through_both_tiers(self, fake_redis, enabled):
+        cache = EmbeddingCache(namespace="emb", model="m")
+        vector = [0.5, -0.25, 1.0]
+
+        await cache.set_many(["text"], [vector])
+        assert await cache.get_many(["text", "other"]) == [vector, None]
+
+        # Second tier only, as in another process
+        cache._memory.clear()
+        assert await cache.get_many(["text"]) == [vector]
+        assert cache.key("text") in cache._memory
+
+    async def test_float16_storage(self, fake_redis, enabled, monkeypatch):
+        monkeypatch.setattr(settings, "EMBEDDING_CACHE_DTYPE", "float16")
+        cache = EmbeddingCache(model="m")
+
+        await cache.set_many(["t"], [[0.1, 1 / 3]])
+        (vector,) = await cache.get_many(["t"])
+
+        assert vector == pytest.approx([0.1, 1 / 3], abs=1e-3)
+        assert len(fake_redis.data[cache.key("t")]) == 4
+
+    async def test_keys_separate_models_and_namespaces(self, fake_redis, enabled):
+        await EmbeddingCache(namespace="emb", model="a").set_many(["t"], [[1.0]])
+
+        assert await EmbeddingCache(namespace="emb", model="b").get_many(["t"]) == [None]
+        assert await EmbeddingCache(namespace="query", model="a").get_many(["t"]) == [None]
+
+    async def test_lru_eviction(self, fake_redis, enabled, monkeypatch):
+        monkeypatch.setattr(settings, "EMBEDDING_CACHE_MEMORY_ITEMS", 2)
+        cache = EmbeddingCache(model="m")
+
+        await cache.set_many(["a", "b"], [[1.0], [2.0]])
+        await cache.get_many(["a"])
+        await cache.set_many(["c"], [[3.0]])
+
+        assert list(cache._memory) == [cache.key("a"), cache.key("c")]
+
+    async def test_namespaces_have_their_own_lru(self, fake_redis, enabled, monkeypatch):
+        monkeypatch.setattr(settings, "EMBEDDING_CACHE_MEMORY_ITEMS", 2)
+        queries = EmbeddingCache(namespace="query", model="m", max_items=1)
+        await queries.set_many(["q"], [[1.0]])
+
+        # Bulk embedding churns its own LRU without evicting the query
+        await EmbeddingCache(namespace="emb", model="m").set_many(["a", "b", "c"], [[1.0], [2.0], [3.0]])
+        fake_redis.fail = True
+
+        assert await EmbeddingCache(namespace="query", model="m", max_items=1).get_many(["q"]) == [[1.0]]
+        assert len(EmbeddingCache(namespace="emb", model="m")._memory) == 2
+
+    async def test_redis_failure_is_a_miss(self, fake_redis, enabled):
+        cache = EmbeddingCache(model="m")
+        fake_redis.fail = True
+
+        await cache.set_many(["t"], [[1.0]])
+        cache._memory.clear()
+
+        assert await cache.get_many(["t"]) == [None]
+
+
+def test_redis_client_per_event_loop():
+    clients = []
+
+    async def task():
+        client = get_redis()
+        assert get_redis() is client
+        clients.append(client)
+        await close_redis()
+
+    asyncio.run(task())
+    asyncio.run(task())
+
+    assert clients[0] is not clients[1]
+    assert embedding_cache._redis_client is None
@@ -0,0 +1,60 @@
+from pathlib import Path
+
+import pytest
+
+from services.html_extract import extract_html
+from services.parser import DocumentParser
+
+FIXTURES = sorted((Path(__file__).parent / "fixtures" / "html").glob("*.html"))
+
+
+@pytest.mark.parametrize("path", FIXTURES, ids=lambda path: path.stem)
+def test_lxml_matches_bs4(path):
+    html = path.read_text(encoding="utf-8")
+    url = f"https://example.com/{path.name}"
+
+    assert extract_html(html, url) == DocumentParser.parse_html_bs4(html, url)
+
+
+def test_article_extraction():
+    html = (Path(__file__).parent / "fixtures" / "html" / "article.html").read_text(encoding="utf-8")
+
+    result = extract_html(html, "https://example.com/a")
+
+    assert result["metadata"] == {
+        "source": "https://example.com/a",
+        "format": "article",
+        "title": "Writing a Résumé That Gets Read",
+        "author": "Jordan Lee",
+        "published_date": "2024-03-01T09:00:00Z",
+        "description": "How to structure a résumé & cover letter.",
+    }
+    text = result["text"]
+    assert text.startswith("# Writing a Résumé\n\nLead with impact, not duties. Read more")
+    assert "## Structure" in text and "> Keep it to one page." in text
+    assert "Site header" not in text and "Outside the article" not in text and "Copyright" not in text
+    assert "ignored" not in text
+
+
+def test_empty_document():
+    assert extract_html("  \n", "u") == {"text": "", "metadata": {"source": "u", "format": "article", "title": ""}}
+
+
+@pytest.mark.parametrize("html", ["<!-- only a comment -->", "<!DOCTYPE html>\n", "\n<!-- a -->\n<!-- b -->\n"])
+def test_document_without_elements(html):
+    assert extract_html(html, "u") == {"text": "", "metadata": {"source": "u", "format": "article", "title": ""}}
+
+
+@pytest.mark.parametrize("encoding", ["UTF-8", "ISO-8859-1"])
+def test_xhtml_with_encoding_declaration(encoding):
+    # The content is already decoded text, so the declared encoding is moot
+    html = (
+        f'<?xml version="1.0" encoding="{encoding}"?>\n'
+        '<html xmlns="http://www.w3.org/1999/xhtml"><head><title>Menu</title></head>'
+        '<body><p>Café crème</p></body></html>'
+    )
+
+    result = extract_html(html, "u")
+
+    assert result == {"text": "Café crème", "metadata": {"source": "u", "format": "article", "title": "Menu"}}
+    assert result == DocumentParser.parse_html_bs4(html, "u")
@@ -0,0 +1,64 @@
+from services import jobs
+from services.search import SearchService
+
+
+class FakeResult:
+    def __init__(self, value=None):
+        self.value = value
+
+    def scalar_one_or_none(self):
+        return self.value
+
+    def fetchall(self):
+        return []
+
+
+class FakeSession:
+    """Records executed statements as SQL text"""
+
+    def __init__(self):
+        self.statements = []
+        self.committed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement, params=None):
+        self.statements.append(str(statement))
+        return FakeResult("user-1")
+
+    async def commit(self):
+        self.committed = True
+
+
+async def test_mark_failed_drops_chunks(monkeypatch):
+    session = FakeSession()
+    bumped = []
+
+    async def bump(user_id):
+        bumped.append(user_id)
+
+    monkeypatch.setattr(jobs, "AsyncSessionLocal", lambda: session)
+    monkeypatch.setattr(jobs, "bump_generation", bump)
+
+    await jobs.mark_failed("doc-1", "boom")
+
+    deletes = [sql for sql in session.statements if sql.startswith("DELETE")]
+    assert [sql.split()[2] for sql in deletes] == ["knowledge.embeddings", "knowledge.chunks"]
+    assert session.statements[-1].startswith("UPDATE knowledge.documents")
+    assert session.committed and bumped == ["user-1"]
+
+
+async def test_searches_skip_unfinished_and_failed_documents():
+    session = FakeSession()
+    service = SearchService()
+
+    await service._bm25_search(session, "query", "user-1", 5)
+    await service._vector_search(session, [0.1, 0.2], "user-1", 5)
+
+    for sql in session.statements:
+        assert "JOIN knowledge.documents d" in sql
+        assert "d.status <> 'failed' AND d.progress = 100" in sql
@@ -0,0 +1,124 @@
+import json
+import uuid
+from contextlib import asynccontextmanager
+
+import database
+from database import MIGRATIONS, ONE_TIME_MIGRATIONS, init_db
+
+
+class FakeResult:
+    def __init__(self, names):
+        self.names = names
+
+    def scalars(self):
+        return list(self.names)
+
+
+class FakeConnection:
+    """Records statements; knowledge.schema_migrations is a set"""
+
+    def __init__(self, applied):
+        self.applied = applied
+        self.statements = []
+
+    async def run_sync(self, fn):
+        self.statements.append("create_all")
+
+    async def execute(self, statement, params=None):
+        sql = " ".join(str(statement).split())
+        self.statements.append(sql)
+        if sql == "SELECT name FROM knowledge.schema_migrations":
+            return FakeResult(self.applied)
+        if sql.startswith("INSERT INTO knowledge.schema_migrations"):
+            self.applied.add(params["name"])
+        return FakeResult([])
+
+
+class FakeEngine:
+    def __init__(self, applied):
+        self.applied = applied
+        self.connections = []
+
+    @asynccontextmanager
+    async def begin(self):
+        conn = FakeConnection(self.applied)
+        self.connections.append(conn)
+        yield conn
+
+
+def one_time_statements(conn):
+    bodies = {" ".join(statement.split()) for _, statement in ONE_TIME_MIGRATIONS}
+    return [sql for sql in conn.statements if sql in bodies]
+
+
+async def test_one_time_migrations_run_once(monkeypatch):
+    engine = FakeEngine(applied=set())
+    monkeypatch.setattr(database, "engine", engine)
+
+    await init_db()
+    await init_db()
+
+    first, second = engine.connections
+    assert len(one_time_statements(first)) == len(ONE_TIME_MIGRATIONS)
+    assert one_time_statements(second) == []
+    assert engine.applied == {name for name, _ in ONE_TIME_MIGRATIONS}
+
+    # Idempotent schema changes still run on every start
+    for conn in (first, second):
+        assert sum(sql in conn.statements for sql in (" ".join(m.split()) for m in MIGRATIONS)) == len(MIGRATIONS)
+
+
+async def test_applied_set_is_read_under_the_lock(monkeypatch):
+    engine = FakeEngine(applied=set())
+    monkeypatch.setattr(database, "engine", engine)
+
+    await init_db()
+
+    statements = engine.connections[0].statements
+    lock = statements.index("SELECT pg_advisory_xact_lock(:key)")
+    assert lock < statements.index("SELECT name FROM knowledge.schema_migrations")
+    # The bookkeeping table exists before it is read
+    assert any("CREATE TABLE IF NOT EXISTS knowledge.schema_migrations" in sql for sql in statements[:lock])
+
+
+def test_migration_names_are_unique_and_ordered():
+    names = [name for name, _ in ONE_TIME_MIGRATIONS]
+
+    assert len(set(names)) == len(names)
+    assert names == sorted(names)
+
+
+async def test_chunk_metadata_rewrite(pg_session):
+    from sqlalchemy import text
+
+    doc_id = str(uuid.uuid4())
+    doc_metadata = {"source": "report.pdf", "format": "pdf", "author": "Ada", "pages": 3}
+    await pg_session.execute(
+        text("INSERT INTO knowledge.documents (id, user_id, filename, metadata) VALUES (:id, 'u', 'report.pdf', :meta)"),
+        {"id": doc_id, "meta": json.dumps(doc_metadata)}
+    )
+    chunks = {
+        # Document keys copied onto the chunk are dropped, its own kept
+        "copied": {**doc_metadata, "page": 2},
+        # A key whose value differs from the document's is chunk-specific
+        "differs": {"source": "report.pdf", "format": "pdf", "author": "Grace"},
+        # Chunks written after the change have no source and are untouched
+        "current": {"page": 1, "format": "pdf"},
+    }
+    for chunk_id, metadata in chunks.items():
+        await pg_session.execute(
+            text("INSERT INTO knowledge.chunks (id, doc_id, user_id, text, metadata) VALUES (:id, :doc, 'u', 't', :meta)"),
+            {"id": f"{doc_id}-{chunk_id}", "doc": doc_id, "meta": json.dumps(metadata)}
+        )
+
+    (_, statement), = [m for m in ONE_TIME_MIGRATIONS if m[0] == "0001_chunk_metadata_without_document_keys"]
+    await pg_session.execute(text(statement))
+
+    rows = dict((await pg_session.execute(
+        text("SELECT id, metadata FROM knowledge.chunks WHERE doc_id = :doc"), {"doc": doc_id}
+    )).all())
+    assert rows == {
+        f"{doc_id}-copied": {"page": 2},
+        f"{doc_id}-differs": {"author": "Grace"},
+        f"{doc_id}-current": {"page": 1, "format": "pdf"},
+    }
@@ -0,0 +1,174 @@
+import io
+import sys
+import types
+
+import pytest
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+from config import settings
+from services import ocr
+from services.parser import DocumentParser
+
+TEXT_LAYER = "A page with a real text layer on it"
+
+
+def pdf(*texts):
+    """PDF with one page per text; an empty text makes a scanned-looking page"""
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    }))
+    for text in texts:
+        page = writer.add_blank_page(612, 792)
+        if text:
+            page[NameObject("/Resources")] = DictionaryObject({
+                NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})
+            })
+            content = DecodedStreamObject()
+            content.set_data(f"BT /F1 12 Tf 72 700 Td ({text}) Tj ET".encode("latin-1"))
+            page[NameObject("/Contents")] = writer._add_object(content)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    path = tmp_path / "mixed.pdf"
+    path.write_bytes(pdf(TEXT_LAYER, ""))
+    return str(path)
+
+
+@pytest.fixture
+def ocr_calls(monkeypatch):
+    monkeypatch.setattr(settings, "OCR_ENABLED", True)
+    calls = []
+
+    def ocr_pdf_page(path, page_index):
+        calls.append(page_index)
+        return f"OCR text of page {page_index + 1}"
+
+    monkeypatch.setattr(ocr, "available", lambda: True)
+    monkeypatch.setattr(ocr, "ocr_pdf_page", ocr_pdf_page)
+    return calls
+
+
+def test_only_pages_without_text_are_ocrd(pdf_path, ocr_calls):
+    assert DocumentParser.extract_pdf_pages(pdf_path, 0, 2) == [TEXT_LAYER, "OCR text of page 2"]
+    assert ocr_calls == [1]
+
+
+def test_failed_ocr_keeps_the_text_layer(pdf_path, ocr_calls, monkeypatch):
+    monkeypatch.setattr(ocr, "ocr_pdf_page", lambda path, page_index: None)
+
+    assert DocumentParser.extract_pdf_pages(pdf_path, 1, 2) == [""]
+
+
+def test_disabled(pdf_path, ocr_calls, monkeypatch):
+    monkeypatch.setattr(settings, "OCR_ENABLED", False)
+
+    assert DocumentParser.extract_pdf_pages(pdf_path, 0, 2) == [TEXT_LAYER, ""]
+    assert ocr_calls == []
+
+
+def test_unavailable_ocr_renders_nothing(pdf_path, monkeypatch):
+    monkeypatch.setattr(settings, "OCR_ENABLED", True)
+    monkeypatch.setattr(ocr, "available", lambda: False)
+
+    assert ocr.ocr_pdf_page(pdf_path, 1) is None
+
+
+def test_scanned_pdfs_are_spread_thinly(tmp_path, ocr_calls, monkeypatch):
+    monkeypatch.setattr(settings, "OCR_PAGES_PER_TASK", 1)
+    monkeypatch.setattr(settings, "PDF_PAGES_PER_TASK", 8)
+    scanned = tmp_path / "scanned.pdf"
+    scanned.write_bytes(pdf("", TEXT_LAYER))
+    text = tmp_path / "text.pdf"
+    text.write_bytes(pdf(TEXT_LAYER, ""))
+
+    scanned_info = DocumentParser.pdf_info(str(scanned), "scanned.pdf")
+    text_info = DocumentParser.pdf_info(str(text), "text.pdf")
+
+    assert scanned_info["scanned"] is True and "scanned" not in text_info
+    assert DocumentParser.pages_per_task(scanned_info) == 1
+    assert DocumentParser.pages_per_task(text_info) == 8
+
+
+async def test_pdf_stream_falls_back_to_ocr_per_page(ocr_calls):
+    parsed = await DocumentParser.stream(pdf(TEXT_LAYER, "", TEXT_LAYER), "application/pdf", "mixed.pdf")
+
+    segments = [segment async for segment in parsed["segments"]]
+
+    assert [segment["text"] for segment in segments] == [TEXT_LAYER, "OCR text of page 2", TEXT_LAYER]
+    assert [segment["metadata"]["page"] for segment in segments] == [1, 2, 3]
+
+
+async def test_image_without_ocr_gets_a_placeholder(monkeypatch):
+    monkeypatch.setattr(ocr, "available", lambda: False)
+
+    parsed = await DocumentParser.stream(b"\x89PNG not really", "image/png", "scan.png")
+    segments = [segment async for segment in parsed["segments"]]
+
+    assert parsed["metadata"]["error"] == "ocr_unavailable"
+    assert len(segments) == 1 and "OCR not available" in segments[0]["text"]
+
+
+class FakeRedis:
+    def __init__(self, fail=False):
+        self.data = {}
+        self.fail = fail
+
+    def get(self, key):
+        if self.fail:
+            raise ConnectionError("redis unavailable")
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        if self.fail:
+            raise ConnectionError("redis unavailable")
+        self.data[key] = value
+
+
+@pytest.fixture
+def tesseract(monkeypatch):
+    """Stand-in pytesseract recording the images it reads"""
+    images = []
+
+    def image_to_string(image, lang=None):
+        images.append(image)
+        return f"text of {image}"
+
+    monkeypatch.setitem(sys.modules, "pytesseract", types.SimpleNamespace(image_to_string=image_to_string))
+    return images
+
+
+def test_ocr_results_are_cached_by_digest(tesseract, monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(ocr, "_cache", lambda: redis)
+
+    first = ocr._cached_ocr("abc", lambda: "page-image")
+    second = ocr._cached_ocr("abc", lambda: pytest.fail("image rebuilt on a cache hit"))
+
+    assert first == second == "text of page-image"
+    assert tesseract == ["page-image"]
+    assert redis.data == {f"ocr:{settings.OCR_LANG}:abc": b"text of page-image"}
+
+
+def test_ocr_works_without_the_cache(tesseract, monkeypatch):
+    monkeypatch.setattr(ocr, "_cache", lambda: FakeRedis(fail=True))
+
+    assert ocr._cached_ocr("abc", lambda: "page-image") == "text of page-image"
+
+
+def test_image_frames(tesseract, monkeypatch):
+    Image = pytest.importorskip("PIL.Image")
+    monkeypatch.setattr(ocr, "_cache", lambda: FakeRedis())
+    frames = [Image.new("L", (8, 8), color) for color in (0, 128, 255)]
+    buffer = io.BytesIO()
+    frames[0].save(buffer, format="TIFF", save_all=True, append_images=frames[1:])
+
+    assert ocr.image_frame_count(buffer) == 3
+    assert len(ocr.ocr_image_frames(buffer, 1, 5)) == 2
@@ -0,0 +1,161 @@
+import uuid
+
+import pytest
+
+from models import Document
+from services import parse_cache as parse_cache_module
+from services.parse_cache import ParseCache
+from services.parser import PARSER_VERSION, DocumentParser
+from services.reprocess import ReprocessService
+from services.storage import storage
+
+SEGMENTS = [{"text": "first", "metadata": {"page": 1}}, {"text": "second", "metadata": {"page": 2}}]
+
+
+class FakePool:
+    """Parses any file as plain text, counting calls"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def stream(self, content, content_type, filename):
+        self.calls += 1
+        return DocumentParser.as_stream({
+            "text": content.decode("utf-8"),
+            "metadata": {"source": filename, "format": "text"}
+        })
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    pool = FakePool()
+    monkeypatch.setattr(parse_cache_module, "parse_pool", pool)
+    cache = ParseCache()
+    cache.enabled = True
+    cache.pool = pool
+    return cache
+
+
+def fresh(metadata=None):
+    async def segments():
+        for segment in SEGMENTS:
+            yield segment
+
+    return {"metadata": metadata or {"source": "a.pdf", "format": "pdf"}, "segments": segments()}
+
+
+async def consume(parsed):
+    return [segment async for segment in parsed["segments"]]
+
+
+async def test_recorded_result_is_read_back(cache):
+    digest = uuid.uuid4().hex
+
+    assert await cache.load(digest, "application/pdf", "a.pdf") is None
+    assert await consume(cache.record(digest, "application/pdf", "a.pdf", fresh())) == SEGMENTS
+
+    cached = await cache.load(digest, "application/pdf", "a.pdf")
+
+    assert cached["metadata"] == {"source": "a.pdf", "format": "pdf"}
+    assert await consume(cached) == SEGMENTS
+
+
+async def test_partial_stream_is_not_stored(cache):
+    digest = uuid.uuid4().hex
+    parsed = cache.record(digest, "application/pdf", "a.pdf", fresh())
+
+    async for _ in parsed["segments"]:
+        break
+    await parsed["segments"].aclose()
+
+    assert await cache.load(digest, "application/pdf", "a.pdf") is None
+
+
+async def test_key_depends_on_version_and_format():
+    key = ParseCache.key("abc", "application/pdf", "Report.PDF")
+
+    assert key.startswith(f"parsed/v{PARSER_VERSION}/abc/")
+    assert key == ParseCache.key("abc", "application/pdf", "other.pdf")
+    assert key != ParseCache.key("abc", "text/plain", "Report.PDF")
+    assert key != ParseCache.key("abc", "application/pdf", "Report.txt")
+
+
+async def test_source_is_relabelled_for_the_reader(cache):
+    digest = uuid.uuid4().hex
+    await consume(cache.record(digest, "text/html", "page", fresh({"source": "https://a.example/x", "format": "article"})))
+
+    by_filename = await cache.load(digest, "text/html", "page")
+    by_source = await cache.load(digest, "text/html", "page", source="https://b.example/y")
+
+    assert by_filename["metadata"]["source"] == "page"
+    assert by_source["metadata"]["source"] == "https://b.example/y"
+    for cached in (by_filename, by_source):
+        await consume(cached)
+
+
+async def test_disabled_or_unhashed(cache):
+    digest = uuid.uuid4().hex
+    await consume(cache.record(digest, "application/pdf", "a.pdf", fresh()))
+
+    assert await cache.load(None, "application/pdf", "a.pdf") is None
+    cache.enabled = False
+    assert await cache.load(digest, "application/pdf", "a.pdf") is None
+
+
+async def test_parse_hits_skip_the_download_and_the_pool(cache):
+    digest = uuid.uuid4().hex
+    raw_path = f"raw/u/{digest}/notes.txt"
+    await storage.put_bytes(raw_path, b"one\n\ntwo", "text/plain")
+
+    first = await consume(await cache.parse(digest, "text/plain", "notes.txt", raw_path=raw_path))
+    await storage.delete_many([raw_path])
+    second = await consume(await cache.parse(digest, "text/plain", "notes.txt", raw_path=raw_path))
+
+    assert first == second
+    assert cache.pool.calls == 1
+
+
+async def test_refresh_reparses_and_replaces_the_entry(cache):
+    digest = uuid.uuid4().hex
+    await consume(await cache.parse(digest, "text/plain", "notes.txt", content=b"old"))
+
+    refreshed = await consume(await cache.parse(digest, "text/plain", "notes.txt", content=b"new", refresh=True))
+    cached = await consume(await cache.load(digest, "text/plain", "notes.txt"))
+
+    assert cache.pool.calls == 2
+    assert [segment["text"] for segment in refreshed] == [segment["text"] for segment in cached] == ["new"]
+
+
+class TestReprocessLoad:
+    @pytest.fixture(autouse=True)
+    def shared_cache(self, cache, monkeypatch):
+        monkeypatch.setattr(parse_cache_module.parse_cache, "enabled", True)
+        return parse_cache_module.parse_cache
+
+    async def test_file_documents_reuse_the_cache_unless_reparsed(self, shared_cache, cache):
+        digest = uuid.uuid4().hex
+        raw_path = f"raw/u/{digest}/notes.txt"
+        await storage.put_bytes(raw_path, b"text", "text/plain")
+        doc = Document(id="d", user_id="u", filename="notes.txt", content_type="text/plain",
+                       content_hash=digest, raw_path=raw_path)
+        service = ReprocessService()
+
+        await consume(await service._load(doc, reparse=False))
+        await consume(await service._load(doc, reparse=False))
+        assert cache.pool.calls == 1
+
+        await consume(await service._load(doc, reparse=True))
+        assert cache.pool.calls == 2
+
+    async def test_url_documents_keep_their_url(self, shared_cache):
+        digest = uuid.uuid4().hex
+        await consume(shared_cache.record(
+            digest, "article", "Page title", fresh({"source": "https://example.com/a", "format": "article"})
+        ))
+        doc = Document(id="d", user_id="u", filename="Page title", content_type="article",
+                       content_hash=digest, raw_path="https://example.com/a")
+
+        parsed = await ReprocessService()._load(doc, reparse=False)
+
+        assert parsed["metadata"]["source"] == "https://example.com/a"
+        await consume(parsed)
@@ -0,0 +1,115 @@
+import gc
+import io
+import os
+import tempfile
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from services import parse_pool as parse_pool_module
+from services.parse_pool import DocumentTooLargeError, ParsePool, ParseTimeoutError
+from services.parser import DocumentParser, TempFileSegments
+
+
+def sleep_then_encode(seconds: float) -> bytes:
+    time.sleep(seconds)
+    return parse_pool_module._encode({"slept": seconds})
+
+
+@pytest.fixture
+def pool():
+    pool = ParsePool()
+    pool.workers = 1
+    pool.timeout = 0.5
+    yield pool
+    pool.shutdown()
+
+
+async def test_timeout_fails_only_its_own_task(pool):
+    with pytest.raises(ParseTimeoutError):
+        await pool._run(time.sleep, 5)
+
+    assert await pool._run(parse_pool_module._encode, {"ok": 1}) == {"ok": 1}
+
+
+async def test_queue_time_does_not_count(pool):
+    # Three 0.3s tasks on one worker: the last finishes after 0.9s, but
+    # none of them runs for longer than the timeout
+    futures = [pool._submit(sleep_then_encode, 0.3) for _ in range(3)]
+
+    for future in futures:
+        assert await pool._wait(future) == {"slept": 0.3}
+
+
+async def test_worker_crash_restarts_the_pool(pool):
+    with pytest.raises(BrokenProcessPool):
+        await pool._run(os._exit, 1)
+
+    assert await pool._run(parse_pool_module._encode, {"ok": 2}) == {"ok": 2}
+
+
+async def test_html_size_is_measured_in_bytes(pool):
+    pool.max_bytes = 10
+
+    with pytest.raises(DocumentTooLargeError):
+        await pool.parse_html("<p>ééééé</p>", "https://example.com")
+
+
+def pdf_bytes(pages: int) -> bytes:
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=72, height=72)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def temp_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    return tmp_path
+
+
+class TestTempFiles:
+    async def test_unstarted_stream_removes_its_file(self, temp_dir):
+        parsed = await DocumentParser.stream(pdf_bytes(2), "application/pdf", "a.pdf")
+        assert len(list(temp_dir.iterdir())) == 1
+
+        del parsed
+        gc.collect()
+
+        assert list(temp_dir.iterdir()) == []
+
+    async def test_exhausted_stream_removes_its_file(self, temp_dir):
+        parsed = await DocumentParser.stream(pdf_bytes(3), "application/pdf", "a.pdf")
+
+        pages = [segment["metadata"]["page"] async for segment in parsed["segments"]]
+
+        assert pages == [1, 2, 3]
+        assert list(temp_dir.iterdir()) == []
+
+    async def test_closed_stream_removes_its_file(self, temp_dir):
+        path = temp_dir / "spool"
+        path.write_text("x")
+
+        async def segments():
+            yield {"text": "one", "metadata": {}}
+            yield {"text": "two", "metadata": {}}
+
+        stream = TempFileSegments(str(path), segments())
+        assert (await stream.__anext__())["text"] == "one"
+        await stream.aclose()
+
+        assert not path.exists()
+
+    async def test_pool_record_spool_is_removed(self, pool, temp_dir):
+        parsed = await pool.stream(b"a,b\n1,2\n", "text/csv", "t.csv")
+        assert len(list(temp_dir.iterdir())) == 1
+
+        segments = [segment async for segment in parsed["segments"]]
+
+        assert segments[0]["metadata"] == {"row_start": 2, "row_end": 2}
+        assert list(temp_dir.iterdir()) == []
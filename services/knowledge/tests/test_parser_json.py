@@ -0,0 +1,119 @@
+import io
+import json
+
+import pytest
+
+from config import settings
+from services.parser import DocumentParser, _JsonStream
+
+
+def stream(text: str, read_size: int = 3) -> _JsonStream:
+    # Tiny reads put every token boundary at a buffer edge at least once
+    return _JsonStream(io.StringIO(text), read_size=read_size)
+
+
+def segments(content: bytes, record_format: str, filename: str = "file"):
+    metadata, groups = DocumentParser.record_segments(io.BytesIO(content), record_format, filename)
+    return metadata, list(groups)
+
+
+class TestJsonStream:
+    VALUES = [
+        0, -12.5e3, 123456789012345678901234567890, True, False, None,
+        "", "plain", "esc\"aped \\ é 🎉 \n", [], {}, [1, [2, [3]]],
+        {"a": {"b": [1, 2.5, "x"]}, "c": None},
+    ]
+
+    @pytest.mark.parametrize("read_size", [1, 2, 3, 7, 64 * 1024])
+    def test_array_elements(self, read_size):
+        text = json.dumps(self.VALUES, indent=1)
+        assert list(stream(text, read_size).array()) == self.VALUES
+
+    @pytest.mark.parametrize("read_size", [1, 5, 64 * 1024])
+    def test_object_members(self, read_size):
+        obj = {f"key{i}": value for i, value in enumerate(self.VALUES)}
+        text = json.dumps(obj, separators=(" , ", " : "))
+        assert dict(stream(text, read_size).members()) == obj
+
+    def test_number_at_buffer_edge_is_not_truncated(self):
+        # "1234" must not decode as 1 after the first one-character read
+        assert list(stream("[1234,5678]", read_size=1).array()) == [1234, 5678]
+        assert stream("98765", read_size=2).value() == 98765
+
+    def test_empty_containers_and_whitespace(self):
+        assert list(stream("  [ \n ]  ").array()) == []
+        assert list(stream("\t{ }").members()) == []
+        assert stream("   ").peek() == ""
+
+    @pytest.mark.parametrize("text", ["[1, 2", "[1 2]", "{\"a\" 1}", "[1,]"])
+    def test_malformed_input_raises(self, text):
+        with pytest.raises(ValueError):
+            list(stream(text).array() if text[0] == "[" else stream(text).members())
+
+
+class TestJson:
+    def test_array_elements_are_grouped_with_paths(self):
+        content = json.dumps([{"id": i, "tags": ["a", "b"]} for i in range(3)]).encode()
+
+        _, groups = segments(content, "json")
+
+        assert groups == [{
+            "text": "\n\n".join(f"id: {i}\ntags[0]: a\ntags[1]: b" for i in range(3)),
+            "metadata": {"json_path": "$[0:3]"},
+        }]
+
+    def test_object_members(self):
+        content = json.dumps({"title": "Guide", "items": [{"q": 1}, {"q": 2}], "empty": {}}).encode()
+
+        _, groups = segments(content, "json")
+
+        assert groups == [
+            {"text": "title: Guide", "metadata": {"json_path": "$.title"}},
+            {"text": "q: 1\n\nq: 2", "metadata": {"json_path": "$.items[0:2]"}},
+            {"text": "empty: {}", "metadata": {"json_path": "$.empty"}},
+        ]
+
+    def test_json_lines(self):
+        content = b'{"a": 1}\n\n{"a": 2}\n'
+
+        metadata, groups = segments(content, "jsonl", "log.jsonl")
+
+        assert metadata == {"source": "log.jsonl", "format": "jsonl"}
+        assert groups == [{"text": "a: 1\n\na: 2", "metadata": {"json_path": "$[0:2]"}}]
+
+    def test_nested_members_are_streamed_and_grouped(self):
+        content = json.dumps({
+            "meta": {"title": "Guide", "owner": {"name": "Ada"}, "tags": ["a", "b"], "none": []},
+            "count": 2,
+        }).encode()
+
+        _, groups = segments(content, "json")
+
+        assert groups == [
+            {"text": "meta.title: Guide", "metadata": {"json_path": "$.meta.title"}},
+            {"text": "meta.owner.name: Ada", "metadata": {"json_path": "$.meta.owner.name"}},
+            {"text": "meta.tags[0]: a\n\nmeta.tags[1]: b", "metadata": {"json_path": "$.meta.tags[0:2]"}},
+            {"text": "meta.none: []", "metadata": {"json_path": "$.meta.none"}},
+            {"text": "count: 2", "metadata": {"json_path": "$.count"}},
+        ]
+
+    def test_sibling_members_share_a_segment(self):
+        content = json.dumps({"a": 1, "b": "two", "c": None}).encode()
+
+        _, groups = segments(content, "json")
+
+        assert groups == [{"text": "a: 1\n\nb: two\n\nc: null", "metadata": {"json_path": "$"}}]
+
+    def test_large_member_array_is_not_decoded_whole(self, monkeypatch):
+        monkeypatch.setattr(settings, "CHUNK_SIZE_UNIT", "chars")
+        monkeypatch.setattr(settings, "CHUNK_SIZE", 200)
+        items = [{"id": i, "body": "x" * 50} for i in range(20000)]
+        source = io.BytesIO(json.dumps({"name": "export", "items": items}).encode())
+
+        metadata, groups = DocumentParser.record_segments(source, "json", "export.json")
+        next(groups)
+        first_items = next(groups)
+
+        assert first_items["metadata"]["json_path"].startswith("$.items[0:")
+        # Only the first reads of a ~1.5 MB file are needed for the first group
+        assert source.tell() < len(source.getvalue()) // 4
@@ -0,0 +1,65 @@
+import io
+
+import pytest
+
+from config import settings
+from services.parser import DocumentParser
+
+
+def segments(content: bytes, record_format: str, filename: str = "file"):
+    metadata, groups = DocumentParser.record_segments(io.BytesIO(content), record_format, filename)
+    return metadata, list(groups)
+
+
+class TestCsv:
+    def test_rows_are_numbered_as_in_the_file(self):
+        content = b"\xef\xbb\xbfname,role\nAda,Engineer\n,\nGrace,Admiral\n"
+
+        metadata, groups = segments(content, "csv", "people.csv")
+
+        assert metadata == {"source": "people.csv", "format": "csv", "columns": 2}
+        assert groups == [{
+            "text": "name | role\nAda | Engineer\nGrace | Admiral",
+            "metadata": {"row_start": 2, "row_end": 4},
+        }]
+
+    def test_groups_fit_the_chunk_budget(self, monkeypatch):
+        monkeypatch.setattr(settings, "CHUNK_SIZE_UNIT", "chars")
+        monkeypatch.setattr(settings, "CHUNK_SIZE", 100)
+        rows = "".join(f"row{i:03d},{'x' * 20}\n" for i in range(30))
+
+        _, groups = segments(b"id,value\n" + rows.encode(), "csv")
+
+        assert len(groups) > 1
+        assert all(len(group["text"]) <= 100 for group in groups)
+        assert all(group["text"].startswith("id | value\n") for group in groups)
+        assert groups[0]["metadata"]["row_start"] == 2
+        assert groups[-1]["metadata"]["row_end"] == 31
+        for previous, group in zip(groups, groups[1:]):
+            assert group["metadata"]["row_start"] == previous["metadata"]["row_end"] + 1
+
+
+class TestExcel:
+    @pytest.fixture(autouse=True)
+    def openpyxl(self):
+        return pytest.importorskip("openpyxl")
+
+    def test_rows_are_numbered_as_in_the_sheet(self, openpyxl):
+        wb = openpyxl.Workbook()
+        sheet = wb.active
+        sheet.title = "Roles"
+        # Table starts at B3: two empty leading rows and an empty column A
+        sheet["B3"], sheet["C3"] = "name", "years"
+        sheet["B4"], sheet["C4"] = "Ada", 7
+        sheet["B6"], sheet["C6"] = "Grace", 12
+        wb.create_sheet("Empty")
+        buffer = io.BytesIO()
+        wb.save(buffer)
+
+        metadata, groups = segments(buffer.getvalue(), "excel", "roles.xlsx")
+
+        assert metadata == {"source": "roles.xlsx", "format": "excel", "sheets": 2}
+        assert groups == [{
+            "text": "Sheet: Roles\n | name | years\n | Ada | 7\n | Grace | 12",
+            "metadata": {"sheet": "Roles", "row_start": 4, "row_end": 6},
+        }]
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from services.query_batcher import QueryBatcher
+
+
+class FakeEmbedder:
+    def __init__(self, fail: bool = False):
+        self.calls = []
+        self.fail = fail
+
+    async def embed_texts(self, texts):
+        self.calls.append(list(texts))
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("inference down")
+        return [[float(len(text))] for text in texts]
+
+
+@pytest.fixture
+def batcher():
+    batcher = QueryBatcher()
+    batcher.embedder = FakeEmbedder()
+    batcher.window = 0.02
+    batcher.max_items = 4
+    return batcher
+
+
+async def test_concurrent_queries_share_one_batch(batcher):
+    vectors = await asyncio.gather(*[batcher.embed(q) for q in ["a", "bb", "ccc"]])
+
+    assert vectors == [[1.0], [2.0], [3.0]]
+    assert batcher.embedder.calls == [["a", "bb", "ccc"]]
+
+
+async def test_full_batch_is_sent_before_the_window(batcher):
+    batcher.window = 10
+    queries = ["q" * n for n in range(1, 6)]
+
+    vectors = await asyncio.wait_for(
+        asyncio.gather(*[batcher.embed(q) for q in queries[:4]]),
+        timeout=1
+    )
+
+    assert vectors == [[1.0], [2.0], [3.0], [4.0]]
+    assert batcher.embedder.calls == [queries[:4]]
+
+
+async def test_later_queries_start_a_new_batch(batcher):
+    first = await batcher.embed("one")
+    second = await batcher.embed("three")
+
+    assert (first, second) == ([3.0], [5.0])
+    assert batcher.embedder.calls == [["one"], ["three"]]
+
+
+async def test_in_flight_batches_are_held_until_done(batcher):
+    gate = asyncio.Event()
+    embed_texts = batcher.embedder.embed_texts
+
+    async def slow(texts):
+        await gate.wait()
+        return await embed_texts(texts)
+
+    batcher.embedder.embed_texts = slow
+    query = asyncio.ensure_future(batcher.embed("held"))
+    await asyncio.sleep(0.05)
+
+    assert len(batcher._tasks) == 1
+    gate.set()
+    assert await query == [4.0]
+    await asyncio.sleep(0)
+    assert batcher._tasks == set()
+
+
+async def test_failure_reaches_every_caller(batcher):
+    batcher.embedder = FakeEmbedder(fail=True)
+
+    results = await asyncio.gather(batcher.embed("a"), batcher.embed("b"), return_exceptions=True)
+
+    assert [str(result) for result in results] == ["inference down"] * 2
+
+
+async def test_cancelled_caller_does_not_break_the_batch(batcher):
+    cancelled = asyncio.ensure_future(batcher.embed("gone"))
+    kept = asyncio.ensure_future(batcher.embed("kept"))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+
+    assert await kept == [4.0]
+    assert cancelled.cancelled()
+
+
+async def test_batching_disabled(batcher):
+    batcher.window = 0
+
+    assert await batcher.embed("abc") == [3.0]
+    assert batcher.embedder.calls == [["abc"]]
+
+
+def test_new_event_loop_drops_pending_state(batcher):
+    assert asyncio.run(batcher.embed("first")) == [5.0]
+    assert asyncio.run(batcher.embed("second")) == [6.0]
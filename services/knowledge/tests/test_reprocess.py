@@ -0,0 +1,135 @@
+import pytest
+
+from models import Document
+from services import reprocess, text_spool
+from services.chunker import TextChunker
+from services.parser import DocumentParser
+from services.reprocess import ReprocessService
+
+# Paragraphs long enough that each one is its own chunk at the default size
+PARAGRAPHS = [f"Paragraph {i}. " + "word " * 90 for i in range(4)]
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    def __init__(self, stored, shared_clean_path=0):
+        self.stored = stored
+        self.shared = shared_clean_path
+        self.updates = []
+
+    async def execute(self, statement, params=None):
+        if isinstance(params, list):
+            self.updates.extend(params)
+            return None
+        return FakeResult(self.stored)
+
+    async def scalar(self, statement):
+        return self.shared
+
+
+class FakeWriter:
+    def __init__(self, db):
+        self.deleted = []
+        self.written = []
+        FakeWriter.last = self
+
+    async def delete_chunks(self, chunk_ids):
+        self.deleted.extend(chunk_ids)
+
+    async def write_batch(self, doc_id, user_id, chunks, vectors):
+        self.written.extend((chunk["text"], vector) for chunk, vector in zip(chunks, vectors))
+
+
+class FakeEmbedder:
+    def __init__(self):
+        self.texts = []
+
+    async def embed_texts(self, texts):
+        self.texts.extend(texts)
+        return [[float(len(text))] for text in texts]
+
+
+class FakeStorage:
+    def __init__(self):
+        self.objects = {}
+
+    async def put_file(self, key, fileobj, content_type):
+        fileobj.seek(0)
+        self.objects[key] = fileobj.read()
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    storage = FakeStorage()
+    monkeypatch.setattr(text_spool, "storage", storage)
+    monkeypatch.setattr(reprocess, "BulkWriter", FakeWriter)
+    return storage
+
+
+def stored_chunks(paragraphs):
+    chunks = TextChunker().chunk_segment("\n\n".join(paragraphs), {}, 0)
+    return [(f"chunk-{i}", chunk["text"]) for i, chunk in enumerate(chunks)]
+
+
+def service_for(paragraphs):
+    service = ReprocessService()
+    service.embedder = FakeEmbedder()
+
+    async def load(doc, reparse):
+        return DocumentParser.as_stream({"text": "\n\n".join(paragraphs), "metadata": {"format": "text"}})
+
+    service._load = load
+    return service
+
+
+def document(clean_path="clean/u/d/content.md"):
+    return Document(id="d", user_id="u", status="processing", progress=100, clean_path=clean_path)
+
+
+async def test_only_changed_chunks_are_embedded(storage):
+    stored = stored_chunks(PARAGRAPHS)
+    assert len(stored) == 4
+    new = "A brand new paragraph. " + "other " * 80
+    changed = PARAGRAPHS[:2] + [new] + PARAGRAPHS[3:]
+    service = service_for(changed)
+    db = FakeSession(stored)
+    doc = document()
+
+    stats = await service.reprocess(db, doc)
+
+    assert stats == {"kept": 3, "added": 1, "removed": 1}
+    assert service.embedder.texts == [new.strip()]
+    assert FakeWriter.last.deleted == ["chunk-2"]
+    assert [(row["id"], row["position"]) for row in db.updates] == [("chunk-0", 0), ("chunk-1", 1), ("chunk-3", 3)]
+    assert (doc.status, doc.progress, doc.clean_path) == ("ready", 100, "clean/u/d/content.md")
+    assert storage.objects[doc.clean_path].decode("utf-8") == "\n\n".join(changed)
+
+
+async def test_repeated_text_keeps_one_row_per_occurrence(storage):
+    stored = stored_chunks([PARAGRAPHS[0], PARAGRAPHS[0], PARAGRAPHS[1]])
+    service = service_for([PARAGRAPHS[0], PARAGRAPHS[1]])
+    db = FakeSession(stored)
+
+    stats = await service.reprocess(db, document())
+
+    assert stats == {"kept": 2, "added": 0, "removed": 1}
+    assert [row["id"] for row in db.updates] == ["chunk-1", "chunk-2"]
+    assert FakeWriter.last.deleted == ["chunk-0"]
+
+
+async def test_shared_clean_copy_is_not_overwritten(storage):
+    # A dedup clone pointing at another document's clean text
+    doc = document(clean_path="clean/owner/src/content.md")
+    service = service_for(PARAGRAPHS)
+
+    await service.reprocess(FakeSession(stored_chunks(PARAGRAPHS), shared_clean_path=1), doc)
+
+    assert doc.clean_path == "clean/u/d/content.md"
+    assert list(storage.objects) == ["clean/u/d/content.md"]
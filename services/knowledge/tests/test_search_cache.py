@@ -0,0 +1,104 @@
+import pytest
+
+from config import settings
+from services import search as search_module
+from services.search_cache import SearchCache, bump_generation, normalize_query
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(settings, "EMBEDDING_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "SEARCH_CACHE_ENABLED", True)
+
+
+class TestSearchCache:
+    def test_normalize_query(self):
+        assert normalize_query("  Ｈello\t\nWORLD ") == "hello world"
+        assert normalize_query("Straße") == normalize_query("STRASSE")
+
+    def test_result_key_identity(self):
+        key = SearchCache.result_key
+        assert key("u", "q", 5, {"doc_id": "d", "x": 1}) == key("u", "q", 5, {"x": 1, "doc_id": "d"})
+        assert key("u", "q", 5, None) == key("u", "q", 5, {})
+        assert len({key("u", "q", 5, None), key("v", "q", 5, None), key("u", "q", 6, None)}) == 3
+
+    async def test_results_until_generation_bump(self, fake_redis, enabled):
+        cache = SearchCache()
+        key = cache.result_key("u", "q", 5, None)
+
+        miss = await cache.get_results("u", key)
+        assert miss == {"results": None, "generation": 0}
+
+        await cache.set_results(key, miss["generation"], [{"chunk_id": "c"}])
+        assert (await cache.get_results("u", key))["results"] == [{"chunk_id": "c"}]
+
+        await bump_generation("u")
+        assert await cache.get_results("u", key) == {"results": None, "generation": 1}
+
+    async def test_write_after_bump_is_never_served(self, fake_redis, enabled):
+        cache = SearchCache()
+        key = cache.result_key("u", "q", 5, None)
+
+        generation = (await cache.get_results("u", key))["generation"]
+        await bump_generation("u")
+        await cache.set_results(key, generation, [{"chunk_id": "stale"}])
+
+        assert (await cache.get_results("u", key))["results"] is None
+
+    async def test_redis_failure_skips_the_write(self, fake_redis, enabled):
+        cache = SearchCache()
+        key = cache.result_key("u", "q", 5, None)
+        fake_redis.fail = True
+
+        lookup = await cache.get_results("u", key)
+        fake_redis.fail = False
+        await cache.set_results(key, lookup["generation"], [])
+
+        assert lookup == {"results": None, "generation": None}
+        assert key not in fake_redis.data
+
+
+class TestSearchServiceCaching:
+    RESULT = {"chunk_id": "c1", "doc_id": "d", "text": "t", "metadata": {}, "score": 0.5}
+
+    @pytest.fixture
+    def service(self, fake_redis, enabled, monkeypatch):
+        self.embedded = []
+
+        async def embed(query):
+            self.embedded.append(query)
+            return [0.5, 0.25]
+
+        async def bm25(db, query, user_id, top_k, filters):
+            return [dict(self.RESULT)]
+
+        async def vector(db, query_vector, user_id, top_k, filters):
+            return [dict(self.RESULT)]
+
+        async def attach(db, results, user_id):
+            pass
+
+        monkeypatch.setattr(search_module.query_batcher, "embed", embed)
+        service = search_module.SearchService()
+        service._bm25_search = bm25
+        service._vector_search = vector
+        service._attach_document_metadata = attach
+        return service
+
+    async def test_repeat_query_is_served_from_cache(self, service):
+        first = await service.search(None, "Hello  World", "u", top_k=5)
+        second = await service.search(None, "hello world", "u", top_k=5)
+
+        assert first == second
+        assert self.embedded == ["Hello  World"]
+
+    async def test_failed_leg_is_not_cached(self, service, fake_redis):
+        async def failed(*args):
+            return None
+
+        service._vector_search = failed
+
+        results = await service.search(None, "query", "u", top_k=5)
+
+        assert [result["chunk_id"] for result in results] == ["c1"]
+        assert not any(key.startswith("search:result:") for key in fake_redis.data)
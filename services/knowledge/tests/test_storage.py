@@ -0,0 +1,55 @@
+import io
+
+import pytest
+
+from services.storage import LocalStorage, ObjectNotFoundError, storage
+
+
+@pytest.fixture
+def local(tmp_path):
+    return LocalStorage(str(tmp_path))
+
+
+def test_tests_use_local_storage():
+    assert isinstance(storage, LocalStorage)
+
+
+async def test_bytes_round_trip(local):
+    await local.put_bytes("raw/u/d/a.txt", b"hello", "text/plain")
+
+    assert await local.get_bytes("raw/u/d/a.txt") == b"hello"
+    assert await local.size("raw/u/d/a.txt") == 5
+
+
+async def test_file_round_trip_from_the_start(local):
+    source = io.BytesIO(b"x" * (3 * 1024 * 1024 + 5))
+    source.seek(100)
+
+    await local.put_file("clean/u/d/content.md", source, "text/markdown")
+    target = io.BytesIO()
+    await local.get_file("clean/u/d/content.md", target)
+
+    assert target.getvalue() == source.getvalue()
+
+
+async def test_missing_objects(local):
+    with pytest.raises(ObjectNotFoundError):
+        await local.get_bytes("nope")
+    with pytest.raises(ObjectNotFoundError):
+        await local.size("nope")
+    with pytest.raises(ObjectNotFoundError):
+        await local.get_file("nope", io.BytesIO())
+
+
+async def test_keys_cannot_escape_the_bucket(local):
+    with pytest.raises(ValueError):
+        await local.put_bytes("../outside", b"x", "text/plain")
+
+
+async def test_delete_many_counts_existing_objects(local):
+    await local.put_bytes("a", b"1", "text/plain")
+    await local.put_bytes("b/c", b"2", "text/plain")
+
+    assert await local.delete_many(["a", "b/c", "missing"]) == 2
+    with pytest.raises(ObjectNotFoundError):
+        await local.get_bytes("a")
@@ -0,0 +1,108 @@
+import random
+
+import pytest
+
+from services.text_splitter import DEFAULT_SEPARATORS, OffsetTextSplitter
+
+_WORDS = ["the", "model", "career", "mentor", "embedding", "offset", "chunk", "document",
+          "retrieval", "a", "of", "and", "to", "interview", "résumé", "pipeline",
+          "supercalifragilisticexpialidocious" * 3]
+
+
+def corpus(seed: int, paragraphs: int = 40) -> str:
+    """Prose-like text with blank lines, single newlines, odd spacing and long words"""
+    rng = random.Random(seed)
+    parts = []
+    for _ in range(paragraphs):
+        sentences = [
+            " ".join(rng.choice(_WORDS) for _ in range(rng.randint(1, 40))).capitalize()
+            for _ in range(rng.randint(1, 8))
+        ]
+        paragraph = ". ".join(sentences) + "."
+        if rng.random() < 0.3:
+            paragraph = "\n".join(paragraph.split(". "))
+        if rng.random() < 0.1:
+            paragraph = "   " + paragraph + "  \n"
+        parts.append(paragraph)
+    return "\n\n".join(parts)
+
+
+CASES = [
+    "",
+    "short",
+    "   \n\n  ",
+    "a" * 1000,
+    "word " * 300,
+    "First paragraph.\n\nSecond. Sentence two.\nLine three\n\n\n\nAfter gap",
+    "Ünïcödé — “quotes” … emoji 🎉 " * 40,
+]
+
+
+@pytest.mark.parametrize("chunk_size,chunk_overlap", [(512, 64), (100, 0), (50, 20), (7, 3)])
+@pytest.mark.parametrize("seed", range(5))
+def test_offsets_slice_the_source(chunk_size, chunk_overlap, seed):
+    text = corpus(seed)
+    splitter = OffsetTextSplitter(chunk_size, chunk_overlap)
+
+    previous_start = -1
+    for start, end, chunk in splitter.split(text):
+        assert text[start:end] == chunk
+        assert chunk and len(chunk) <= chunk_size
+        assert start > previous_start
+        previous_start = start
+
+
+def test_split_range_keeps_absolute_offsets():
+    text = corpus(0)
+    splitter = OffsetTextSplitter(80, 10)
+    start, end = 1000, 3000
+
+    spans = list(splitter.split(text, start, end))
+
+    assert all(start <= s and e <= end and text[s:e] == chunk for s, e, chunk in spans)
+    assert [chunk for _, _, chunk in spans] == splitter.split_text(text[start:end])
+
+
+def test_overlap_larger_than_size_is_rejected():
+    with pytest.raises(ValueError):
+        OffsetTextSplitter(10, 20)
+
+
+class TestMatchesLangchain:
+    """Same chunks as RecursiveCharacterTextSplitter with the settings TextChunker used"""
+
+    @pytest.fixture(autouse=True)
+    def langchain(self):
+        return pytest.importorskip("langchain_text_splitters")
+
+    @pytest.mark.parametrize("chunk_size,chunk_overlap", [(512, 64), (200, 50), (50, 20), (10, 0)])
+    @pytest.mark.parametrize("seed", range(5))
+    def test_generated_corpus(self, langchain, chunk_size, chunk_overlap, seed):
+        text = corpus(seed)
+        expected = langchain.RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size, chunk_overlap=chunk_overlap, separators=DEFAULT_SEPARATORS
+        ).split_text(text)
+
+        assert OffsetTextSplitter(chunk_size, chunk_overlap).split_text(text) == expected
+
+    @pytest.mark.parametrize("text", CASES)
+    def test_edge_cases(self, langchain, text):
+        expected = langchain.RecursiveCharacterTextSplitter(
+            chunk_size=30, chunk_overlap=5, separators=DEFAULT_SEPARATORS
+        ).split_text(text)
+
+        assert OffsetTextSplitter(30, 5).split_text(text) == expected
+
+    def test_custom_length_function(self, langchain):
+        # Stand-in for token counts; like them it is 0 for "", which
+        # langchain measures as the join separator
+        def words(text: str) -> int:
+            return len(text.split())
+
+        text = corpus(7)
+        expected = langchain.RecursiveCharacterTextSplitter(
+            chunk_size=40, chunk_overlap=8, separators=DEFAULT_SEPARATORS, length_function=words
+        ).split_text(text)
+
+        splitter = OffsetTextSplitter(40, 8, length_function=lambda texts: [words(t) for t in texts])
+        assert splitter.split_text(text) == expected
@@ -0,0 +1,87 @@
+import pytest
+
+from config import settings
+from services import tokenizer as tokenizer_module
+from services.tokenizer import TokenCounter
+
+tokenizers = pytest.importorskip("tokenizers")
+
+
+@pytest.fixture
+def tokenizer_path(tmp_path):
+    """Whitespace word-level tokenizer that wraps inputs in [CLS] ... [SEP]"""
+    vocab = {"[UNK]": 0, "[CLS]": 1, "[SEP]": 2}
+    model = tokenizers.Tokenizer(tokenizers.models.WordLevel(vocab, unk_token="[UNK]"))
+    model.pre_tokenizer = tokenizers.pre_tokenizers.Whitespace()
+    model.post_processor = tokenizers.processors.TemplateProcessing(
+        single="[CLS] $A [SEP]", special_tokens=[("[CLS]", 1), ("[SEP]", 2)]
+    )
+    path = tmp_path / "tokenizer.json"
+    model.save(str(path))
+    return str(path)
+
+
+class CountingTokenizer:
+    """Delegates to the real tokenizer, recording each batch it encodes"""
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.batches = []
+
+    def encode_batch(self, texts, add_special_tokens=True):
+        self.batches.append(list(texts))
+        return self.tokenizer.encode_batch(texts, add_special_tokens=add_special_tokens)
+
+
+def counter(path, max_items=None):
+    counter = TokenCounter(path, max_items=max_items)
+    counter.tokenizer = CountingTokenizer(counter.tokenizer)
+    return counter
+
+
+def test_counts_exclude_special_tokens(tokenizer_path):
+    tokens = counter(tokenizer_path)
+
+    assert tokens.special_tokens == 2
+    assert tokens.count_many(["one two three", "", "four"]) == [3, 0, 1]
+
+
+def test_repeats_are_encoded_once(tokenizer_path):
+    tokens = counter(tokenizer_path)
+
+    assert tokens.count_many(["a b", "c", "a b"]) == [2, 1, 2]
+    assert tokens.count_many(["c", "a b", "d e f"]) == [1, 2, 3]
+    assert tokens.tokenizer.batches == [["a b", "c"], ["d e f"]]
+
+
+def test_least_recently_used_counts_are_evicted(tokenizer_path):
+    tokens = counter(tokenizer_path, max_items=2)
+
+    tokens.count_many(["a", "b"])
+    tokens.count_many(["a"])
+    tokens.count_many(["c"])
+
+    assert list(tokens._memory) == ["a", "c"]
+    tokens.count_many(["b"])
+    assert tokens.tokenizer.batches[-1] == ["b"]
+
+
+def test_long_texts_are_not_kept(tokenizer_path):
+    tokens = counter(tokenizer_path)
+    section = "word " * (tokenizer_module._MAX_CACHED_CHARS // 5 + 1)
+
+    assert tokens.count_many([section]) == [len(section.split())]
+    assert section not in tokens._memory
+
+
+def test_cache_size_setting(tokenizer_path, monkeypatch):
+    monkeypatch.setattr(settings, "TOKENIZER_CACHE_ITEMS", 7)
+
+    assert TokenCounter(tokenizer_path).max_items == 7
+
+
+def test_needs_a_tokenizer_path(monkeypatch):
+    monkeypatch.setattr(settings, "TOKENIZER_PATH", "")
+
+    with pytest.raises(ValueError, match="TOKENIZER_PATH"):
+        TokenCounter()
@@ -1,13 +1,18 @@
 """
 Celery tasks for background processing
 """
-from celery import Celery
+from celery import Celery, chord
+import asyncio
 import os
+import sys
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Ingestion tasks run the knowledge service's parser, chunker and embedder
+sys.path.insert(0, os.getenv("KNOWLEDGE_SERVICE_PATH", "/knowledge"))
+
 # Initialize Celery
 celery_app = Celery(
     "career_mentor_workers",
@@ -18,42 +23,127 @@ celery_app = Celery(
 celery_app.conf.task_routes = {
     "tasks.parse_document": {"queue": "documents"},
     "tasks.generate_embeddings": {"queue": "embeddings"},
+    "tasks.finalize_document": {"queue": "documents"},
+    "tasks.ingest_failed": {"queue": "documents"},
+    "tasks.reprocess_document": {"queue": "documents"},
     "tasks.consolidate_memory": {"queue": "memory"},
 }
 
 
+def run_async(coro):
+    """Run a knowledge-service coroutine to completion inside a task"""
+    from database import engine
+    from services.embedding_backends import close_embedding_backend
+    from services.embedding_cache import close_redis
+
+    async def runner():
+        try:
+            return await coro
+        finally:
+            # Pooled connections are bound to this task's event loop
+            await engine.dispose()
+            await close_embedding_backend()
+            await close_redis()
+
+    return asyncio.run(runner())
+
+
+# The documents queue runs on a solo-pool worker: its process is not
+# daemonic, so it keeps the knowledge service's parse pool, which applies
+# PARSE_TIMEOUT_SECONDS to each parse or page range inside the pool workers
 @celery_app.task(name="tasks.parse_document")
-def parse_document(doc_id: str, user_id: str, file_path: str):
+def parse_document(doc_id: str, user_id: str):
     """
     Parse uploaded document:
     1. Download from S3
     2. Extract text
     3. Normalize to markdown
-    4. Enqueue chunking
+    4. Chunk and fan out embedding batches as a chord
     """
+    from services import jobs
+
     logger.info(f"Parsing document {doc_id}")
 
-    # TODO: Implement document parsing
-    # For now, just log
-    logger.info(f"Document {doc_id} parsed successfully")
+    try:
+        parsed = run_async(jobs.parse_and_chunk(doc_id, user_id))
+    except Exception as e:
+        run_async(jobs.mark_failed(doc_id, str(e)))
+        raise
 
-    return {"status": "success", "doc_id": doc_id}
+    finalize = finalize_document.si(doc_id).on_error(ingest_failed.s(doc_id))
+
+    if not parsed["batches"]:
+        finalize.delay()
+        return {"status": "success", "doc_id": doc_id, "chunk_count": 0}
+
+    chord([
+        generate_embeddings.s(doc_id, user_id, batch, parsed["total"])
+        for batch in parsed["batches"]
+    ])(finalize)
+
+    logger.info(f"Document {doc_id} parsed successfully, {len(parsed['batches'])} embedding batches queued")
+
+    return {"status": "success", "doc_id": doc_id, "chunk_count": parsed["total"]}
 
 
 @celery_app.task(name="tasks.generate_embeddings")
-def generate_embeddings(doc_id: str, chunks: list):
+def generate_embeddings(doc_id: str, user_id: str, chunks: list, total: int):
     """
-    Generate embeddings for document chunks:
+    Generate embeddings for one batch of document chunks:
     1. Call Inference Service to embed
     2. Store in vector database
-    3. Build BM25 index
+    3. Update document progress
     """
+    from services import jobs
+
     logger.info(f"Generating embeddings for {len(chunks)} chunks")
 
-    # TODO: Implement embedding generation
+    count = run_async(jobs.embed_chunk_batch(doc_id, user_id, chunks, total))
+
     logger.info(f"Embeddings generated for document {doc_id}")
 
-    return {"status": "success", "doc_id": doc_id, "chunk_count": len(chunks)}
+    return {"status": "success", "doc_id": doc_id, "chunk_count": count}
+
+
+@celery_app.task(name="tasks.finalize_document")
+def finalize_document(doc_id: str):
+    """Mark document ready once every embedding batch has finished"""
+    from services import jobs
+
+    run_async(jobs.finalize_document(doc_id))
+
+    return {"status": "success", "doc_id": doc_id}
+
+
+@celery_app.task(name="tasks.ingest_failed")
+def ingest_failed(request, exc, traceback, doc_id: str):
+    """Chord error callback: record the failure on the document"""
+    from services import jobs
+
+    run_async(jobs.mark_failed(doc_id, str(exc)))
+
+
+@celery_app.task(name="tasks.reprocess_document")
+def reprocess_document(doc_id: str, reparse: bool = False):
+    """
+    Reprocess document incrementally:
+    1. Re-chunk, from the parse cache unless reparse is set
+    2. Keep embeddings of unchanged chunks
+    3. Embed new chunks, delete orphans
+    """
+    from services import jobs
+
+    logger.info(f"Reprocessing document {doc_id}")
+
+    try:
+        stats = run_async(jobs.reprocess_document(doc_id, reparse))
+    except Exception as e:
+        run_async(jobs.mark_failed(doc_id, str(e)))
+        raise
+
+    logger.info(f"Document {doc_id} reprocessed: {stats}")
+
+    return {"status": "success", "doc_id": doc_id, **stats}
 
 
 @celery_app.task(name="tasks.consolidate_memory")